@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+End-to-end latency benchmark for /chat, /chat/stream (+ video polling) and /chat-json
+
+Starts a fake Anthropic server and the app (unless URLs are given), runs each
+endpoint a number of times, and writes a JSON report with client-side and
+server-side (from /metrics) p50/p95/p99 per stage plus overall throughput.
+
+Usage (from backend/):
+    python -m benchmarks.e2e_bench --iterations 10 --concurrency 2 --llm-latency 2
+    python -m benchmarks.e2e_bench --compare benchmarks/results/e2e-20250101-120000.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from benchmarks.harness import BACKEND_DIR, BenchmarkHarness
+from benchmarks.scenarios import SAMPLE_QUESTIONS, run_chat, run_chat_json, run_stream
+from benchmarks.stats import compare_reports, save_report, server_stage_report, summarize
+
+
+SERVER_HISTOGRAMS = [
+    "tmas_ocr_seconds",
+    "tmas_llm_request_seconds",
+    "tmas_render_seconds",
+    "tmas_time_to_video_seconds",
+]
+
+
+async def run_endpoint(client, endpoint: str, iterations: int, concurrency: int, video_timeout: float):
+    """Run one endpoint `iterations` times with at most `concurrency` requests in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int):
+        question = SAMPLE_QUESTIONS[index % len(SAMPLE_QUESTIONS)]
+        async with semaphore:
+            if endpoint == "chat":
+                return await run_chat(client, question)
+            if endpoint == "stream":
+                return await run_stream(client, question, video_timeout=video_timeout)
+            return await run_chat_json(client, question)
+
+    return await asyncio.gather(*(one(i) for i in range(iterations)))
+
+
+async def run_benchmark(args) -> dict:
+    async with httpx.AsyncClient(base_url=args.app_url) as client:
+        before = (await client.get("/metrics")).text
+        started = time.perf_counter()
+        results = []
+        for endpoint in args.endpoints:
+            print(f"Running {endpoint} x{args.iterations} (concurrency {args.concurrency})...")
+            results.extend(await run_endpoint(client, endpoint, args.iterations, args.concurrency, args.video_timeout))
+        wall_time = time.perf_counter() - started
+        after = (await client.get("/metrics")).text
+
+    stage_values = defaultdict(list)
+    outcomes = Counter()
+    for result in results:
+        outcomes[f"{result.scenario}.{result.outcome}"] += 1
+        for stage, value in result.stages.items():
+            stage_values[f"{result.scenario}.{stage}"].append(value)
+
+    return {
+        "kind": "e2e",
+        "config": {
+            "endpoints": args.endpoints,
+            "iterations": args.iterations,
+            "concurrency": args.concurrency,
+            "llm_latency": args.llm_latency,
+            "llm_jitter": args.llm_jitter,
+            "app_url": args.app_url,
+        },
+        "wall_time_s": round(wall_time, 3),
+        "throughput_rps": round(len(results) / wall_time, 4) if wall_time else None,
+        "outcomes": dict(outcomes),
+        "client": {stage: summarize(values) for stage, values in sorted(stage_values.items())},
+        "server": server_stage_report(before, after, SERVER_HISTOGRAMS),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\nWall time {report['wall_time_s']}s, throughput {report['throughput_rps']} req/s")
+    print(f"Outcomes: {report['outcomes']}")
+    print("\nClient-side stages (seconds):")
+    for stage, stats in report["client"].items():
+        print(f"  {stage:<28} n={stats['count']:<4} p50={stats['p50']} p95={stats['p95']} p99={stats['p99']}")
+    print("\nServer-side stages from /metrics (seconds, bucket-interpolated):")
+    for series, stats in report["server"].items():
+        print(f"  {series:<60} n={stats['count']:<4} p50={stats['p50']} p95={stats['p95']} p99={stats['p99']}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end benchmark against a fake Anthropic server")
+    parser.add_argument("--endpoints", default="chat,stream,json", help="Comma-separated: chat, stream, json")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--video-timeout", type=float, default=300.0)
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="Fake API base latency (seconds)")
+    parser.add_argument("--llm-jitter", type=float, default=0.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--app-url", help="Benchmark an already running app instead of starting one")
+    parser.add_argument("--fake-url", help="Use an already running fake Anthropic server")
+    parser.add_argument("--results-dir", default=os.path.join(BACKEND_DIR, "benchmarks", "results"))
+    parser.add_argument("--compare", help="Previous report to compare p50/p95 against")
+    args = parser.parse_args(argv)
+    args.endpoints = [endpoint.strip() for endpoint in args.endpoints.split(",") if endpoint.strip()]
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    harness = BenchmarkHarness(
+        app_url=args.app_url,
+        fake_url=args.fake_url,
+        fake_args=[
+            "--latency", str(args.llm_latency),
+            "--jitter", str(args.llm_jitter),
+            "--error-rate", str(args.llm_error_rate),
+        ],
+    )
+    with harness:
+        args.app_url = harness.app_url
+        report = asyncio.run(run_benchmark(args))
+
+    print_report(report)
+    path = save_report(report, args.results_dir, "e2e")
+    print(f"\nReport saved to {path}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nChanges versus {args.compare}:")
+        for line in compare_reports(baseline, report):
+            print(f"  {line}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Anthropic Messages API used by the benchmarks
+
+Serves POST /v1/messages with configurable latency, optional SSE streaming,
+error injection and canned responses that contain runnable Manim code, and
+the Message Batches endpoints (/v1/messages/batches), whose batches end
+after --batch-latency seconds.
+
+Usage:
+    python -m benchmarks.fake_anthropic --port 8100 --latency 2.0 --jitter 0.5
+Then start the app with ANTHROPIC_BASE_URL=http://127.0.0.1:8100
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+
+SORTING_SCENE = '''from manim import *
+
+class SortingAnimation(Scene):
+    def construct(self):
+        title = Text("Bubble Sort", font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+        values = [4, 2, 3, 1]
+        boxes = VGroup(*[Square(side_length=0.8, color=GREEN) for _ in values]).arrange(RIGHT, buff=0.2)
+        labels = VGroup(*[Text(str(v), font_size=28).move_to(box) for v, box in zip(values, boxes)])
+        self.play(Create(boxes), Write(labels))
+        self.wait(0.5)
+        self.play(labels[0].animate.move_to(boxes[1]), labels[1].animate.move_to(boxes[0]))
+        self.wait(0.5)
+        done = Text("Sorted!", font_size=28, color=GREEN).next_to(boxes, DOWN)
+        self.play(Write(done))
+        self.wait(1)
+'''
+
+GRAPH_SCENE = '''from manim import *
+
+class GraphAnimation(Scene):
+    def construct(self):
+        title = Text("Graph Traversal", font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+        a = Circle(radius=0.3, color=RED).shift(LEFT * 2)
+        b = Circle(radius=0.3, color=RED).shift(RIGHT * 2)
+        c = Circle(radius=0.3, color=RED).shift(DOWN * 1.5)
+        edges = VGroup(Line(a.get_center(), b.get_center()), Line(b.get_center(), c.get_center()))
+        self.play(Create(VGroup(a, b, c)), Create(edges))
+        for node in (a, b, c):
+            self.play(node.animate.set_fill(YELLOW, opacity=0.8), run_time=0.5)
+        self.wait(1)
+'''
+
+CONCEPT_SCENE = '''from manim import *
+
+class ConceptAnimation(Scene):
+    def construct(self):
+        title = Text("Concept Name", font_size=36, color=BLUE)
+        self.play(Write(title))
+        self.wait(0.5)
+        circle = Circle(color=RED).shift(LEFT * 2)
+        square = Square(color=GREEN).shift(RIGHT * 2)
+        self.play(Create(circle), Create(square))
+        self.play(circle.animate.scale(1.5).set_color(PURPLE), square.animate.rotate(PI / 4))
+        self.wait(1)
+'''
+
+CANNED_RESPONSES = [
+    ("Bubble sort repeatedly swaps adjacent out-of-order elements until the list is sorted.", SORTING_SCENE),
+    ("Graph traversal visits every node reachable from a start node, one edge at a time.", GRAPH_SCENE),
+    ("This concept can be understood by looking at how simple shapes change over time.", CONCEPT_SCENE),
+]
+
+
+class FakeAnthropicConfig:
+    """Knobs controlling how the fake server behaves"""
+
+    def __init__(
+        self,
+        latency: float = 1.0,
+        jitter: float = 0.0,
+        stream_chunk_delay: float = 0.01,
+        error_rate: float = 0.0,
+        error_status: int = 529,
+        batch_latency: float = 5.0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_chunk_delay = stream_chunk_delay
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.batch_latency = batch_latency
+        self.random = random.Random(seed)
+
+
+def _response_text(body: Dict[str, Any], rng: random.Random) -> str:
+    """Pick a canned answer shaped like what the calling prompt asks for"""
+    explanation, code = rng.choice(CANNED_RESPONSES)
+    system = body.get("system") or ""
+    if "debugger" in system:
+        # debug_manim_code expects the fixed code only
+        return code
+    if "scene editor" in system:
+        return _scene_edit(body)
+    if body.get("max_tokens", 0) <= 16:
+        return "Hello"
+    return f"{explanation}\n\n```python\n{code}```\n"
+
+
+def _scene_edit(body: Dict[str, Any]) -> str:
+    """A one-block edit recoloring the first BLUE line of the scene in the prompt"""
+    prompt = body["messages"][-1]["content"]
+    prompt = prompt if isinstance(prompt, str) else " ".join(part.get("text", "") for part in prompt)
+    line = next((line for line in prompt.splitlines() if "color=BLUE" in line), None)
+    if line is None:
+        return "No change was needed."
+    return (
+        "Changed the title color to red.\n"
+        f"<<<<<<< SEARCH\n{line}\n=======\n{line.replace('color=BLUE', 'color=RED')}\n>>>>>>> REPLACE\n"
+    )
+
+
+def _message(body: Dict[str, Any], text: str) -> Dict[str, Any]:
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", "fake-model"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": len(json.dumps(body.get("messages", []))) // 4, "output_tokens": len(text) // 4},
+    }
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _chunks(text: str, size: int = 40) -> List[str]:
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+def create_app(config: FakeAnthropicConfig) -> FastAPI:
+    """Build the fake Messages API application"""
+    app = FastAPI(title="Fake Anthropic Messages API")
+    app.state.config = config
+    app.state.requests_served = 0
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        app.state.requests_served += 1
+        delay = config.latency + config.random.uniform(-config.jitter, config.jitter)
+        await asyncio.sleep(max(0.0, delay))
+
+        if config.error_rate and config.random.random() < config.error_rate:
+            return JSONResponse(
+                status_code=config.error_status,
+                content={"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}},
+                headers={"retry-after": "1"},
+            )
+
+        text = _response_text(body, config.random)
+        message = _message(body, text)
+        if not body.get("stream"):
+            return JSONResponse(message)
+
+        async def event_stream():
+            start = dict(message, content=[], usage={**message["usage"], "output_tokens": 0})
+            yield _sse("message_start", {"type": "message_start", "message": start})
+            yield _sse("content_block_start", {
+                "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+            })
+            for chunk in _chunks(text):
+                await asyncio.sleep(config.stream_chunk_delay)
+                yield _sse("content_block_delta", {
+                    "type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": chunk}
+                })
+            yield _sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+            yield _sse("message_delta", {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": message["usage"]["output_tokens"]},
+            })
+            yield _sse("message_stop", {"type": "message_stop"})
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    app.state.batches = {}
+
+    def batch_status(batch: Dict[str, Any], request: Request) -> Dict[str, Any]:
+        ended = time.time() >= batch["ends_at"]
+        count = len(batch["requests"])
+        errored = sum(1 for item in batch["requests"] if item["error"])
+        return {
+            "id": batch["id"],
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else count,
+                "succeeded": count - errored if ended else 0,
+                "errored": errored if ended else 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "results_url": str(request.url_for("batch_results", batch_id=batch["id"])) if ended else None,
+        }
+
+    @app.post("/v1/messages/batches")
+    async def create_batch(request: Request):
+        body = await request.json()
+        batch_id = f"msgbatch_{uuid.uuid4().hex[:24]}"
+        app.state.batches[batch_id] = {
+            "id": batch_id,
+            "ends_at": time.time() + config.batch_latency,
+            "requests": [
+                {
+                    "custom_id": item["custom_id"],
+                    "params": item["params"],
+                    "error": bool(config.error_rate and config.random.random() < config.error_rate),
+                }
+                for item in body.get("requests", [])
+            ],
+        }
+        app.state.requests_served += len(body.get("requests", []))
+        return JSONResponse(batch_status(app.state.batches[batch_id], request))
+
+    @app.get("/v1/messages/batches/{batch_id}")
+    async def get_batch(batch_id: str, request: Request):
+        if batch_id not in app.state.batches:
+            raise HTTPException(status_code=404, detail="Batch not found")
+        return JSONResponse(batch_status(app.state.batches[batch_id], request))
+
+    @app.get("/v1/messages/batches/{batch_id}/results", name="batch_results")
+    async def batch_results(batch_id: str):
+        batch = app.state.batches.get(batch_id)
+        if batch is None or time.time() < batch["ends_at"]:
+            raise HTTPException(status_code=404, detail="Batch results not available")
+        lines = []
+        for item in batch["requests"]:
+            if item["error"]:
+                result = {"type": "errored", "error": {"type": "overloaded_error", "message": "Overloaded"}}
+            else:
+                result = {"type": "succeeded", "message": _message(item["params"], _response_text(item["params"], config.random))}
+            lines.append(json.dumps({"custom_id": item["custom_id"], "result": result}))
+        return PlainTextResponse("\n".join(lines) + "\n", media_type="application/x-jsonl")
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests_served": app.state.requests_served}
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fake Anthropic Messages API for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=1.0, help="Base response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter in seconds")
+    parser.add_argument("--stream-chunk-delay", type=float, default=0.01, help="Delay between SSE chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=529, help="Status code for injected errors")
+    parser.add_argument("--batch-latency", type=float, default=5.0, help="Seconds until a message batch ends")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = FakeAnthropicConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        stream_chunk_delay=args.stream_chunk_delay,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        batch_latency=args.batch_latency,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Process harness that starts the fake Anthropic server and the app for benchmarks
+"""
+import os
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+import httpx
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_until_ready(url: str, timeout: float = 60.0) -> None:
+    """Poll a URL until it answers with a non-5xx status"""
+    deadline = time.monotonic() + timeout
+    last_error = None
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(url, timeout=2.0)
+            if response.status_code < 500:
+                return
+        except Exception as e:
+            last_error = e
+        time.sleep(0.25)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s: {last_error}")
+
+
+class BenchmarkHarness:
+    """
+    Starts the fake Messages API and the FastAPI app as subprocesses.
+
+    Either side can be skipped by passing an existing URL, e.g. to benchmark
+    a deployed instance against a fake upstream that is already running.
+    """
+
+    def __init__(
+        self,
+        app_url: Optional[str] = None,
+        fake_url: Optional[str] = None,
+        app_port: int = 8200,
+        fake_port: int = 8100,
+        fake_args: Optional[List[str]] = None,
+        app_env: Optional[dict] = None,
+        log_dir: Optional[str] = None,
+    ):
+        self.app_url = app_url
+        self.fake_url = fake_url
+        self.app_port = app_port
+        self.fake_port = fake_port
+        self.fake_args = fake_args or []
+        self.app_env = app_env or {}
+        self.log_dir = log_dir or os.path.join(BACKEND_DIR, "benchmarks", "results", "logs")
+        self._processes: List[subprocess.Popen] = []
+        self._logs = []
+
+    def _spawn(self, name: str, cmd: List[str], env: dict) -> subprocess.Popen:
+        os.makedirs(self.log_dir, exist_ok=True)
+        log = open(os.path.join(self.log_dir, f"{name}.log"), "w", encoding="utf-8")
+        self._logs.append(log)
+        process = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+        self._processes.append(process)
+        return process
+
+    def start(self) -> "BenchmarkHarness":
+        if self.fake_url is None:
+            self.fake_url = f"http://127.0.0.1:{self.fake_port}"
+            self._spawn(
+                "fake_anthropic",
+                [sys.executable, "-m", "benchmarks.fake_anthropic", "--port", str(self.fake_port), *self.fake_args],
+                os.environ.copy(),
+            )
+            wait_until_ready(f"{self.fake_url}/stats")
+        if self.app_url is None:
+            self.app_url = f"http://127.0.0.1:{self.app_port}"
+            env = os.environ.copy()
+            env.update({
+                "ANTHROPIC_BASE_URL": self.fake_url,
+                "ANTHROPIC_API_KEY": env.get("ANTHROPIC_API_KEY") or "benchmark-fake-key",
+                "TRACING_CONSOLE": "False",
+            })
+            env.update(self.app_env)
+            self._spawn(
+                "app",
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.app_port)],
+                env,
+            )
+            wait_until_ready(f"{self.app_url}/health")
+        return self
+
+    def stop(self) -> None:
+        for process in reversed(self._processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for log in self._logs:
+            log.close()
+        self._processes = []
+        self._logs = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
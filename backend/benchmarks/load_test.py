@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Concurrency sweep load test against the app with the LLM stubbed locally
+
+Ramps the number of concurrent closed-loop users step by step. Each user
+sends a mix of text-only, image-only and text+image questions. For every step
+the report gives throughput, latency percentiles, error and timeout rates,
+and event-loop lag (the latency of a /health probe running alongside the
+load). The step where throughput stops growing is reported as the saturation
+point.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --steps 1,2,4,8,16 --step-duration 60 --mix text=6,image=2,both=2
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from benchmarks.harness import BACKEND_DIR, BenchmarkHarness
+from benchmarks.scenarios import SAMPLE_QUESTIONS, make_question_image, run_chat, run_stream
+from benchmarks.stats import parse_prometheus_text, save_report, summarize
+
+
+TIMEOUT_OUTCOMES = {"timeout", "video_timeout", "server_timeout"}
+ERROR_OUTCOMES = {"http_error", "error", "exception"}
+
+
+def parse_mix(value: str) -> dict:
+    """Parse 'text=6,image=2,both=2' into normalised weights"""
+    weights = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        kind, weight = part.split("=")
+        kind = kind.strip()
+        if kind not in ("text", "image", "both"):
+            raise ValueError(f"Unknown traffic kind '{kind}' (use text, image or both)")
+        weights[kind] = float(weight)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Traffic mix weights must sum to more than zero")
+    return {kind: weight / total for kind, weight in weights.items()}
+
+
+class LoadStep:
+    """Collects results for one concurrency level"""
+
+    def __init__(self, concurrency: int):
+        self.concurrency = concurrency
+        self.results = []
+        self.probe_latencies = []
+        self.kinds = Counter()
+
+    def report(self, duration: float) -> dict:
+        outcomes = Counter(result.outcome for result in self.results)
+        completed = len(self.results)
+        # Requests answered without error or timeout, with or without a video
+        served = completed - sum(outcomes[o] for o in ERROR_OUTCOMES | TIMEOUT_OUTCOMES)
+        stage_values = defaultdict(list)
+        for result in self.results:
+            for stage, value in result.stages.items():
+                stage_values[stage].append(value)
+        return {
+            "concurrency": self.concurrency,
+            "duration_s": round(duration, 2),
+            "completed": completed,
+            "throughput_rps": round(completed / duration, 4) if duration else 0,
+            "ok_throughput_rps": round(outcomes["ok"] / duration, 4) if duration else 0,
+            "served_throughput_rps": round(served / duration, 4) if duration else 0,
+            "error_rate": round(sum(outcomes[o] for o in ERROR_OUTCOMES) / completed, 4) if completed else 0,
+            "timeout_rate": round(sum(outcomes[o] for o in TIMEOUT_OUTCOMES) / completed, 4) if completed else 0,
+            "no_video_rate": round(outcomes["no_video"] / completed, 4) if completed else 0,
+            "outcomes": dict(outcomes),
+            "traffic": dict(self.kinds),
+            "latency": {stage: summarize(values) for stage, values in sorted(stage_values.items())},
+            "event_loop_lag": summarize(self.probe_latencies),
+        }
+
+
+async def probe_loop(client: httpx.AsyncClient, step: LoadStep, stop: asyncio.Event, interval: float):
+    """Measure /health latency; on an idle event loop this is a few milliseconds"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        try:
+            await client.get("/health", timeout=30.0)
+            step.probe_latencies.append(time.perf_counter() - start)
+        except httpx.TimeoutException:
+            step.probe_latencies.append(30.0)
+        except Exception:
+            pass
+        await asyncio.sleep(interval)
+
+
+async def user_loop(client, step: LoadStep, stop: asyncio.Event, args, rng: random.Random, images: dict):
+    """One closed-loop user: send a request, wait for the full result, repeat"""
+    kinds = list(args.mix)
+    weights = [args.mix[kind] for kind in kinds]
+    while not stop.is_set():
+        kind = rng.choices(kinds, weights)[0]
+        question = rng.choice(SAMPLE_QUESTIONS)
+        text = question if kind in ("text", "both") else None
+        image = images[question] if kind in ("image", "both") else None
+        step.kinds[kind] += 1
+        if args.endpoint == "chat":
+            result = await run_chat(client, text, image, timeout=args.request_timeout)
+        else:
+            result = await run_stream(
+                client, text, image, video_timeout=args.video_timeout, timeout=args.request_timeout
+            )
+        step.results.append(result)
+
+
+def server_counter_deltas(before_text: str, after_text: str, name: str) -> dict:
+    """Per-series increase of a counter between two /metrics scrapes"""
+    before = parse_prometheus_text(before_text)
+    after = parse_prometheus_text(after_text)
+    deltas = {}
+    for (sample_name, labels), value in after.items():
+        if sample_name != name:
+            continue
+        delta = value - before.get((sample_name, labels), 0.0)
+        if delta:
+            deltas[",".join(f"{k}={v}" for k, v in labels) or "total"] = delta
+    return deltas
+
+
+async def run_step(client, concurrency: int, args, images: dict) -> dict:
+    step = LoadStep(concurrency)
+    stop = asyncio.Event()
+    rng = random.Random(args.seed + concurrency)
+    metrics_before = (await client.get("/metrics")).text
+    started = time.perf_counter()
+    tasks = [asyncio.create_task(probe_loop(client, step, stop, args.probe_interval))]
+    tasks += [asyncio.create_task(user_loop(client, step, stop, args, rng, images)) for _ in range(concurrency)]
+    await asyncio.sleep(args.step_duration)
+    stop.set()
+    # Let users finish the request they are in so its latency is counted
+    done, pending = await asyncio.wait(tasks, timeout=args.drain_timeout)
+    for task in pending:
+        task.cancel()
+    report = step.report(time.perf_counter() - started)
+    metrics_after = (await client.get("/metrics")).text
+    # Server-side view of the 300 s LLM and 130 s render timeouts firing
+    report["server_timeouts"] = server_counter_deltas(metrics_before, metrics_after, "tmas_timeouts_total")
+    report["server_fallbacks"] = server_counter_deltas(metrics_before, metrics_after, "tmas_fallbacks_total")
+    return report
+
+
+def find_saturation(steps: list, min_gain: float) -> dict:
+    """
+    The first step whose served throughput grows by less than `min_gain`
+    (relative) over the previous step is where the instance saturates.
+    """
+    best = None
+    for previous, current in zip(steps, steps[1:]):
+        base = previous["served_throughput_rps"]
+        gain = (current["served_throughput_rps"] - base) / base if base else float("inf")
+        if gain < min_gain:
+            best = previous
+            break
+    if best is None and steps:
+        best = max(steps, key=lambda step: step["served_throughput_rps"])
+    if not best:
+        return {}
+    return {
+        "concurrency": best["concurrency"],
+        "served_throughput_rps": best["served_throughput_rps"],
+        "p95_latency": {stage: stats["p95"] for stage, stats in best["latency"].items()},
+    }
+
+
+async def run_sweep(args) -> dict:
+    images = {question: make_question_image(question) for question in SAMPLE_QUESTIONS}
+    limits = httpx.Limits(max_connections=max(args.steps) * 2 + 10)
+    steps = []
+    async with httpx.AsyncClient(base_url=args.app_url, limits=limits) as client:
+        for concurrency in args.steps:
+            print(f"Step: {concurrency} concurrent users for {args.step_duration}s...")
+            report = await run_step(client, concurrency, args, images)
+            steps.append(report)
+            lag = report["event_loop_lag"]
+            print(
+                f"  {report['completed']} done, {report['served_throughput_rps']} served/s "
+                f"({report['ok_throughput_rps']} with video), "
+                f"errors {report['error_rate']:.1%}, timeouts {report['timeout_rate']:.1%}, "
+                f"loop lag p95 {lag['p95']}s, server timeouts {report['server_timeouts'] or 'none'}"
+            )
+    return {
+        "kind": "load",
+        "config": {
+            "steps": args.steps,
+            "step_duration": args.step_duration,
+            "endpoint": args.endpoint,
+            "mix": args.mix,
+            "llm_latency": args.llm_latency,
+            "app_url": args.app_url,
+        },
+        "steps": steps,
+        "saturation": find_saturation(steps, args.min_gain),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrency sweep load test")
+    parser.add_argument("--steps", default="1,2,4,8,16", help="Comma-separated concurrent user counts")
+    parser.add_argument("--step-duration", type=float, default=60.0, help="Seconds per step")
+    parser.add_argument("--drain-timeout", type=float, default=330.0, help="Max wait for in-flight requests")
+    parser.add_argument("--endpoint", choices=("stream", "chat"), default="stream")
+    parser.add_argument("--mix", default="text=6,image=2,both=2", help="Traffic mix weights")
+    parser.add_argument("--request-timeout", type=float, default=360.0)
+    parser.add_argument("--video-timeout", type=float, default=300.0)
+    parser.add_argument("--probe-interval", type=float, default=0.25)
+    parser.add_argument("--min-gain", type=float, default=0.1, help="Relative throughput gain below which a step counts as saturated")
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--app-url")
+    parser.add_argument("--fake-url")
+    parser.add_argument("--results-dir", default=os.path.join(BACKEND_DIR, "benchmarks", "results"))
+    args = parser.parse_args(argv)
+    args.steps = [int(step) for step in args.steps.split(",") if step.strip()]
+    args.mix = parse_mix(args.mix)
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    harness = BenchmarkHarness(
+        app_url=args.app_url,
+        fake_url=args.fake_url,
+        fake_args=["--latency", str(args.llm_latency), "--jitter", str(args.llm_jitter)],
+    )
+    with harness:
+        args.app_url = harness.app_url
+        report = asyncio.run(run_sweep(args))
+
+    saturation = report["saturation"]
+    if saturation:
+        print(
+            f"\nSaturation at ~{saturation['concurrency']} concurrent users "
+            f"({saturation['served_throughput_rps']} served req/s)"
+        )
+    path = save_report(report, args.results_dir, "load")
+    print(f"Report saved to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
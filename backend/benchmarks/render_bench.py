@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Render microbenchmark over the scene corpus in benchmarks/scenes
+
+Renders every corpus scene through ManimService.render_scene under each
+combination of quality, frame rate, renderer and concurrency, and records
+wall time, CPU time, peak RSS and output size per scene.
+
+Usage (from backend/):
+    python -m benchmarks.render_bench --qualities l,m --fps 15,30 --concurrency 1,2
+    python -m benchmarks.render_bench --scenes sorting,tex_math --repeat 3 --disable-caching
+"""
+import argparse
+import asyncio
+import glob
+import itertools
+import os
+import re
+import shutil
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.harness import BACKEND_DIR
+from benchmarks.stats import save_report, summarize
+from services.manim_service import ManimService
+
+
+SCENES_DIR = os.path.join(BACKEND_DIR, "benchmarks", "scenes")
+CLASS_RE = re.compile(r"^class\s+(\w+)\(\s*Scene\s*\)\s*:", re.MULTILINE)
+
+
+def load_corpus(names=None) -> dict:
+    """Map scene name -> (code, class name) for every corpus file"""
+    corpus = {}
+    for path in sorted(glob.glob(os.path.join(SCENES_DIR, "*.py"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name.startswith("_") or (names and name not in names):
+            continue
+        with open(path, encoding="utf-8") as f:
+            code = f.read()
+        match = CLASS_RE.search(code)
+        if match:
+            corpus[name] = (code, match.group(1))
+    return corpus
+
+
+async def run_config(service: ManimService, corpus: dict, config: dict, repeat: int, keep: bool) -> dict:
+    """Render the corpus `repeat` times under one configuration"""
+    semaphore = asyncio.Semaphore(config["concurrency"])
+
+    async def render(name: str, code: str, class_name: str):
+        async with semaphore:
+            result = await service.render_scene(
+                code,
+                class_name,
+                quality=config["quality"],
+                frame_rate=config["fps"],
+                renderer=config["renderer"],
+                disable_caching=config["disable_caching"],
+                kind="bench",
+            )
+        if not keep:
+            shutil.rmtree(result["work_dir"], ignore_errors=True)
+        return name, result
+
+    jobs = [render(name, code, cls) for _ in range(repeat) for name, (code, cls) in corpus.items()]
+    started = time.perf_counter()
+    results = await asyncio.gather(*jobs)
+    wall_time = time.perf_counter() - started
+
+    per_scene = defaultdict(lambda: defaultdict(list))
+    failures = defaultdict(int)
+    for name, result in results:
+        if result["returncode"] != 0:
+            failures[name] += 1
+            continue
+        per_scene[name]["wall_time"].append(result["wall_time"])
+        per_scene[name]["cpu_time"].append(result["cpu_time"])
+        per_scene[name]["peak_rss_mb"].append(result["peak_rss_kb"] / 1024)
+        per_scene[name]["output_mb"].append(result["output_bytes"] / (1024 * 1024))
+
+    return {
+        "config": config,
+        "batch_wall_time_s": round(wall_time, 3),
+        "renders_per_minute": round(len(results) / wall_time * 60, 3) if wall_time else None,
+        "failures": dict(failures),
+        "scenes": {
+            name: {metric: summarize(values) for metric, values in metrics.items()}
+            for name, metrics in per_scene.items()
+        },
+    }
+
+
+def parse_list(value: str, cast=str):
+    return [cast(item.strip()) for item in value.split(",") if item.strip()]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Render microbenchmark for ManimService")
+    parser.add_argument("--scenes", help="Comma-separated corpus scene names (default: all)")
+    parser.add_argument("--qualities", default="l", help="Manim quality letters, e.g. l,m,h")
+    parser.add_argument("--fps", default="0", help="Frame rates; 0 keeps the quality preset's rate")
+    parser.add_argument("--renderers", default="cairo", help="cairo and/or opengl")
+    parser.add_argument("--concurrency", default="1", help="Concurrent render levels, e.g. 1,2,4")
+    parser.add_argument("--repeat", type=int, default=1, help="Renders per scene per configuration")
+    parser.add_argument("--disable-caching", action="store_true", help="Pass --disable_caching to manim")
+    parser.add_argument("--keep-output", action="store_true", help="Keep rendered work directories")
+    parser.add_argument("--results-dir", default=os.path.join(BACKEND_DIR, "benchmarks", "results"))
+    return parser.parse_args(argv)
+
+
+async def run(args) -> dict:
+    corpus = load_corpus(parse_list(args.scenes) if args.scenes else None)
+    if not corpus:
+        raise SystemExit("No corpus scenes selected")
+    service = ManimService()
+    runs = []
+    for quality, fps, renderer, concurrency in itertools.product(
+        parse_list(args.qualities),
+        parse_list(args.fps, int),
+        parse_list(args.renderers),
+        parse_list(args.concurrency, int),
+    ):
+        config = {
+            "quality": quality,
+            "fps": fps or None,
+            "renderer": renderer,
+            "concurrency": concurrency,
+            "disable_caching": args.disable_caching,
+        }
+        print(f"Rendering {len(corpus)} scenes x{args.repeat} with {config}...")
+        result = await run_config(service, corpus, config, args.repeat, args.keep_output)
+        runs.append(result)
+        for name, metrics in sorted(result["scenes"].items()):
+            print(
+                f"  {name:<16} wall p50={metrics['wall_time']['p50']}s "
+                f"cpu p50={metrics['cpu_time']['p50']}s "
+                f"rss max={metrics['peak_rss_mb']['max']:.0f}MB "
+                f"size p50={metrics['output_mb']['p50']:.2f}MB"
+            )
+        if result["failures"]:
+            print(f"  failures: {result['failures']}")
+    return {"kind": "render", "scenes": sorted(corpus), "runs": runs}
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    path = save_report(report, args.results_dir, "render")
+    print(f"\nReport saved to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+"""
+Client-side request scenarios that time each stage of the pipeline end to end
+"""
+import asyncio
+import re
+import time
+from typing import Dict, Optional
+
+import httpx
+
+
+SAMPLE_QUESTIONS = [
+    "Explain how bubble sort works",
+    "How does breadth-first search traverse a graph?",
+    "What is a binary search tree?",
+    "Explain the Pythagorean theorem",
+    "How does Dijkstra's algorithm find shortest paths?",
+    "What is a derivative in calculus?",
+]
+
+REQUEST_ID_RE = re.compile(r"\[REQUEST_ID:([^\]]+)\]")
+
+
+class ScenarioResult:
+    """Outcome and per-stage timings (seconds) of one scenario run"""
+
+    def __init__(self, scenario: str):
+        self.scenario = scenario
+        self.stages: Dict[str, float] = {}
+        self.outcome = "ok"
+        self.status_code: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "scenario": self.scenario,
+            "stages": self.stages,
+            "outcome": self.outcome,
+            "status_code": self.status_code,
+            "error": self.error,
+        }
+
+
+def _form(text: Optional[str], image_png: Optional[bytes]):
+    data = {"text": text} if text else {}
+    files = {"image": ("question.png", image_png, "image/png")} if image_png else None
+    return data, files
+
+
+async def run_chat(
+    client: httpx.AsyncClient,
+    text: Optional[str],
+    image_png: Optional[bytes] = None,
+    timeout: float = 600.0,
+) -> ScenarioResult:
+    """POST /chat and time the full response (explanation plus inline base64 video)"""
+    result = ScenarioResult("chat")
+    data, files = _form(text, image_png)
+    start = time.perf_counter()
+    try:
+        response = await client.post("/chat", data=data, files=files, timeout=timeout)
+        result.stages["total"] = time.perf_counter() - start
+        result.status_code = response.status_code
+        if response.status_code == 504:
+            result.outcome = "server_timeout"
+        elif response.status_code != 200:
+            result.outcome = "http_error"
+        else:
+            body = response.json()
+            if not body.get("success"):
+                result.outcome = "error"
+                result.error = body.get("error_message")
+            elif not body.get("video_base64"):
+                result.outcome = "no_video"
+    except httpx.TimeoutException:
+        result.outcome = "timeout"
+    except Exception as e:
+        result.outcome = "exception"
+        result.error = str(e)
+    return result
+
+
+async def run_chat_json(client: httpx.AsyncClient, text: str, timeout: float = 600.0) -> ScenarioResult:
+    """POST /chat-json and time the full response"""
+    result = ScenarioResult("chat_json")
+    start = time.perf_counter()
+    try:
+        response = await client.post("/chat-json", json={"text": text}, timeout=timeout)
+        result.stages["total"] = time.perf_counter() - start
+        result.status_code = response.status_code
+        if response.status_code != 200:
+            result.outcome = "http_error"
+        else:
+            body = response.json()
+            if not body.get("success"):
+                result.outcome = "error"
+                result.error = body.get("error_message")
+            elif not body.get("animation_url"):
+                result.outcome = "no_video"
+    except httpx.TimeoutException:
+        result.outcome = "timeout"
+    except Exception as e:
+        result.outcome = "exception"
+        result.error = str(e)
+    return result
+
+
+async def run_stream(
+    client: httpx.AsyncClient,
+    text: Optional[str],
+    image_png: Optional[bytes] = None,
+    poll_interval: float = 1.0,
+    video_timeout: float = 300.0,
+    timeout: float = 600.0,
+) -> ScenarioResult:
+    """
+    POST /chat/stream, read the streamed explanation, then poll for the video
+    the way the frontend does.
+
+    Stages: first_byte, text_complete and time_to_video, all measured from
+    the moment the request was sent.
+    """
+    result = ScenarioResult("stream")
+    data, files = _form(text, image_png)
+    start = time.perf_counter()
+    body = ""
+    try:
+        async with client.stream("POST", "/chat/stream", data=data, files=files, timeout=timeout) as response:
+            result.status_code = response.status_code
+            async for chunk in response.aiter_text():
+                if "first_byte" not in result.stages:
+                    result.stages["first_byte"] = time.perf_counter() - start
+                body += chunk
+        result.stages["text_complete"] = time.perf_counter() - start
+    except httpx.TimeoutException:
+        result.outcome = "timeout"
+        return result
+    except Exception as e:
+        result.outcome = "exception"
+        result.error = str(e)
+        return result
+
+    if result.status_code == 504:
+        result.outcome = "server_timeout"
+        return result
+    if result.status_code != 200:
+        result.outcome = "http_error"
+        return result
+    match = REQUEST_ID_RE.search(body)
+    if not match:
+        result.outcome = "error"
+        result.error = body[:200]
+        return result
+
+    request_id = match.group(1)
+    deadline = time.perf_counter() + video_timeout
+    while time.perf_counter() < deadline:
+        try:
+            poll = await client.get(f"/chat/video_base64/{request_id}", timeout=60.0)
+        except httpx.TimeoutException:
+            result.outcome = "timeout"
+            return result
+        if poll.status_code == 200:
+            result.stages["time_to_video"] = time.perf_counter() - start
+            return result
+        if poll.status_code == 404:
+            result.outcome = "no_video"
+            return result
+        await asyncio.sleep(poll_interval)
+    result.outcome = "video_timeout"
+    return result
+
+
+def make_question_image(text: str) -> bytes:
+    """Render a question onto a small PNG for image-only traffic"""
+    import io
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (640, 120), "white")
+    ImageDraw.Draw(image).text((10, 45), text, fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
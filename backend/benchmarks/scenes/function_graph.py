@@ -0,0 +1,28 @@
+from manim import *
+
+
+class FunctionGraph(Scene):
+    """Axes, plotted functions and a moving tangent point"""
+
+    def construct(self):
+        title = Text("Graphing Functions", font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        axes = Axes(x_range=[-3, 3, 1], y_range=[-1, 9, 2], x_length=7, y_length=4.5).shift(DOWN * 0.5)
+        labels = axes.get_axis_labels(x_label="x", y_label="y")
+        self.play(Create(axes), Write(labels))
+
+        parabola = axes.plot(lambda x: x ** 2, color=YELLOW)
+        line = axes.plot(lambda x: 2 * x + 1, color=GREEN)
+        self.play(Create(parabola), run_time=2)
+        self.play(Create(line), run_time=1.5)
+
+        tracker = ValueTracker(-2.5)
+        dot = always_redraw(lambda: Dot(axes.c2p(tracker.get_value(), tracker.get_value() ** 2), color=RED))
+        self.play(FadeIn(dot))
+        self.play(tracker.animate.set_value(2.5), run_time=3)
+
+        area = axes.get_area(parabola, x_range=[0, 2], color=BLUE, opacity=0.4)
+        self.play(FadeIn(area))
+        self.wait(1)
+        self.play(FadeOut(VGroup(axes, labels, parabola, line, area, dot, title)))
@@ -0,0 +1,57 @@
+from manim import *
+
+
+class LongMultiStep(Scene):
+    """Long 10-step scene with many mobjects, close to the 30 s upper bound of the prompt"""
+
+    def construct(self):
+        title = Text("Dijkstra's Algorithm", font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        positions = {
+            "A": LEFT * 4, "B": LEFT * 1.5 + UP * 1.5, "C": LEFT * 1.5 + DOWN * 1.5,
+            "D": RIGHT * 1.5 + UP * 1.5, "E": RIGHT * 1.5 + DOWN * 1.5, "F": RIGHT * 4,
+        }
+        edges = [("A", "B", 4), ("A", "C", 2), ("B", "C", 1), ("B", "D", 5),
+                 ("C", "E", 8), ("D", "E", 2), ("D", "F", 6), ("E", "F", 3)]
+
+        nodes = {}
+        for name, pos in positions.items():
+            circle = Circle(radius=0.35, color=WHITE).move_to(pos + DOWN * 0.3)
+            label = Text(name, font_size=24).move_to(circle)
+            nodes[name] = VGroup(circle, label)
+        edge_mobs = []
+        for u, v, w in edges:
+            line = Line(nodes[u][0].get_center(), nodes[v][0].get_center(), buff=0.35, color=GREY)
+            weight = Text(str(w), font_size=20, color=YELLOW).move_to(line.get_center() + UP * 0.2)
+            edge_mobs.append(VGroup(line, weight))
+
+        self.play(LaggedStart(*[Create(n) for n in nodes.values()], lag_ratio=0.2))
+        self.play(LaggedStart(*[Create(e) for e in edge_mobs], lag_ratio=0.1))
+        self.wait(0.5)
+
+        order = ["A", "C", "B", "D", "E", "F"]
+        distances = {"A": 0, "C": 2, "B": 3, "D": 8, "E": 10, "F": 13}
+        caption = Text("Start at A", font_size=26).to_edge(DOWN)
+        self.play(Write(caption))
+        for step, name in enumerate(order, start=1):
+            new_caption = Text(f"Step {step}: visit {name}, distance {distances[name]}", font_size=26).to_edge(DOWN)
+            self.play(
+                nodes[name][0].animate.set_fill(GREEN, opacity=0.6),
+                Transform(caption, new_caption),
+                run_time=0.8,
+            )
+            self.play(Indicate(nodes[name]), run_time=0.6)
+            self.wait(0.4)
+
+        path = ["A", "C", "B", "D", "E", "F"]
+        highlights = [
+            Line(nodes[a][0].get_center(), nodes[b][0].get_center(), buff=0.35, color=RED, stroke_width=8)
+            for a, b in zip(path, path[1:])
+        ]
+        self.play(LaggedStart(*[Create(h) for h in highlights], lag_ratio=0.3), run_time=2)
+        summary = Text("Shortest path A -> F has length 13", font_size=28, color=GREEN).to_edge(DOWN)
+        self.play(Transform(caption, summary))
+        self.wait(2)
+        self.play(FadeOut(VGroup(*nodes.values(), *edge_mobs, *highlights, caption, title)))
+        self.wait(0.5)
@@ -0,0 +1,34 @@
+from manim import *
+
+
+class BubbleSortScene(Scene):
+    """Array of labelled boxes sorted with swap animations"""
+
+    def construct(self):
+        title = Text("Bubble Sort", font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        values = [5, 3, 8, 1, 4, 7, 2, 6]
+        boxes = VGroup(*[Square(side_length=0.8, color=WHITE) for _ in values]).arrange(RIGHT, buff=0.15)
+        labels = [Text(str(v), font_size=28).move_to(box) for v, box in zip(values, boxes)]
+        self.play(Create(boxes), *[Write(label) for label in labels])
+        self.wait(0.5)
+
+        n = len(values)
+        for i in range(n):
+            for j in range(n - i - 1):
+                self.play(boxes[j].animate.set_color(YELLOW), boxes[j + 1].animate.set_color(YELLOW), run_time=0.2)
+                if values[j] > values[j + 1]:
+                    values[j], values[j + 1] = values[j + 1], values[j]
+                    self.play(
+                        labels[j].animate.move_to(boxes[j + 1]),
+                        labels[j + 1].animate.move_to(boxes[j]),
+                        run_time=0.3,
+                    )
+                    labels[j], labels[j + 1] = labels[j + 1], labels[j]
+                self.play(boxes[j].animate.set_color(WHITE), boxes[j + 1].animate.set_color(WHITE), run_time=0.1)
+            self.play(boxes[n - i - 1].animate.set_color(GREEN), run_time=0.2)
+
+        done = Text("Sorted!", font_size=30, color=GREEN).next_to(boxes, DOWN, buff=0.6)
+        self.play(Write(done))
+        self.wait(1)
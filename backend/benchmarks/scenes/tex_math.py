@@ -0,0 +1,38 @@
+from manim import *
+
+
+class TexHeavyMath(Scene):
+    """LaTeX-heavy derivation: every MathTex compiles through latex and dvisvgm"""
+
+    def construct(self):
+        title = Tex(r"The Quadratic Formula", font_size=48, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        steps = [
+            r"ax^2 + bx + c = 0",
+            r"x^2 + \frac{b}{a}x = -\frac{c}{a}",
+            r"x^2 + \frac{b}{a}x + \frac{b^2}{4a^2} = \frac{b^2}{4a^2} - \frac{c}{a}",
+            r"\left(x + \frac{b}{2a}\right)^2 = \frac{b^2 - 4ac}{4a^2}",
+            r"x + \frac{b}{2a} = \pm\frac{\sqrt{b^2 - 4ac}}{2a}",
+            r"x = \frac{-b \pm \sqrt{b^2 - 4ac}}{2a}",
+        ]
+        current = MathTex(steps[0], font_size=44)
+        self.play(Write(current))
+        self.wait(0.5)
+        for step in steps[1:]:
+            nxt = MathTex(step, font_size=44)
+            self.play(TransformMatchingTex(current, nxt), run_time=1.2)
+            self.wait(0.4)
+            current = nxt
+
+        box = SurroundingRectangle(current, color=YELLOW)
+        self.play(Create(box))
+
+        identities = VGroup(
+            MathTex(r"\sin^2\theta + \cos^2\theta = 1"),
+            MathTex(r"e^{i\pi} + 1 = 0"),
+            MathTex(r"\sum_{k=1}^{n} k = \frac{n(n+1)}{2}"),
+            MathTex(r"\int_0^1 x^2\,dx = \frac{1}{3}"),
+        ).arrange(DOWN, buff=0.3).scale(0.8).to_edge(DOWN)
+        self.play(LaggedStart(*[Write(m) for m in identities], lag_ratio=0.3))
+        self.wait(1)
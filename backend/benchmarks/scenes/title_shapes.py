@@ -0,0 +1,34 @@
+from manim import *
+
+
+class TitleShapes(Scene):
+    """Title plus shapes: the structure of the example in _build_prompt"""
+
+    def construct(self):
+        title = Text("Concept Name", font_size=36, color=BLUE)
+        self.play(Write(title))
+        self.wait(1)
+
+        subtitle = Text("Step 1: Initial State", font_size=28).next_to(title, DOWN)
+        self.play(Write(subtitle))
+        self.wait(1)
+
+        circle = Circle(color=RED).shift(LEFT * 2)
+        square = Square(color=GREEN).shift(RIGHT * 2)
+        self.play(Create(circle), Create(square))
+        self.wait(1)
+
+        self.play(circle.animate.scale(1.5).set_color(PURPLE),
+                  square.animate.rotate(PI / 4).set_color(ORANGE))
+        self.wait(1)
+
+        line = Line(circle.get_center(), square.get_center(), color=YELLOW)
+        self.play(Create(line))
+        self.wait(1)
+
+        final_text = Text("Concept Complete!", font_size=30, color=GREEN).shift(DOWN * 2)
+        self.play(Write(final_text))
+        self.wait(2)
+
+        self.play(FadeOut(VGroup(title, subtitle, circle, square, line, final_text)))
+        self.wait(0.5)
@@ -0,0 +1,148 @@
+"""
+Statistics helpers shared by the benchmark and load-test drivers
+"""
+import json
+import math
+import os
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (pct in 0-100) of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, Optional[float]]:
+    """Count, mean and p50/p95/p99 of a list of latencies in seconds"""
+    if not values:
+        return {"count": 0, "mean": None, "p50": None, "p95": None, "p99": None, "max": None}
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values), 4),
+    }
+
+
+_SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})?\s+(\S+)$')
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+Sample = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def parse_prometheus_text(text: str) -> Dict[Sample, float]:
+    """Parse a /metrics scrape into {(name, sorted label pairs): value}"""
+    samples: Dict[Sample, float] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE_RE.match(line.strip())
+        if not match:
+            continue
+        name, _, labels, value = match.groups()
+        label_pairs = tuple(sorted(_LABEL_RE.findall(labels or "")))
+        try:
+            samples[(name, label_pairs)] = float(value.replace("+Inf", "inf"))
+        except ValueError:
+            continue
+    return samples
+
+
+def histogram_deltas(
+    before: Dict[Sample, float],
+    after: Dict[Sample, float],
+    name: str,
+) -> Dict[Tuple[Tuple[str, str], ...], Dict[str, float]]:
+    """
+    Bucket count deltas of one histogram between two scrapes.
+
+    Returns {series labels (without le): {le: delta_count}}.
+    """
+    series: Dict[Tuple[Tuple[str, str], ...], Dict[str, float]] = {}
+    for (sample_name, labels), value in after.items():
+        if sample_name != f"{name}_bucket":
+            continue
+        le = dict(labels)["le"]
+        key = tuple(pair for pair in labels if pair[0] != "le")
+        delta = value - before.get((sample_name, labels), 0.0)
+        series.setdefault(key, {})[le] = delta
+    return series
+
+
+def histogram_quantile(buckets: Dict[str, float], q: float) -> Optional[float]:
+    """Estimate a quantile from cumulative bucket counts (linear interpolation, like PromQL)"""
+    ordered = sorted(
+        ((float("inf") if le == "+Inf" else float(le), count) for le, count in buckets.items()),
+        key=lambda item: item[0],
+    )
+    if not ordered or ordered[-1][1] <= 0:
+        return None
+    total = ordered[-1][1]
+    target = q * total
+    previous_upper, previous_count = 0.0, 0.0
+    for upper, count in ordered:
+        if count >= target:
+            if math.isinf(upper):
+                return previous_upper
+            if count == previous_count:
+                return upper
+            return previous_upper + (upper - previous_upper) * (target - previous_count) / (count - previous_count)
+        previous_upper, previous_count = upper, count
+    return previous_upper
+
+
+def server_stage_report(before_text: str, after_text: str, histograms: List[str]) -> Dict[str, dict]:
+    """p50/p95/p99 per labelled series of each histogram, from two /metrics scrapes"""
+    before = parse_prometheus_text(before_text)
+    after = parse_prometheus_text(after_text)
+    report: Dict[str, dict] = {}
+    for name in histograms:
+        for labels, buckets in histogram_deltas(before, after, name).items():
+            count = buckets.get("+Inf", 0)
+            if count <= 0:
+                continue
+            series = name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+            report[series] = {
+                "count": int(count),
+                "p50": _round(histogram_quantile(buckets, 0.50)),
+                "p95": _round(histogram_quantile(buckets, 0.95)),
+                "p99": _round(histogram_quantile(buckets, 0.99)),
+            }
+    return report
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 4) if value is not None else None
+
+
+def save_report(report: dict, results_dir: str, prefix: str) -> str:
+    """Write a report as JSON under results_dir and return the path"""
+    os.makedirs(results_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(results_dir, f"{prefix}-{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    return path
+
+
+def compare_reports(baseline: dict, current: dict, key: str = "client") -> List[str]:
+    """Human-readable p50/p95 changes between two saved reports"""
+    lines = []
+    for stage, stats in sorted(current.get(key, {}).items()):
+        old = baseline.get(key, {}).get(stage)
+        if not old:
+            continue
+        for metric in ("p50", "p95"):
+            if stats.get(metric) is None or old.get(metric) in (None, 0):
+                continue
+            change = (stats[metric] - old[metric]) / old[metric] * 100
+            lines.append(f"{stage:<40} {metric}: {old[metric]:.3f}s -> {stats[metric]:.3f}s ({change:+.1f}%)")
+    return lines
@@ -2,31 +2,66 @@
 Main FastAPI application for the TMAS Chatbot
 """
 import os
+import base64
 import time
 from datetime import datetime
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse, PlainTextResponse
 from typing import Optional
 import re
 import asyncio
+import contextlib
+import json
 import uuid
 import types
+from contextlib import asynccontextmanager
 from fastapi import Response
 
 # Import our models and services
-from models import ChatRequest, ChatResponse, HealthResponse, InputType
-from services.ai_service import AIService
-from services.manim_service import ManimService
-from services.image_service import ImageService
+from models import BatchChatRequest, ChatRequest, EditRequest, ChatResponse, HealthResponse, InputType, LoopMonitorUpdate
+from services.batch_service import BatchRejected
+from services.container import ServiceContainer
+from services.jobs import Job, JobRejected
+from services.render_tiers import MODE_NONE
+from services.live_stream import PLAYLIST_MEDIA_TYPE, SEGMENT_MEDIA_TYPE
+from services.media_store import IMMUTABLE_CACHE_CONTROL, content_digest, etag_matches, strong_etag
+from services.scene_edits import SceneEditError, apply_edit_blocks, parse_edit_blocks, validate_scene
 from utils.config import settings
+from utils.tracing import tracer
+from utils.loop_monitor import loop_monitor
+from utils.metrics import (
+    metrics,
+    ABANDONED_REQUESTS,
+    FALLBACKS,
+    RENDER_QUEUE_DEPTH,
+    SCENE_EDITS,
+    TIMEOUTS,
+    TIME_TO_VIDEO_SECONDS,
+)
+
+# Services are built on first use; startup and shutdown run in the lifespan
+container = ServiceContainer()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background warm-ups on startup; stop them and flush traces on shutdown"""
+    await container.startup()
+    try:
+        yield
+    finally:
+        await container.shutdown()
+        tracer.shutdown()
+
 
 # Initialize FastAPI app
 app = FastAPI(
     title="TMAS Chatbot API",
     description="AI-powered chatbot with Manim animations",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Global exception handler
@@ -53,39 +88,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services
-ai_service = AIService()
-manim_service = ManimService()
-image_service = ImageService()
-
-# Mount static files for serving media
-os.makedirs(settings.MEDIA_DIR, exist_ok=True)
-app.mount("/media", StaticFiles(directory=settings.MEDIA_DIR), name="media")
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup"""
-    try:
-        # Validate configuration
-        settings.validate_config()
-        print("✅ Configuration validated successfully")
-        
-        # Ensure directories exist
-        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-        os.makedirs(settings.MEDIA_DIR, exist_ok=True)
-        
-        # Clean up any old temporary files
-        manim_service.cleanup_temp_files()
-        
-        print("🚀 Application started successfully")
-        print("ℹ️ AI service connection will be tested on first request")
-        
-    except Exception as e:
-        print(f"❌ Startup failed: {str(e)}")
-        raise
-
-
 @app.get("/", response_model=HealthResponse)
 async def root():
     """Root endpoint with health check"""
@@ -106,11 +108,27 @@ async def health_check():
     )
 
 
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and serving requests"""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: startup finished and configuration is valid"""
+    readiness = container.readiness()
+    readiness["timestamp"] = datetime.now().isoformat()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+
 @app.get("/health/ai")
 async def ai_health_check():
     """AI service health check endpoint"""
     try:
-        if await asyncio.wait_for(ai_service.test_connection(), timeout=30):
+        connected = await asyncio.wait_for(container.ai.test_connection(), timeout=30)
+        container.record_ai_connection(connected)
+        if connected:
             return {
                 "status": "healthy",
                 "ai_service": "connected",
@@ -137,12 +155,48 @@ async def ai_health_check():
         }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Prometheus text exposition of pipeline metrics"""
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/debug/loop-monitor")
+async def loop_monitor_status():
+    """Event loop monitor state and recent stalls (with stacks when LOOP_MONITOR_DEBUG_ENDPOINTS is on)"""
+    return loop_monitor.status(include_stacks=settings.LOOP_MONITOR_DEBUG_ENDPOINTS)
+
+
+@app.post("/debug/loop-monitor")
+async def update_loop_monitor(update: LoopMonitorUpdate):
+    """Turn the event loop monitor on or off and adjust its interval and threshold at runtime"""
+    if not settings.LOOP_MONITOR_DEBUG_ENDPOINTS:
+        # Unauthenticated: only available when explicitly switched on
+        raise HTTPException(status_code=403, detail="Runtime loop monitor changes are disabled (LOOP_MONITOR_DEBUG_ENDPOINTS)")
+    loop_monitor.configure(
+        interval=update.interval_ms / 1000 if update.interval_ms is not None else None,
+        threshold=update.threshold_ms / 1000 if update.threshold_ms is not None else None,
+    )
+    if update.enabled is True:
+        loop_monitor.start()
+    elif update.enabled is False:
+        await loop_monitor.stop()
+    return loop_monitor.status(include_stacks=False)
+
+
 @app.post("/chat")
 async def chat_endpoint(
+    request: Request,
     text: Optional[str] = Form(None, description="Text input from user"),
-    image: Optional[UploadFile] = File(None, description="Image file upload")
+    image: Optional[UploadFile] = File(None, description="Image file upload"),
+    respond_async: bool = Query(False, description="Answer 202 with a job id instead of waiting for the video")
 ):
-    try:
+    request_start = time.perf_counter()
+    request_id = str(uuid.uuid4())
+    with tracer.span("POST /chat", request_id=request_id, endpoint="/chat") as request_span:
         if not text and not image:
             raise HTTPException(status_code=400, detail="Either text or image must be provided")
         if text and image:
@@ -151,66 +205,46 @@ async def chat_endpoint(
             input_type = InputType.TEXT_ONLY
         else:
             input_type = InputType.IMAGE_ONLY
-        image_path = None
+        image_base64 = None
         if image:
-            if not image_service.is_supported_format(image.filename):
+            if not container.images.is_supported_format(image.filename):
                 raise HTTPException(status_code=400, detail="Unsupported image format. Supported: JPG, PNG, BMP, TIFF")
             image_content = await image.read()
-            image_base64 = f"data:image/{image.content_type};base64,{image_content.hex()}"
-            image_path, extracted_text = await image_service.process_image(image_base64)
+            image_base64 = f"data:{image.content_type};base64,{base64.b64encode(image_content).decode('ascii')}"
+        request_span.set_attribute("input_type", input_type.value)
+        if _wants_async(request, respond_async):
+            return _submit_job(
+                "chat",
+                lambda job: _answer_chat(text, image_base64, input_type, request_start, job),
+            )
+        return await _answer_chat(text, image_base64, input_type, request_start)
+
+
+async def _answer_chat(
+    text: Optional[str],
+    image_base64: Optional[str],
+    input_type: InputType,
+    request_start: float,
+    job: Optional[Job] = None,
+) -> dict:
+    """Explanation and base64 video for /chat, run in the request or as a job"""
+    span = tracer.current_span()
+    try:
+        image_path = None
+        if image_base64:
+            image_path, extracted_text = await container.images.process_image(image_base64)
             if text and extracted_text:
                 text = f"{text}\n\nImage content: {extracted_text}"
             elif extracted_text:
                 text = extracted_text
-        print("Calling AI service for /chat...")
+        span.set_attributes(input_type=input_type.value, text_chars=len(text or ""))
+        tracer.log("Calling AI service")
         start_time = time.time()
-        
-        # Test connection on first request
-        if not hasattr(ai_service, '_connection_tested'):
-            try:
-                print("Testing AI service connection...")
-                if await asyncio.wait_for(ai_service.test_connection(), timeout=10):
-                    print("✅ AI service connection successful")
-                else:
-                    print("⚠️ AI service connection failed, but continuing...")
-                ai_service._connection_tested = True
-            except Exception as e:
-                print(f"⚠️ AI service connection test failed: {str(e)}, but continuing...")
-                ai_service._connection_tested = True
-        
-        try:
-            explanation, manim_code = await asyncio.wait_for(
-                ai_service.generate_response(text=text, image_path=image_path),
-                timeout=300 
-            )
-            elapsed_time = time.time() - start_time
-            print(f"AI service returned for /chat in {elapsed_time:.2f} seconds.")
-        except asyncio.TimeoutError:
-            print("AI service timed out for /chat, trying fallback mode...")
-            try:
-                # Fallback: try with a simpler prompt that can still generate animations
-                fallback_prompt = f"Please provide a clear explanation and create a simple animation that specifically demonstrates: {text}"
-                explanation, manim_code = await asyncio.wait_for(
-                    ai_service.generate_simple_animation_response(fallback_prompt),
-                    timeout=60  # shorter timeout for fallback
-                )
-                print("Fallback AI service returned for /chat.")
-            except asyncio.TimeoutError:
-                print("Fallback AI service also timed out for /chat.")
-                raise HTTPException(status_code=504, detail="AI service timed out after 300 seconds. Please try a simpler question or try again later.")
-        except Exception as e:
-            print(f"AI service error for /chat: {str(e)}")
-            # Try fallback even for other errors
-            try:
-                fallback_prompt = f"Please provide a clear explanation and create a simple animation that specifically demonstrates: {text}"
-                explanation, manim_code = await asyncio.wait_for(
-                    ai_service.generate_simple_animation_response(fallback_prompt),
-                    timeout=60
-                )
-                print("Fallback AI service returned for /chat after error.")
-            except Exception as fallback_error:
-                print(f"Fallback also failed: {str(fallback_error)}")
-                raise HTTPException(status_code=503, detail=f"AI service unavailable: {str(e)}")
+        if job:
+            job.set_stage("answering")
+    
+        explanation, manim_code, llm_source = await _generate_answer(text, image_path, start_time)
+        span.set_attribute("llm.source", llm_source)
         if image_path and os.path.exists(image_path):
             try:
                 os.remove(image_path)
@@ -218,274 +252,675 @@ async def chat_endpoint(
                 print(f"Failed to clean up image file: {e}")
         # If Manim code is present, return base64 video
         video_base64 = None
+        render_tier = None
         if manim_code:
             match = re.search(r'class\s+(\w+)\(Scene\):', manim_code)
             class_name = match.group(1) if match else "ConceptAnimation"
-            try:
-                video_base64 = await asyncio.wait_for(
-                    manim_service.generate_animation_base64(manim_code, class_name=class_name),
-                    timeout=180  # 3 minutes for Manim generation
-                )
-            except asyncio.TimeoutError:
-                print("Manim generation timed out, returning explanation only")
-                video_base64 = None
+            if job:
+                job.set_stage("rendering")
+            # A job's render is background work, like /chat/stream's, and counts toward the queue depth
+            with RENDER_QUEUE_DEPTH.track_inprogress() if job else contextlib.nullcontext():
+                tier = container.manim.select_tier()
+                render_tier = tier.name
+                span.set_attributes(class_name=class_name, code_bytes=len(manim_code), render_tier=render_tier)
+                if tier.mode == MODE_NONE:
+                    FALLBACKS.inc(stage="render", reason="load_shed")
+                try:
+                    video_base64 = await asyncio.wait_for(
+                        container.manim.generate_animation_base64(manim_code, class_name=class_name, tier=tier),
+                        timeout=180  # 3 minutes for Manim generation
+                    )
+                    if video_base64:
+                        TIME_TO_VIDEO_SECONDS.observe(time.perf_counter() - request_start, endpoint="chat")
+                        span.set_attribute("video_base64_chars", len(video_base64))
+                except asyncio.TimeoutError:
+                    tracer.log("Manim generation timed out, returning explanation only")
+                    TIMEOUTS.inc(stage="render")
+                    FALLBACKS.inc(stage="render", reason="timeout")
+                    video_base64 = None
         return {
             "success": True,
             "explanation": explanation,
             "video_base64": video_base64,
+            "render_tier": render_tier,
             "error_message": None,
             "input_type": input_type
         }
     except HTTPException:
         raise
     except Exception as e:
+        span.record_exception(e)
         return {
             "success": False,
             "explanation": "",
             "video_base64": None,
             "error_message": str(e),
-            "input_type": input_type if 'input_type' in locals() else InputType.TEXT_ONLY
+            "input_type": input_type
+        }
+
+
+def _wants_async(request: Request, respond_async: bool) -> bool:
+    """Client opted into a 202 + job id answer (query flag or RFC 7240 Prefer header)"""
+    return respond_async or "respond-async" in request.headers.get("prefer", "").lower()
+
+
+def _submit_job(kind: str, run) -> JSONResponse:
+    """Run `run(job)` as a background job and answer 202 Accepted with where to find it"""
+    try:
+        job = container.jobs.submit(kind, lambda job: _encoded(run(job)))
+    except JobRejected as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    tracer.current_span().set_attribute("job_id", job.id)
+    status_url = f"/jobs/{job.id}"
+    return JSONResponse(
+        status_code=202,
+        content={
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": status_url,
+            "events_url": f"{status_url}/events",
+        },
+        headers={"Location": status_url, "Preference-Applied": "respond-async"},
+    )
+
+
+async def _encoded(result):
+    """JSON-ready job result (pydantic models and enums included)"""
+    return jsonable_encoder(await result)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of an asynchronous chat job; `result` holds the endpoint's response once it succeeded"""
+    job = container.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events with the job's status on every change, until it finishes"""
+    job = container.jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        version = -1
+        while True:
+            if job.version != version:
+                version = job.version
+                yield f"event: status\ndata: {json.dumps(job.to_dict())}\n\n"
+                if job.finished:
+                    return
+            elif not await job.wait_for_change(version, timeout=15):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: BatchChatRequest):
+    """
+    Answer many prompts as one background batch (bulk lesson generation).
+
+    Answers 202 with a batch id; GET /chat/batch/{batch_id} has the
+    aggregate progress and each item's explanation and video URL.
+    """
+    with tracer.span("POST /chat/batch", endpoint="/chat/batch", items=len(request.prompts)) as span:
+        prompts = [prompt.strip() for prompt in request.prompts]
+        if not prompts or not all(prompts):
+            raise HTTPException(status_code=400, detail="prompts must be a non-empty list of non-empty strings")
+        if len(prompts) > settings.BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_ITEMS} prompts per batch")
+        use_batches_api = settings.BATCH_USE_MESSAGE_BATCHES_API if request.use_batches_api is None else request.use_batches_api
+        try:
+            batch = container.batches.submit(prompts, use_batches_api=use_batches_api)
+        except BatchRejected as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        span.set_attribute("batch_id", batch.id)
+        status_url = f"/chat/batch/{batch.id}"
+        return JSONResponse(
+            status_code=202,
+            content={
+                "batch_id": batch.id,
+                "status_url": status_url,
+                "items": [{"index": item.index, "request_id": item.request_id} for item in batch.items],
+            },
+            headers={"Location": status_url},
+        )
+
+
+@app.get("/chat/batch/{batch_id}")
+async def get_batch(batch_id: str, include_items: bool = Query(True, description="Include per-item results")):
+    """Aggregate progress of a batch and, unless include_items=false, each item's result"""
+    batch = container.batches.get(batch_id)
+    if batch is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return batch.to_dict(include_items=include_items)
+
+
+@app.post("/chat/edit")
+async def chat_edit_endpoint(request: EditRequest):
+    """
+    Change the animation of an earlier answer instead of asking a new question.
+
+    The model returns SEARCH/REPLACE blocks against the stored scene code
+    rather than a whole new scene, so an edit costs a small share of the
+    tokens. The edited scene renders in the background in its lineage's
+    directory, where manim reuses every animation segment the edit did not
+    touch; poll video_status_url like after /chat/stream.
+    """
+    request_start = time.perf_counter()
+    request_id = str(uuid.uuid4())
+    with tracer.span("POST /chat/edit", request_id=request_id, parent_id=request.request_id, endpoint="/chat/edit") as span:
+        instruction = request.instruction.strip()
+        if not instruction:
+            raise HTTPException(status_code=400, detail="instruction must not be empty")
+        parent = container.manim.scenes.get(request.request_id)
+        if parent is None:
+            SCENE_EDITS.inc(outcome="missing_scene")
+            raise HTTPException(status_code=404, detail="No stored animation for this request id (it may have expired)")
+        span.set_attribute("lineage_id", parent["lineage_id"])
+
+        feedback = None
+        edited = None
+        for attempt in range(1, settings.SCENE_EDIT_MAX_ATTEMPTS + 1):
+            try:
+                reply = await container.ai.generate_scene_edit(parent["code"], instruction, feedback=feedback)
+            except asyncio.TimeoutError:
+                TIMEOUTS.inc(stage="llm")
+                raise HTTPException(status_code=504, detail="AI service timed out. Please try again later.")
+            except Exception as e:
+                raise HTTPException(status_code=503, detail=f"AI service unavailable: {str(e)}")
+            summary, blocks = parse_edit_blocks(reply)
+            try:
+                code = apply_edit_blocks(parent["code"], blocks)
+                class_name = validate_scene(code)
+            except SceneEditError as e:
+                tracer.log("Scene edit rejected", attempt=attempt, error=str(e))
+                feedback = str(e)
+                continue
+            edited = (summary, blocks, code, class_name)
+            break
+        if edited is None:
+            SCENE_EDITS.inc(outcome="invalid_edit")
+            raise HTTPException(status_code=422, detail=f"Could not apply the requested edit: {feedback}")
+        summary, blocks, code, class_name = edited
+        SCENE_EDITS.inc(outcome="applied")
+        span.set_attributes(attempts=attempt, edit_blocks=len(blocks), class_name=class_name)
+
+        async def run_edit_render():
+            with tracer.span("animation.edit", class_name=class_name, parent_id=parent["request_id"]):
+                try:
+                    video_path, error = await container.manim.render_scene_edit(
+                        request_id, code, class_name, parent, instruction
+                    )
+                    if error is not None:
+                        # One debugger pass: the edit itself was already validated
+                        tracer.log("Edited scene failed to render, debugging", error_class=_error_class(error))
+                        fixed_code = await container.ai.debug_manim_code(code, error)
+                        video_path, error = await container.manim.render_scene_edit(
+                            request_id, fixed_code, class_name, parent, instruction
+                        )
+                    if video_path:
+                        TIME_TO_VIDEO_SECONDS.observe(time.perf_counter() - request_start, endpoint="chat_edit")
+                    else:
+                        container.manim.no_video_requests.add(request_id)
+                except asyncio.CancelledError:
+                    container.manim.no_video_requests.add(request_id)
+                    raise
+                except Exception as e:
+                    tracer.current_span().record_exception(e)
+                    tracer.log("Edit render failed", error=str(e))
+                    container.manim.no_video_requests.add(request_id)
+                finally:
+                    RENDER_QUEUE_DEPTH.dec()
+
+        RENDER_QUEUE_DEPTH.inc()
+        container.abandonment.register(request_id, asyncio.create_task(run_edit_render()))
+        return {
+            "success": True,
+            "request_id": request_id,
+            "parent_request_id": parent["request_id"],
+            "explanation": summary,
+            "changes": [{"search": search, "replace": replace} for search, replace in blocks],
+            "video_url": f"/chat/video/{request_id}",
+            "video_status_url": f"/chat/video_status/{request_id}",
         }
 
+
+async def _unless_disconnected(request: Request, awaitable, poll_interval: float = 0.5):
+    """
+    Await `awaitable`, cancelling it if the client disconnects first.
+
+    Closing the tab otherwise leaves the LLM call running to completion for
+    an answer nobody reads. Raises HTTPException 499 (client closed request).
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if settings.ABANDON_CANCEL_ENABLED and await request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                ABANDONED_REQUESTS.inc(reason="disconnect")
+                tracer.log("Client disconnected, LLM call cancelled")
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 @app.post("/chat/stream")
 async def chat_stream_endpoint(
+    request: Request,
     text: Optional[str] = Form(None, description="Text input from user"),
     image: Optional[UploadFile] = File(None, description="Image file upload")
 ):
+    request_start = time.perf_counter()
+    request_id = str(uuid.uuid4())
     headers = {
         "Access-Control-Allow-Origin": "https://tmas-internship.vercel.app",
         "Access-Control-Allow-Credentials": "true",
         "Access-Control-Allow-Headers": "*"
     }
-    try:
-        if not text and not image:
-            raise HTTPException(status_code=400, detail="Either text or image must be provided")
-        if text and image:
-            input_type = InputType.TEXT_AND_IMAGE
-        elif text:
-            input_type = InputType.TEXT_ONLY
-        else:
-            input_type = InputType.IMAGE_ONLY
-        image_path = None
-        if image:
-            if not image_service.is_supported_format(image.filename):
-                raise HTTPException(status_code=400, detail="Unsupported image format. Supported: JPG, PNG, BMP, TIFF")
-            image_content = await image.read()
-            image_base64 = f"data:image/{image.content_type};base64,{image_content.hex()}"
-            image_path, extracted_text = await image_service.process_image(image_base64)
-            if text and extracted_text:
-                text = f"{text}\n\nImage content: {extracted_text}"
-            elif extracted_text:
-                text = extracted_text
-        print("Calling AI service for /chat/stream...")
-        start_time = time.time()
-        
-        # Test connection on first request
-        if not hasattr(ai_service, '_connection_tested'):
-            try:
-                print("Testing AI service connection...")
-                if await asyncio.wait_for(ai_service.test_connection(), timeout=10):
-                    print("✅ AI service connection successful")
-                else:
-                    print("⚠️ AI service connection failed, but continuing...")
-                ai_service._connection_tested = True
-            except Exception as e:
-                print(f"⚠️ AI service connection test failed: {str(e)}, but continuing...")
-                ai_service._connection_tested = True
-        
+    with tracer.span("POST /chat/stream", request_id=request_id, endpoint="/chat/stream") as request_span:
         try:
-            explanation, manim_code = await asyncio.wait_for(
-                ai_service.generate_response(text=text, image_path=image_path),
-                timeout=300  # seconds - increased from 60
+            if not text and not image:
+                raise HTTPException(status_code=400, detail="Either text or image must be provided")
+            if text and image:
+                input_type = InputType.TEXT_AND_IMAGE
+            elif text:
+                input_type = InputType.TEXT_ONLY
+            else:
+                input_type = InputType.IMAGE_ONLY
+            image_path = None
+            if image:
+                if not container.images.is_supported_format(image.filename):
+                    raise HTTPException(status_code=400, detail="Unsupported image format. Supported: JPG, PNG, BMP, TIFF")
+                image_content = await image.read()
+                image_base64 = f"data:{image.content_type};base64,{base64.b64encode(image_content).decode('ascii')}"
+                image_path, extracted_text = await container.images.process_image(image_base64)
+                if text and extracted_text:
+                    text = f"{text}\n\nImage content: {extracted_text}"
+                elif extracted_text:
+                    text = extracted_text
+            request_span.set_attributes(input_type=input_type.value, text_chars=len(text or ""))
+            tracer.log("Calling AI service")
+            start_time = time.time()
+        
+            explanation, manim_code, llm_source = await _unless_disconnected(
+                request, _generate_answer(text, image_path, start_time)
             )
-            elapsed_time = time.time() - start_time
-            print(f"AI service returned for /chat/stream in {elapsed_time:.2f} seconds.")
-            print(f"[Main] Explanation length: {len(explanation)}")
-            print(f"[Main] Manim code length: {len(manim_code) if manim_code else 0}")
+            request_span.set_attribute("llm.source", llm_source)
+            if image_path and os.path.exists(image_path):
+                try:
+                    os.remove(image_path)
+                except Exception as e:
+                    print(f"Failed to clean up image file: {e}")
+            request_span.set_attribute("code_bytes", len(manim_code) if manim_code else 0)
+        
             if manim_code:
-                print(f"[Main] Manim code starts with: {manim_code[:100]}...")
+                try:
+                    match = re.search(r'class\s+(\w+)\(Scene\):', manim_code)
+                    class_name = match.group(1) if match else "ConceptAnimation"
+                    request_span.set_attribute("class_name", class_name)
+
+                    async def run_manim_task():
+                        with tracer.span("animation", class_name=class_name) as animation_span:
+                            try:
+                                # Chosen once so retries keep the quality the job started with
+                                tier = container.manim.select_tier()
+                                animation_span.set_attribute("render_tier", tier.name)
+                                # Templates are pre-validated: a failure there is not a code bug to debug
+                                max_attempts = 1 if llm_source == "template" else 3
+                                attempt = 0
+                                current_code = manim_code
+                                last_error = None
+                                while attempt < max_attempts:
+                                    with tracer.span(
+                                        "render.attempt",
+                                        attempt=attempt + 1,
+                                        class_name=class_name,
+                                        code_bytes=len(current_code),
+                                    ) as attempt_span:
+                                        video_path, error, code_used = await container.manim.render_and_store_video(
+                                            current_code, class_name, request_id, tier=tier
+                                        )
+                                        if error is None:
+                                            if video_path:
+                                                tracer.log("Manim succeeded", attempt=attempt + 1)
+                                                attempt_span.set_attribute("video_bytes", os.path.getsize(video_path))
+                                                TIME_TO_VIDEO_SECONDS.observe(
+                                                    time.perf_counter() - request_start, endpoint="chat_stream"
+                                                )
+                                            break
+                                        attempt_span.status = "error"
+                                        attempt_span.set_attribute("error.class", _error_class(error))
+                                        last_error = error
+                                        if attempt + 1 >= max_attempts:
+                                            break
+                                        try:
+                                            fixed_code = await container.ai.debug_manim_code(code_used, error)
+                                            tracer.log("AI debugger returned fixed code, retrying", attempt=attempt + 1)
+                                            current_code = fixed_code
+                                        except Exception as debug_exc:
+                                            tracer.log("AI debugger failed", attempt=attempt + 1, error=str(debug_exc))
+                                            break
+                                    attempt += 1
+                                if last_error is not None and video_path is None:
+                                    if llm_source != "template" and await _render_template_fallback(
+                                        text, explanation, request_id, tier
+                                    ):
+                                        tracer.log("LLM code failed, rendered matching template instead")
+                                    else:
+                                        tracer.log("All Manim attempts failed, marking as no video")
+                                        container.manim.no_video_requests.add(request_id)
+                            except asyncio.CancelledError:
+                                tracer.log("Manim task cancelled, client left")
+                                container.manim.no_video_requests.add(request_id)
+                                raise
+                            except Exception as e:
+                                tracer.current_span().record_exception(e)
+                                tracer.log("Manim task failed", error=str(e))
+                                container.manim.no_video_requests.add(request_id)
+                            finally:
+                                RENDER_QUEUE_DEPTH.dec()
+
+                    RENDER_QUEUE_DEPTH.inc()
+                    task = asyncio.create_task(run_manim_task())
+                    # Cancelled if the client disconnects mid-stream or stops polling for the video
+                    container.abandonment.register(request_id, task)
+                    tracer.log("Created Manim task", class_name=class_name)
+                except Exception as e:
+                    request_span.record_exception(e)
+                    tracer.log("Failed to start Manim task", error=str(e))
+                    container.manim.no_video_requests.add(request_id)
             else:
-                print("[Main] No Manim code generated by AI service")
-        except asyncio.TimeoutError:
-            print("AI service timed out for /chat/stream, trying fallback mode...")
-            try:
-                # Fallback: try with a simpler prompt that can still generate animations
-                fallback_prompt = f"Please provide a clear explanation and create a simple animation that specifically demonstrates: {text}"
-                explanation, manim_code = await asyncio.wait_for(
-                    ai_service.generate_simple_animation_response(fallback_prompt),
-                    timeout=60  # shorter timeout for fallback
-                )
-                print("Fallback AI service returned for /chat/stream.")
-                print(f"[Main] Fallback explanation length: {len(explanation)}")
-                print(f"[Main] Fallback Manim code length: {len(manim_code) if manim_code else 0}")
-                if manim_code:
-                    print(f"[Main] Fallback Manim code starts with: {manim_code[:100]}...")
-                else:
-                    print("[Main] No Manim code generated by fallback AI service")
-            except asyncio.TimeoutError:
-                print("Fallback AI service also timed out for /chat/stream.")
-                raise HTTPException(status_code=504, detail="AI service timed out after 300 seconds. Please try a simpler question or try again later.")
+                tracer.log("No Manim code found, marking as no video")
+                container.manim.no_video_requests.add(request_id)
+
+            async def text_streamer():
+                # Runs in the server's response task, so the span is parented explicitly
+                deliver_span = tracer.start_span("deliver.text", parent=request_span, explanation_chars=len(explanation))
+                delivered = False
+                try:
+                    for word in explanation.split():
+                        yield word + " "
+                        container.abandonment.touch(request_id)
+                        await asyncio.sleep(0.03)
+                    yield f"\n[REQUEST_ID:{request_id}]\n"
+                    delivered = True
+                except Exception as e:
+                    deliver_span.record_exception(e)
+                    # If streaming fails, yield the error message
+                    yield f"\nError during streaming: {str(e)}\n"
+                finally:
+                    if not delivered:
+                        # Disconnected before the request id arrived: nobody can fetch the video
+                        deliver_span.set_attribute("client_disconnected", True)
+                        container.abandonment.abandon(request_id, "disconnect")
+                    tracer.end_span(deliver_span)
+            return StreamingResponse(text_streamer(), media_type="text/plain")
+        except HTTPException:
+            raise
         except Exception as e:
-            print(f"AI service error for /chat/stream: {str(e)}")
-            # Try fallback even for other errors
-            try:
-                fallback_prompt = f"Please provide a clear explanation and create a simple animation that specifically demonstrates: {text}"
-                explanation, manim_code = await asyncio.wait_for(
-                    ai_service.generate_simple_animation_response(fallback_prompt),
-                    timeout=60
-                )
-                print("Fallback AI service returned for /chat/stream after error.")
-            except Exception as fallback_error:
-                print(f"Fallback also failed: {str(fallback_error)}")
-                raise HTTPException(status_code=503, detail=f"AI service unavailable: {str(e)}")
-        if image_path and os.path.exists(image_path):
-            try:
-                os.remove(image_path)
-            except Exception as e:
-                print(f"Failed to clean up image file: {e}")
-        request_id = str(uuid.uuid4())
-        print(f"[Main] Generated request_id: {request_id}")
-        print(f"[Main] manim_code is None: {manim_code is None}")
-        print(f"[Main] manim_code length: {len(manim_code) if manim_code else 0}")
-        
-        if manim_code:
-            print(f"[Main] Manim code found, processing...")
-            try:
-                match = re.search(r'class\s+(\w+)\(Scene\):', manim_code)
-                class_name = match.group(1) if match else "ConceptAnimation"
-                print(f"[Main] Manim code detected, class_name: {class_name}")
-                print(f"[Main] Manim code preview: {manim_code[:200]}...")
-
-                async def run_manim_task():
-                    try:
-                        print(f"[Main] Starting Manim task for request_id: {request_id}")
-                        max_attempts = 3
-                        attempt = 0
-                        current_code = manim_code
-                        last_error = None
-                        while attempt < max_attempts:
-                            print(f"[Main] Manim attempt {attempt+1} for request_id: {request_id}")
-                            video_path, error, code_used = await manim_service.render_and_store_video(current_code, class_name, request_id)
-                            if error is None:
-                                print(f"[Main] Manim succeeded on attempt {attempt+1} for request_id: {request_id}")
-                                break
-                            else:
-                                print(f"[Main] Manim failed on attempt {attempt+1} with error: {error}")
-                                last_error = error
-                                try:
-                                    fixed_code = await ai_service.debug_manim_code(code_used, error)
-                                    print(f"[Main] AI debugger returned fixed code on attempt {attempt+1}. Retrying...")
-                                    current_code = fixed_code
-                                except Exception as debug_exc:
-                                    print(f"[Main] AI debugger failed on attempt {attempt+1}: {debug_exc}")
-                                    manim_service.no_video_requests.add(request_id)
-                                    return
-                            attempt += 1
-                        else:
-                            print(f"[Main] All Manim attempts failed for request_id: {request_id}. Marking as no video.")
-                            manim_service.no_video_requests.add(request_id)
-                    except Exception as e:
-                        print(f"[Main] Manim task failed for request_id {request_id}: {str(e)}")
-                        import traceback
-                        print(f"[Main] Full traceback: {traceback.format_exc()}")
-                        manim_service.no_video_requests.add(request_id)
-
-                task = asyncio.create_task(run_manim_task())
-                print(f"[Main] Created Manim task for request_id: {request_id}, task: {task}")
-            except Exception as e:
-                print(f"Failed to start Manim task: {str(e)}")
-                import traceback
-                print(f"Full traceback: {traceback.format_exc()}")
-                manim_service.no_video_requests.add(request_id)
+            request_span.record_exception(e)
+            error_message = str(e)
+            async def error_stream():
+                yield f"Sorry, I encountered an error: {error_message}"
+            return StreamingResponse(error_stream(), media_type="text/plain", headers=headers)
+
+
+async def _generate_answer(text: Optional[str], image_path: Optional[str], start_time: float):
+    """
+    (explanation, manim_code, llm_source) for a question.
+
+    Answers precomputed offline (precompute.py) are served without an API
+    call. Questions that match an animation template get only an
+    explanation from the LLM and the template's code; everything else goes
+    through the hedged generate call. LLM failures become 504/503 HTTPExceptions.
+    """
+    precomputed = None if image_path else await asyncio.to_thread(container.ai.precomputed_response, text)
+    if precomputed:
+        tracer.log("Serving precomputed answer", code_bytes=len(precomputed[1]))
+        return precomputed[0], precomputed[1], "precomputed"
+    # Off the event loop: parameter extraction parses and samples user expressions
+    template_match = None if image_path else await asyncio.to_thread(container.templates.match, text)
+    try:
+        if template_match:
+            explanation, manim_code, llm_source = await container.ai.generate_template_response(text, template_match)
         else:
-            print(f"[Main] No Manim code found, skipping animation generation")
-            manim_service.no_video_requests.add(request_id)
-            print(f"[Main] Marked request {request_id} as no video")
-        async def text_streamer():
-            try:
-                for word in explanation.split():
-                    yield word + " "
-                    await asyncio.sleep(0.03)
-                yield f"\n[REQUEST_ID:{request_id}]\n"
-            except Exception as e:
-                # If streaming fails, yield the error message
-                yield f"\nError during streaming: {str(e)}\n"
-        return StreamingResponse(text_streamer(), media_type="text/plain")
-    except HTTPException:
-        raise
+            explanation, manim_code, llm_source = await container.ai.generate_hedged_response(
+                text=text, image_path=image_path, timeout=300
+            )
+        tracer.log(
+            "AI service returned",
+            elapsed_s=round(time.time() - start_time, 2),
+            source=llm_source,
+            explanation_chars=len(explanation),
+            code_bytes=len(manim_code) if manim_code else 0,
+        )
+    except asyncio.TimeoutError:
+        tracer.log("AI service and fallback timed out")
+        TIMEOUTS.inc(stage="llm")
+        raise HTTPException(status_code=504, detail="AI service timed out after 300 seconds. Please try a simpler question or try again later.")
     except Exception as e:
-        error_message = str(e)
-        async def error_stream():
-            yield f"Sorry, I encountered an error: {error_message}"
-        return StreamingResponse(error_stream(), media_type="text/plain", headers=headers)
+        tracer.log("AI service and fallback failed", error=str(e))
+        raise HTTPException(status_code=503, detail=f"AI service unavailable: {str(e)}")
+    if llm_source == "fallback":
+        FALLBACKS.inc(stage="llm", reason="hedge")
+    elif llm_source in ("cache", "degraded"):
+        FALLBACKS.inc(stage="llm", reason=f"circuit_open_{llm_source}")
+    return explanation, manim_code, llm_source
+
+
+async def _render_template_fallback(question: Optional[str], explanation: str, request_id: str, tier) -> bool:
+    """After LLM code failed every attempt, try a matching template before giving up on video"""
+    template_match = await asyncio.to_thread(container.templates.match, question, explanation, stage="fallback")
+    if not template_match:
+        return False
+    FALLBACKS.inc(stage="render", reason="template")
+    video_path, error, _ = await container.manim.render_and_store_video(
+        template_match.code, template_match.class_name, request_id, tier=tier
+    )
+    return error is None and video_path is not None
+
+
+def _error_class(error: str) -> str:
+    """Best-effort Python exception class name from a Manim stderr dump"""
+    matches = re.findall(r'^\s*(\w+(?:Error|Exception|Interrupt))\b', error or "", re.MULTILINE)
+    if matches:
+        return matches[-1]
+    if error and "timed out" in error:
+        return "Timeout"
+    return "Unknown"
+
+
+def _tier_headers(request_id: str) -> dict:
+    """X-Render-Tier header for responses about a rendered (or skipped) video"""
+    tier = container.manim.video_tiers.get(request_id)
+    return {"X-Render-Tier": tier} if tier else {}
+
 
 @app.get("/chat/video/{request_id}")
-async def get_video(request_id: str):
-    video_path = manim_service.get_video_path(request_id)
-    if video_path and os.path.exists(video_path):
-        return FileResponse(video_path, media_type="video/mp4")
-    else:
+async def get_video(request_id: str, request: Request):
+    with tracer.span("GET /chat/video", request_id=request_id) as span:
+        container.abandonment.touch(request_id)
+        live = container.manim.live.get(request_id)
+        if live is not None and PLAYLIST_MEDIA_TYPE in request.headers.get("accept", "").lower():
+            # An HLS player can start on the animations rendered so far
+            span.set_attributes(live_segments=len(live.segments), live_finished=live.finished)
+            return _live_playlist(live)
+        video_path, media_type = container.manim.get_video_variant(request_id, request.headers.get("accept", ""))
+        if video_path and os.path.exists(video_path):
+            headers = {**_tier_headers(request_id), "Vary": "Accept"}
+            digest = content_digest(video_path)
+            if digest:
+                # The request id URL answers 202 until the render is done: revalidate rather than cache forever
+                headers.update({"ETag": strong_etag(digest), "Cache-Control": "no-cache"})
+                if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+                    span.set_attribute("not_modified", True)
+                    return Response(status_code=304, headers=headers)
+            span.set_attributes(video_bytes=os.path.getsize(video_path), media_type=media_type)
+            return FileResponse(video_path, media_type=media_type, headers=headers)
+        span.set_attribute("ready", False)
         return Response(status_code=202)  # 202 Accepted, not ready yet
+
+
+@app.get("/chat/video/{request_id}/live.m3u8")
+async def get_live_playlist(request_id: str):
+    """
+    HLS playlist of the render in progress, one segment per finished animation.
+
+    The playlist grows while manim renders and ends with #EXT-X-ENDLIST once
+    the render is over; players poll it like any live EVENT playlist.
+    """
+    container.abandonment.touch(request_id)
+    live = container.manim.live.get(request_id)
+    if live is None:
+        raise HTTPException(status_code=404, detail="No live stream for this request")
+    return _live_playlist(live)
+
+
+@app.get("/chat/video/{request_id}/live/{segment}")
+async def get_live_segment(request_id: str, segment: str):
+    container.abandonment.touch(request_id)
+    path = container.manim.live.segment_path(request_id, segment)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Segment not found")
+    # A retried render republishes segments under the same names
+    return FileResponse(path, media_type=SEGMENT_MEDIA_TYPE, headers={"Cache-Control": "no-cache"})
+
+
+def _live_playlist(live) -> Response:
+    return Response(
+        content=live.playlist(),
+        media_type=PLAYLIST_MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "Vary": "Accept", **_tier_headers(live.request_id)},
+    )
+
+
+@app.get("/chat/video_status/{request_id}")
+async def get_video_status(request_id: str):
+    """Render status with poster and preview URLs, available before the video is"""
+    container.abandonment.touch(request_id)
+    status = container.manim.get_video_status(request_id)
+    return {
+        "request_id": request_id,
+        "status": status["status"],
+        "render_tier": status["render_tier"],
+        "poster_url": f"/chat/poster/{request_id}" if status["poster"] else None,
+        "preview_url": f"/chat/preview/{request_id}" if status["preview"] else None,
+        "preview_source": status["preview_source"],
+        "video_url": f"/chat/video/{request_id}" if status["status"] == "ready" else None,
+        "media_url": status["media_url"],
+        "live_url": f"/chat/video/{request_id}/live.m3u8" if status["live"] else None,
+    }
+
+
+@app.get("/chat/poster/{request_id}")
+async def get_poster(request_id: str):
+    return _preview_file(request_id, "poster")
+
+
+@app.get("/chat/preview/{request_id}")
+async def get_preview(request_id: str):
+    return _preview_file(request_id, "preview")
+
+
+def _preview_file(request_id: str, kind: str):
+    container.abandonment.touch(request_id)
+    path = container.manim.get_video_status(request_id)[kind]
+    if not path or not os.path.exists(path):
+        return Response(status_code=202)  # not generated (yet)
+    # A segment preview is replaced by one from the finished video
+    return FileResponse(path, headers={"Cache-Control": "no-cache"})
+
+
 @app.get("/chat/video_base64/{request_id}")
-async def get_video_base64(request_id: str):
-    video_path = manim_service.get_video_path(request_id)
-    print(f"[Main] Video polling for request_id: {request_id}, video_path: {video_path}")
+async def get_video_base64(request_id: str, request: Request):
+    with tracer.span("GET /chat/video_base64", request_id=request_id) as span:
+        container.abandonment.touch(request_id)
+        video_path, media_type = container.manim.get_video_variant(request_id, request.headers.get("accept", ""))
     
-    # Check if this request_id has been marked as "no video will be created"
-    if request_id in manim_service.no_video_requests:
-        print(f"[Main] Request {request_id} marked as no video - returning 404")
-        return Response(status_code=404, content="No video will be created for this request")
+        # Check if this request_id has been marked as "no video will be created"
+        if request_id in container.manim.no_video_requests:
+            span.set_attribute("no_video", True)
+            return Response(
+                status_code=404,
+                content="No video will be created for this request",
+                headers=_tier_headers(request_id),
+            )
     
-    if video_path and os.path.exists(video_path):
-        print(f"[Main] Video found and exists: {video_path}")
-        print(f"[Main] Video file size: {os.path.getsize(video_path)} bytes")
-        with open(video_path, "rb") as f:
-            import base64
-            video_data = f.read()
-            video_base64 = base64.b64encode(video_data).decode("utf-8")
-            print(f"[Main] Video base64 length: {len(video_base64)}")
-            print(f"[Main] Video base64 preview: {video_base64[:100]}...")
-        # Optionally, delete the file after serving
-        try:
-            os.remove(video_path)
-        except Exception:
-            pass
+        if video_path and os.path.exists(video_path):
+            # Reading and encoding a video takes long enough to stall the event loop
+            video_data, video_base64 = await asyncio.to_thread(_read_base64, video_path)
+            span.set_attributes(video_bytes=len(video_data), video_base64_chars=len(video_base64), media_type=media_type)
+            tracer.log("Serving video", video_path=video_path)
+            # Optionally, delete the files after serving
+            for path in [container.manim.get_video_path(request_id), *container.manim.video_variants.pop(request_id, {}).values()]:
+                try:
+                    os.remove(path)
+                except Exception:
+                    pass
         
-        # Clean up temp_manim directory after successful video generation
-        try:
-            import shutil
-            temp_manim_dir = os.path.join(os.getcwd(), "temp_manim")
-            if os.path.exists(temp_manim_dir):
-                shutil.rmtree(temp_manim_dir)
-                print(f"[Main] Cleaned up temp_manim directory")
-        except Exception as e:
-            print(f"[Main] Failed to clean up temp_manim: {e}")
-        return JSONResponse({"video_base64": video_base64})
-    else:
-        print(f"[Main] Video not ready yet for request_id: {request_id}")
-        # Debug: Print all video mappings
-        print(f"[Main] All video mappings: {manim_service.video_map}")
-        print(f"[Main] All no_video_requests: {manim_service.no_video_requests}")
-        return Response(status_code=202)
+            # Clean up temp_manim directory after successful video generation
+            try:
+                import shutil
+                temp_manim_dir = os.path.join(os.getcwd(), "temp_manim")
+                if os.path.exists(temp_manim_dir):
+                    await asyncio.to_thread(shutil.rmtree, temp_manim_dir)
+                    tracer.log("Cleaned up temp_manim directory")
+            except Exception as e:
+                tracer.log("Failed to clean up temp_manim", error=str(e))
+            return JSONResponse(
+                {
+                    "video_base64": video_base64,
+                    "mime_type": media_type,
+                    "render_tier": container.manim.video_tiers.get(request_id),
+                },
+                headers={**_tier_headers(request_id), "Vary": "Accept"},
+            )
+        else:
+            span.set_attribute("ready", False)
+            return Response(status_code=202)
+
+
+def _read_base64(path: str) -> tuple:
+    with open(path, "rb") as f:
+        data = f.read()
+    return data, base64.b64encode(data).decode("utf-8")
 
 
 @app.post("/chat-json", response_model=ChatResponse)
-async def chat_json_endpoint(request: ChatRequest):
+async def chat_json_endpoint(
+    request: ChatRequest,
+    http_request: Request,
+    respond_async: bool = Query(False, description="Answer 202 with a job id instead of waiting for the video")
+):
     """
     Alternative chat endpoint that accepts JSON with base64 image
     
     This endpoint accepts:
     - text: Optional string
     - image_base64: Optional base64 encoded image
+
+    With `Prefer: respond-async` (or ?respond_async=true) it answers 202 with
+    a job id; the ChatResponse is then available from /jobs/{job_id}.
     """
-    try:
+    request_id = str(uuid.uuid4())
+    with tracer.span("POST /chat-json", request_id=request_id, endpoint="/chat-json") as request_span:
         # Validate input
         if not request.text and not request.image_base64:
             raise HTTPException(
                 status_code=400,
                 detail="Either text or image_base64 must be provided"
             )
-        
+    
         # Determine input type
         if request.text and request.image_base64:
             input_type = InputType.TEXT_AND_IMAGE
@@ -493,13 +928,24 @@ async def chat_json_endpoint(request: ChatRequest):
             input_type = InputType.TEXT_ONLY
         else:
             input_type = InputType.IMAGE_ONLY
-        
+        request_span.set_attribute("input_type", input_type.value)
+        if _wants_async(http_request, respond_async):
+            return _submit_job("chat_json", lambda job: _answer_chat_json(request, input_type, request_id, job))
+        return await _answer_chat_json(request, input_type, request_id)
+
+
+async def _answer_chat_json(
+    request: ChatRequest, input_type: InputType, request_id: str, job: Optional[Job] = None
+) -> ChatResponse:
+    """Explanation and animation URL for /chat-json, run in the request or as a job"""
+    span = tracer.current_span()
+    try:
         # Process image if provided
         image_path = None
         if request.image_base64:
             # Process base64 image
-            image_path, extracted_text = await image_service.process_image(request.image_base64)
-            
+            image_path, extracted_text = await container.images.process_image(request.image_base64)
+        
             # Combine text if both provided
             if request.text and extracted_text:
                 text = f"{request.text}\n\nImage content: {extracted_text}"
@@ -509,56 +955,87 @@ async def chat_json_endpoint(request: ChatRequest):
                 text = request.text
         else:
             text = request.text
+    
+        span.set_attributes(input_type=input_type.value, text_chars=len(text or ""))
+        if job:
+            job.set_stage("answering")
         
         # Generate AI response
-        explanation, manim_code = await ai_service.generate_response(
+        explanation, manim_code = await container.ai.generate_response(
             text=text,
             image_path=image_path
         )
-        
+    
         # Generate animation if Manim code was provided
         animation_url = None
+        render_tier = None
         if manim_code:
-            video_path = await manim_service.generate_animation(manim_code)
+            if job:
+                job.set_stage("rendering")
+            with RENDER_QUEUE_DEPTH.track_inprogress() if job else contextlib.nullcontext():
+                tier = container.manim.select_tier()
+                render_tier = tier.name
+                span.set_attributes(code_bytes=len(manim_code), render_tier=render_tier)
+                if tier.mode == MODE_NONE:
+                    FALLBACKS.inc(stage="render", reason="load_shed")
+                video_path = await container.manim.generate_animation(manim_code, tier=tier)
             if video_path:
-                animation_url = manim_service.get_video_url(video_path)
-        
+                # Content-addressed URL when the media store is on; the file's own path otherwise
+                await asyncio.to_thread(container.manim.media.put, request_id, video_path)
+                animation_url = container.manim.media.url(request_id) or container.manim.get_video_url(video_path)
+    
         # Clean up temporary files
         if image_path and os.path.exists(image_path):
             try:
                 os.remove(image_path)
             except Exception as e:
                 print(f"Failed to clean up image file: {e}")
-        
+    
         return ChatResponse(
             success=True,
             explanation=explanation,
             animation_url=animation_url,
+            render_tier=render_tier,
             error_message=None,
             input_type=input_type
         )
-        
+    
     except HTTPException:
         raise
     except Exception as e:
+        span.record_exception(e)
         return ChatResponse(
             success=False,
             explanation="",
             animation_url=None,
             error_message=str(e),
-            input_type=input_type if 'input_type' in locals() else InputType.TEXT_ONLY
+            input_type=input_type
         )
 
 
-@app.get("/media/{filename}")
-async def serve_media(filename: str):
-    """Serve media files (videos, images)"""
-    file_path = os.path.join(settings.MEDIA_DIR, filename)
-    
-    if not os.path.exists(file_path):
+@app.get("/media/{filename:path}")
+async def serve_media(filename: str, request: Request):
+    """
+    Serve media files (videos, images).
+
+    Videos named by their content hash never change: they get a strong
+    ETag and immutable caching. Other files (previews are regenerated in
+    place) must be revalidated.
+    """
+    media_root = os.path.realpath(settings.MEDIA_DIR)
+    file_path = os.path.realpath(os.path.join(media_root, filename))
+    if not file_path.startswith(media_root + os.sep) or not os.path.isfile(file_path):
         raise HTTPException(status_code=404, detail="File not found")
-    
-    return FileResponse(file_path)
+
+    digest = content_digest(filename)
+    if digest:
+        headers = {"ETag": strong_etag(digest), "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    else:
+        stat = os.stat(file_path)
+        headers = {"ETag": f'W/"{stat.st_mtime_ns:x}-{stat.st_size:x}"', "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(file_path, headers=headers)
 
 
 if __name__ == "__main__":
@@ -39,6 +39,7 @@ class ChatResponse(BaseModel):
     success: bool = Field(..., description="Whether the request was successful")
     explanation: str = Field(..., description="AI-generated explanation")
     animation_url: Optional[str] = Field(None, description="URL to the generated animation video")
+    render_tier: Optional[str] = Field(None, description="Load-adaptive render tier the animation was rendered with")
     error_message: Optional[str] = Field(None, description="Error message if something went wrong")
     input_type: InputType = Field(..., description="Type of input processed")
     
@@ -48,12 +49,34 @@ class ChatResponse(BaseModel):
                 "success": True,
                 "explanation": "A binary search tree is a hierarchical data structure...",
                 "animation_url": "/media/animations/bst_animation.mp4",
+                "render_tier": "full",
                 "error_message": None,
                 "input_type": "text_and_image"
             }
         }
 
 
+class BatchChatRequest(BaseModel):
+    """Many text prompts to answer (and animate) as one batch"""
+    prompts: List[str] = Field(..., description="Questions to answer, one lesson each")
+    use_batches_api: Optional[bool] = Field(
+        None, description="Send the LLM calls as one Message Batches API request (default from settings)"
+    )
+
+
+class EditRequest(BaseModel):
+    """A change to the animation of an earlier answer"""
+    request_id: str = Field(..., description="Request id of the answer (or earlier edit) to change")
+    instruction: str = Field(..., description="What to change, e.g. 'make the circle red'")
+
+
+class LoopMonitorUpdate(BaseModel):
+    """Runtime settings for the event loop lag monitor; omitted fields stay unchanged"""
+    enabled: Optional[bool] = Field(None, description="Start or stop the monitor")
+    interval_ms: Optional[float] = Field(None, description="Sampling interval in milliseconds")
+    threshold_ms: Optional[float] = Field(None, description="Lag that counts as a stall and captures a stack")
+
+
 class HealthResponse(BaseModel):
     """Health check response model"""
     status: str = Field(..., description="Service status")
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Offline precompute: answer and render a corpus of questions ahead of time
+
+Runs every question through the same AIService and ManimService pipeline
+the API uses, in a pool of worker processes, and writes the results into
+the response cache (served before any API call, see
+RESPONSE_CACHE_SERVE_PRECOMPUTED) and the render cache. Code that fails to
+render goes through the AI debugger like it would live, and the answer is
+stored with the code that rendered; answers whose code never rendered are
+cached like live ones, not served ahead of the API. Each finished question is appended to a
+JSONL checkpoint, so an interrupted run resumes where it stopped.
+
+Usage:
+    python precompute.py syllabus.txt --workers 4
+    python precompute.py popular_prompts.jsonl --field prompt --tier full --tier reduced
+Question files are .txt (one per line, # for comments), .json (a list) or
+.jsonl; JSON entries are strings or objects with a question/text/prompt field.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add the current directory to the path so we can import our modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.response_cache import ResponseCache
+from utils.config import settings
+
+QUESTION_FIELDS = ("question", "text", "prompt")
+
+# Per-process state of a pool worker, set up by _init_worker
+_worker = {}
+
+
+def load_questions(path: str, field: str = None) -> list:
+    """Questions from a .txt, .json or .jsonl file, in order, without duplicates"""
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    if path.endswith(".jsonl"):
+        entries = [json.loads(line) for line in content.splitlines() if line.strip()]
+    elif path.endswith(".json"):
+        entries = json.loads(content)
+    else:
+        entries = [line for line in content.splitlines() if line.strip() and not line.lstrip().startswith("#")]
+
+    questions = {}
+    for entry in entries:
+        if isinstance(entry, dict):
+            fields = (field,) if field else QUESTION_FIELDS
+            entry = next((entry[name] for name in fields if entry.get(name)), None)
+        if isinstance(entry, str) and entry.strip():
+            # Keyed like the response cache, so near-identical questions run once
+            questions.setdefault(ResponseCache.key(entry), entry.strip())
+    return list(questions.items())
+
+
+def load_checkpoint(path: str) -> dict:
+    """cache key -> last checkpoint record"""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Line cut short by an interrupted run
+            records[record["key"]] = record
+    return records
+
+
+def _init_worker() -> None:
+    from services.animation_templates import TemplateLibrary
+    from services.ai_service import AIService
+    from services.manim_service import ManimService
+
+    _worker["loop"] = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker["loop"])
+    _worker["ai"] = AIService()
+    _worker["manim"] = ManimService()
+    _worker["templates"] = TemplateLibrary(enabled=settings.TEMPLATES_ENABLED)
+
+
+def _precompute_in_worker(key: str, question: str, options: dict) -> dict:
+    start_time = time.perf_counter()
+    try:
+        record = _worker["loop"].run_until_complete(_precompute(question, options))
+    except Exception as e:
+        record = {"status": "failed", "error": str(e) or type(e).__name__}
+    record.update(key=key, question=question, elapsed_s=round(time.perf_counter() - start_time, 2), finished_at=time.time())
+    return record
+
+
+async def _precompute(question: str, options: dict) -> dict:
+    """Answer one question like /chat would, render it for each tier and cache both"""
+    ai, manim, templates = _worker["ai"], _worker["manim"], _worker["templates"]
+    template_match = templates.match(question)
+    if template_match:
+        explanation, manim_code, source = await ai.generate_template_response(question, template_match)
+    else:
+        explanation, manim_code, source = await ai.generate_hedged_response(text=question, timeout=300)
+    if source in ("cache", "degraded"):
+        # The upstream circuit is open: nothing new to cache
+        return {"status": "failed", "source": source, "error": "Upstream API unavailable"}
+
+    record = {"status": "ok", "source": source, "code_bytes": len(manim_code or ""), "renders": {}}
+    if manim_code and options["render"]:
+        tiers = {tier.name: tier for tier in manim.tier_policy.tiers}
+        # Templates are pre-validated: a failure there is not a code bug to debug
+        max_attempts = 1 if template_match else options["render_attempts"]
+        for tier_name in options["tiers"] or [manim.tier_policy.tiers[0].name]:
+            tier = tiers.get(tier_name)
+            if tier is None:
+                record["renders"][tier_name] = "unknown tier"
+                continue
+            for attempt in range(max_attempts):
+                match = re.search(r'class\s+(\w+)\(Scene\):', manim_code)
+                class_name = match.group(1) if match else "ConceptAnimation"
+                cached_path, error = await manim.prerender(manim_code, class_name, tier)
+                if error is None or attempt + 1 >= max_attempts:
+                    break
+                manim_code = await ai.debug_manim_code(manim_code, error)
+            record["renders"][tier_name] = "cached" if cached_path else f"failed: {_last_line(error)}"
+            if not cached_path:
+                record["status"] = "render_failed"
+    elif options["render"]:
+        record["status"] = "no_code"
+    # Only answers that rendered (or were not meant to) are served ahead of the API;
+    # the rest are kept like a live answer, for when the upstream circuit is open
+    cache_source = "precompute" if record["status"] == "ok" else "live"
+    ai.response_cache.put(question, explanation, manim_code, source=cache_source)
+    record["cached_as"] = cache_source
+    return record
+
+
+def _last_line(text: str) -> str:
+    lines = (text or "").strip().splitlines()
+    return lines[-1][:200] if lines else "unknown error"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Answer and render a question corpus into the response and render caches")
+    parser.add_argument("questions", help="Question file (.txt, .json or .jsonl)")
+    parser.add_argument("--field", help="JSON field holding the question (default: question, text or prompt)")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes (each answers and renders one question at a time)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <questions>.checkpoint.jsonl)")
+    parser.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--tier", dest="tiers", action="append", default=[], help="Render tier to cache (repeatable; default: the best tier)")
+    parser.add_argument("--render-attempts", type=int, default=3, help="Render attempts per tier, debugging the code in between")
+    parser.add_argument("--no-render", action="store_true", help="Only cache the answers")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if not settings.ANTHROPIC_API_KEY:
+        print("❌ ANTHROPIC_API_KEY is required")
+        return 2
+    if not settings.RESPONSE_CACHE_ENABLED:
+        print("❌ RESPONSE_CACHE_ENABLED is off, there is nowhere to write the answers")
+        return 2
+    if not args.no_render and not settings.RENDER_CACHE_ENABLED:
+        print("⚠️ RENDER_CACHE_ENABLED is off, answers only")
+        args.no_render = True
+
+    questions = load_questions(args.questions, args.field)
+    checkpoint_path = args.checkpoint or f"{args.questions}.checkpoint.jsonl"
+    if args.fresh and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    done = {key for key, record in load_checkpoint(checkpoint_path).items() if record.get("status") == "ok"}
+    pending = [(key, question) for key, question in questions if key not in done]
+    print(f"📚 {len(questions)} questions, {len(questions) - len(pending)} already done, {len(pending)} to run with {args.workers} workers")
+    if not pending:
+        return 0
+
+    options = {"render": not args.no_render, "tiers": args.tiers, "render_attempts": max(1, args.render_attempts)}
+    counts = {}
+    # spawn: workers build their own services and event loop from a clean interpreter
+    executor = ProcessPoolExecutor(
+        max_workers=max(1, args.workers),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+    try:
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+            futures = {executor.submit(_precompute_in_worker, key, question, options) for key, question in pending}
+            finished = 0
+            while futures:
+                completed, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    record = future.result()
+                    checkpoint.write(json.dumps(record) + "\n")
+                    checkpoint.flush()
+                    os.fsync(checkpoint.fileno())
+                    finished += 1
+                    counts[record["status"]] = counts.get(record["status"], 0) + 1
+                    detail = record.get("error") or ", ".join(f"{tier}: {state}" for tier, state in record.get("renders", {}).items())
+                    print(f"[{finished}/{len(pending)}] {record['status']:<13} {record['elapsed_s']:>7.1f}s  {record['question'][:60]}  {detail}")
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Interrupted; rerun the same command to resume from {checkpoint_path}")
+        executor.shutdown(wait=False, cancel_futures=True)
+        return 130
+    executor.shutdown()
+
+    print("✅ Done: " + ", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    return 0 if counts.get("failed", 0) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""
+Cancellation of background work for requests nobody is waiting for any more
+"""
+import asyncio
+import time
+from typing import Dict, Optional, Set
+
+from utils.metrics import ABANDONED_REQUESTS
+from utils.tracing import tracer
+
+
+class AbandonmentMonitor:
+    """
+    Tracks the background tasks of each request id and when a client last asked about it.
+
+    Clients poll the video endpoints every couple of seconds while a render
+    runs; every poll, status check or live playlist fetch calls touch().
+    Once a request has gone `timeout` seconds without one, or its client
+    disconnected from the streaming response, its tasks are cancelled. A
+    cancelled render kills its manim process group (see
+    ManimService._run_manim_command) and a cancelled LLM call closes its
+    upstream request.
+    """
+
+    def __init__(self, timeout: float = 30.0, check_interval: float = 5.0, enabled: bool = True):
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.enabled = enabled
+        self._tasks: Dict[str, Set[asyncio.Task]] = {}
+        self._last_seen: Dict[str, float] = {}
+        self._watcher: Optional[asyncio.Task] = None
+
+    def register(self, request_id: str, task: asyncio.Task) -> None:
+        """Cancel `task` if the request is abandoned before it finishes"""
+        self._tasks.setdefault(request_id, set()).add(task)
+        self._last_seen.setdefault(request_id, time.monotonic())
+        task.add_done_callback(lambda done: self._forget(request_id, done))
+        if self.enabled and (self._watcher is None or self._watcher.done()):
+            self._watcher = asyncio.create_task(self._watch())
+
+    def _forget(self, request_id: str, task: asyncio.Task) -> None:
+        tasks = self._tasks.get(request_id)
+        if tasks is None:
+            return
+        tasks.discard(task)
+        if not tasks:
+            del self._tasks[request_id]
+            self._last_seen.pop(request_id, None)
+
+    def touch(self, request_id: str) -> None:
+        """A client is still interested in this request"""
+        if request_id in self._last_seen:
+            self._last_seen[request_id] = time.monotonic()
+
+    def abandon(self, request_id: str, reason: str) -> int:
+        """Cancel the request's unfinished tasks; returns how many were cancelled"""
+        if not self.enabled:
+            return 0
+        self._last_seen.pop(request_id, None)
+        tasks = [task for task in self._tasks.get(request_id, ()) if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            ABANDONED_REQUESTS.inc(reason=reason)
+            tracer.log("Abandoned request cancelled", request_id=request_id, reason=reason, tasks=len(tasks))
+        return len(tasks)
+
+    async def _watch(self) -> None:
+        while self._tasks:
+            await asyncio.sleep(self.check_interval)
+            cutoff = time.monotonic() - self.timeout
+            for request_id in [rid for rid, seen in self._last_seen.items() if seen < cutoff]:
+                self.abandon(request_id, "timeout")
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            await asyncio.gather(self._watcher, return_exceptions=True)
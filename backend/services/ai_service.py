@@ -7,8 +7,41 @@ import json
 import re
 import base64
 import asyncio
-from typing import Dict, Any, Optional, Tuple
+import time
+from collections import defaultdict, deque
+from typing import Callable, Dict, Any, Optional, Tuple
 from utils.config import settings
+from utils.metrics import LLM_HEDGES, LLM_MODEL_SELECTIONS, LLM_REQUEST_SECONDS
+from utils.tracing import tracer
+from utils.upstream import (
+    CircuitBreaker,
+    CircuitOpenError,
+    UpstreamError,
+    UpstreamPolicy,
+    parse_concurrency_limits,
+    parse_retry_after,
+)
+from services.response_cache import ResponseCache
+
+
+# Which model/token profile each call type uses
+CALL_TYPE_PROFILES = {
+    "generate": "generate",
+    "simple": "fallback",
+    "explain": "fallback",
+    "simple_fallback": "fallback",
+    "debug": "debug",
+    "edit": "edit",
+    "health": "health",
+    "batch": "generate",
+}
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty sequence"""
+    ordered = sorted(values)
+    rank = int(round(pct / 100 * (len(ordered) - 1)))
+    return ordered[min(max(rank, 0), len(ordered) - 1)]
 
 
 class AIService:
@@ -17,14 +50,62 @@ class AIService:
     def __init__(self):
         self.api_key = settings.ANTHROPIC_API_KEY
         self.model = settings.ANTHROPIC_MODEL
-        
+        self.base_url = settings.ANTHROPIC_BASE_URL.rstrip("/")
+        # call_type -> latencies (seconds) of recent successful calls, for hedging
+        self._latencies = defaultdict(lambda: deque(maxlen=settings.LLM_HEDGE_WINDOW))
+        # model -> (monotonic time, latency) of recent successful generate calls, for routing
+        self._model_latencies = defaultdict(lambda: deque(maxlen=500))
+        # profile -> (model, max_tokens)
+        self.profiles = {
+            "generate": (settings.LLM_GENERATE_MODEL or self.model, settings.LLM_GENERATE_MAX_TOKENS),
+            "fallback": (settings.LLM_FALLBACK_MODEL or self.model, settings.LLM_FALLBACK_MAX_TOKENS),
+            "debug": (settings.LLM_DEBUG_MODEL or self.model, settings.LLM_DEBUG_MAX_TOKENS),
+            "edit": (settings.LLM_EDIT_MODEL or self.model, settings.LLM_EDIT_MAX_TOKENS),
+            "health": (settings.LLM_HEALTH_MODEL or self.model, settings.LLM_HEALTH_MAX_TOKENS),
+        }
+        self.upstream = UpstreamPolicy(
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            call_type_concurrency=parse_concurrency_limits(settings.LLM_CALL_TYPE_CONCURRENCY),
+            max_retries=settings.LLM_MAX_RETRIES,
+            backoff_base=settings.LLM_BACKOFF_BASE,
+            backoff_max=settings.LLM_BACKOFF_MAX,
+            breaker=CircuitBreaker(
+                failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+                recovery_timeout=settings.LLM_CIRCUIT_RECOVERY_TIMEOUT,
+            ),
+        )
+        self.response_cache = ResponseCache(
+            settings.RESPONSE_CACHE_DIR,
+            max_bytes=settings.RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+            enabled=settings.RESPONSE_CACHE_ENABLED,
+        )
+        # Shared so calls reuse warm keep-alive connections; created on first use
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _http(self) -> httpx.AsyncClient:
         if not self.api_key:
+            # Checked per call so a missing key fails requests, not application import
             raise ValueError("ANTHROPIC_API_KEY is required")
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=120.0,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONCURRENCY * 2,
+                    max_keepalive_connections=settings.LLM_MAX_CONCURRENCY,
+                ),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def generate_response(
         self, 
         text: Optional[str] = None, 
-        image_path: Optional[str] = None
+        image_path: Optional[str] = None,
+        call_type: str = "generate"
     ) -> Tuple[str, str]:
         """
         Generate AI response with explanation and Manim code
@@ -32,6 +113,7 @@ class AIService:
         Args:
             text: User's text input
             image_path: Path to uploaded image file
+            call_type: Upstream call type ("batch" for bulk generation)
             
         Returns:
             Tuple of (explanation, manim_code)
@@ -44,16 +126,162 @@ class AIService:
             messages = self._prepare_messages(prompt, image_path)
             
             # Make API request
-            response = await self._make_api_request(messages)
+            response = await self._make_api_request(messages, call_type=call_type)
             
             # Parse the response to extract explanation and Manim code
             explanation, manim_code = self._parse_response(response)
             
             return explanation, manim_code
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to generate AI response: {str(e)}")
     
+    async def generate_hedged_response(
+        self,
+        text: Optional[str] = None,
+        image_path: Optional[str] = None,
+        timeout: float = 300,
+    ) -> Tuple[str, str, str]:
+        """
+        Generate a response, hedging a slow or failed primary call with the
+        simpler animation prompt.
+
+        The primary generate_response call starts immediately. If it has not
+        returned within hedge_delay() (or fails), the fallback starts in
+        parallel and the first call to return usable Manim code wins; the other
+        is cancelled. With hedging disabled the fallback only starts after the
+        primary fails or times out, as before.
+
+        Args:
+            text: User's text input
+            image_path: Path to uploaded image file
+            timeout: Seconds to wait for the primary call
+
+        While the upstream circuit breaker is open no call is made: a cached
+        response for the same question is returned if there is one, otherwise
+        an explanation-only notice.
+
+        Returns:
+            Tuple of (explanation, manim_code, source) where source is
+            "primary", "fallback", "cache" or "degraded"
+
+        Raises:
+            asyncio.TimeoutError: Neither call returned anything in time
+        """
+        if self.upstream.breaker.is_open():
+            return self._degraded_response(text, image_path, self.upstream.breaker.retry_in())
+        fallback_prompt = f"Please provide a clear explanation and create a simple animation that specifically demonstrates: {text}"
+        delay = self.hedge_delay("generate") if settings.LLM_HEDGE_ENABLED else timeout
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+
+        with tracer.span("llm.hedged", hedge_delay_s=round(delay, 3)) as span:
+            primary = asyncio.create_task(self.generate_response(text=text, image_path=image_path))
+            sources = {primary: "primary"}
+            fallback = None
+            trigger = None
+            best = None  # (explanation, code, source) without usable code
+            last_error = None
+
+            def start_fallback(reason: str):
+                nonlocal fallback, trigger, deadline
+                trigger = reason
+                tracer.log("Starting fallback LLM request", trigger=reason)
+                fallback = asyncio.create_task(asyncio.wait_for(
+                    self.generate_simple_animation_response(fallback_prompt),
+                    timeout=settings.LLM_FALLBACK_TIMEOUT,
+                ))
+                sources[fallback] = "fallback"
+                deadline = max(deadline, loop.time() + settings.LLM_FALLBACK_TIMEOUT)
+
+            pending = {primary}
+            try:
+                while pending:
+                    if fallback is None:
+                        wait_for = min(delay, deadline - loop.time())
+                    else:
+                        wait_for = deadline - loop.time()
+                    done, pending = await asyncio.wait(
+                        pending, timeout=max(wait_for, 0), return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        if fallback is None:
+                            start_fallback("timeout" if loop.time() >= deadline else "slow")
+                            pending.add(fallback)
+                            continue
+                        break  # deadline passed with both calls still running
+
+                    for task in done:
+                        source = sources[task]
+                        try:
+                            explanation, manim_code = task.result()
+                        except Exception as e:
+                            tracer.log("LLM request failed", source=source, error=str(e))
+                            last_error = e
+                            continue
+                        if self._has_usable_code(manim_code):
+                            span.set_attributes(winner=source, trigger=trigger or "none")
+                            LLM_HEDGES.inc(trigger=trigger or "none", winner=source)
+                            if not image_path:
+                                await asyncio.to_thread(self.response_cache.put, text, explanation, manim_code)
+                            return explanation, manim_code, source
+                        # Explanation without runnable code: keep it in case nothing better arrives
+                        if best is None or source == "primary":
+                            best = (explanation, manim_code, source)
+
+                    if fallback is None:
+                        start_fallback("error" if last_error else "no_code")
+                        pending.add(fallback)
+            finally:
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.gather(*pending, return_exceptions=True)
+
+            LLM_HEDGES.inc(trigger=trigger or "none", winner="none")
+            span.set_attributes(winner=best[2] if best else "none", trigger=trigger or "none")
+            if best is not None:
+                return best
+            if isinstance(last_error, CircuitOpenError):
+                return self._degraded_response(text, image_path, last_error.retry_in)
+            if last_error is not None and not pending:
+                raise last_error
+            raise asyncio.TimeoutError()
+
+    def precomputed_response(self, text: Optional[str]) -> Optional[Tuple[str, str]]:
+        """(explanation, manim_code) written for this question by the offline precompute tool, if any"""
+        if not settings.RESPONSE_CACHE_SERVE_PRECOMPUTED:
+            return None
+        return self.response_cache.get(text, precomputed_only=True)
+
+    def _degraded_response(self, text: Optional[str], image_path: Optional[str], retry_in: float) -> Tuple[str, str, str]:
+        """Answer without the upstream API: cached response, else explanation-only notice"""
+        cached = None if image_path else self.response_cache.get(text)
+        if cached:
+            tracer.log("Upstream circuit open, serving cached response")
+            return cached[0], cached[1], "cache"
+        tracer.log("Upstream circuit open, returning explanation-only notice", retry_in_s=round(retry_in))
+        explanation = (
+            "The AI tutor is temporarily unavailable because the upstream AI service is "
+            f"overloaded. Please try your question again in about {max(int(retry_in), 1)} seconds."
+        )
+        return explanation, "", "degraded"
+
+    def hedge_delay(self, call_type: str = "generate") -> float:
+        """Configured percentile of recent successful latencies, clamped to the configured bounds"""
+        samples = self._latencies[call_type]
+        if len(samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+            delay = settings.LLM_HEDGE_DEFAULT_DELAY
+        else:
+            delay = percentile(samples, settings.LLM_HEDGE_PERCENTILE)
+        return min(max(delay, settings.LLM_HEDGE_MIN_DELAY), settings.LLM_HEDGE_MAX_DELAY)
+
+    @staticmethod
+    def _has_usable_code(manim_code: str) -> bool:
+        return bool(manim_code) and re.search(r"class\s+\w+\(.*Scene.*\)\s*:", manim_code) is not None
+
     async def generate_simple_response(self, prompt: str) -> Tuple[str, str]:
         """
         Generate a simple AI response without requiring Manim code
@@ -76,14 +304,45 @@ class AIService:
                 }
             ]
             
-            response = await self._make_api_request(messages)
-            content = response["choices"][0]["message"]["content"]
+            response = await self._make_api_request(messages, call_type="simple")
+            content = self._response_text(response)
             
             return content.strip(), ""  # Return explanation only, no Manim code
             
         except Exception as e:
             raise Exception(f"Failed to generate simple AI response: {str(e)}")
     
+    async def generate_template_response(self, text: str, template_match) -> Tuple[str, str, str]:
+        """
+        Explanation from the LLM, animation from a parametrized template.
+
+        Only the explanation is requested (fast profile, no code), so the
+        slow code generation call is skipped. If that call fails or times
+        out the template's own summary is used.
+
+        Returns:
+            Tuple of (explanation, manim_code, "template")
+        """
+        prompt = (
+            f"{text}\n\nExplain this clearly in two or three short paragraphs. Do not include code. "
+            f"An animation titled '{template_match.params['title']}' will be shown next to your explanation."
+        )
+        messages = [
+            {"role": "system", "content": "You are a helpful educational assistant. Provide clear, concise explanations."},
+            {"role": "user", "content": prompt},
+        ]
+        try:
+            response = await asyncio.wait_for(
+                self._make_api_request(messages, call_type="explain"), timeout=settings.LLM_FALLBACK_TIMEOUT
+            )
+            # The animation comes from the template; drop any code the model added anyway
+            explanation = re.sub(r"```.*?(```|$)", "", self._response_text(response), flags=re.DOTALL).strip()
+            explanation = explanation or template_match.summary
+        except Exception as e:
+            tracer.log("Template explanation call failed, using template summary", error=str(e) or type(e).__name__)
+            explanation = template_match.summary
+        return explanation, template_match.code, "template"
+
     async def generate_simple_animation_response(self, prompt: str) -> Tuple[str, str]:
         """
         Generate a simple response with basic animation code that works on limited environments
@@ -131,18 +390,11 @@ Examples:
                 }
             ]
             
-            response = await self._make_api_request(messages)
-            content = response["choices"][0]["message"]["content"]
-            
-            # Split into explanation and code
-            parts = content.split("```python")
-            if len(parts) >= 2:
-                explanation = parts[0].strip()
-                code_part = parts[1].split("```")[0].strip()
-                return explanation, code_part
-            else:
-                return content.strip(), ""
+            response = await self._make_api_request(messages, call_type="simple_fallback")
+            return self._parse_response(response)
                 
+        except CircuitOpenError:
+            raise
         except Exception as e:
             raise Exception(f"Failed to generate simple animation response: {str(e)}")
     
@@ -279,11 +531,96 @@ class ConceptAnimation(Scene):
         
         return messages
     
-    async def _make_api_request(self, messages: list) -> Dict[str, Any]:
-        """Make the actual API request to Anthropic Claude"""
-        anthropic_url = "https://api.anthropic.com/v1/messages"
-        max_retries = 2
+    def select_model(self, call_type: str) -> Tuple[str, int, str]:
+        """
+        Model and max_tokens for a call type, plus why the model was chosen.
+
+        Primary generation switches to LLM_ROUTER_FAST_MODEL while the p95 of
+        the configured model's recent latencies is above the threshold. Once
+        its samples age out of the window there is no evidence left and calls
+        go back to the configured model, which refreshes the window.
+        """
+        model, max_tokens = self.profiles[CALL_TYPE_PROFILES.get(call_type, "generate")]
+        if call_type != "generate" or not settings.LLM_ROUTER_ENABLED or model == settings.LLM_ROUTER_FAST_MODEL:
+            return model, max_tokens, "configured"
+        p95 = self.model_p95(model)
+        if p95 is not None and p95 > settings.LLM_ROUTER_P95_THRESHOLD:
+            return settings.LLM_ROUTER_FAST_MODEL, max_tokens, "latency"
+        return model, max_tokens, "configured"
+
+    def model_p95(self, model: str) -> Optional[float]:
+        """p95 latency of a model's recent generate calls, or None with too few samples"""
+        cutoff = time.monotonic() - settings.LLM_ROUTER_WINDOW_SECONDS
+        samples = [latency for at, latency in self._model_latencies[model] if at >= cutoff]
+        if len(samples) < settings.LLM_ROUTER_MIN_SAMPLES:
+            return None
+        return percentile(samples, 95)
+
+    async def _make_api_request(self, messages: list, call_type: str = "generate") -> Dict[str, Any]:
+        """Make the API request and record its latency under the given call type"""
+        model, max_tokens, reason = self.select_model(call_type)
+        LLM_MODEL_SELECTIONS.inc(call_type=call_type, model=model, reason=reason)
+        start_time = time.perf_counter()
+        outcome = "error"
+        with tracer.span(f"llm.{call_type}", model=model, max_tokens=max_tokens, model_reason=reason) as span:
+            try:
+                response = await self._send_api_request(messages, call_type, model, max_tokens)
+                outcome = "success"
+                latency = time.perf_counter() - start_time
+                self._latencies[call_type].append(latency)
+                if call_type == "generate":
+                    self._model_latencies[model].append((time.monotonic(), latency))
+                usage = response.get("usage") or {}
+                span.set_attributes(
+                    input_tokens=usage.get("input_tokens", 0),
+                    output_tokens=usage.get("output_tokens", 0),
+                )
+                return response
+            except asyncio.CancelledError:
+                outcome = "cancelled"
+                raise
+            finally:
+                LLM_REQUEST_SECONDS.observe(
+                    time.perf_counter() - start_time, call_type=call_type, outcome=outcome
+                )
+
+    async def _send_api_request(
+        self,
+        messages: list,
+        call_type: str = "generate",
+        model: Optional[str] = None,
+        max_tokens: int = 4000,
+    ) -> Dict[str, Any]:
+        """Make the actual API request to Anthropic Claude under the upstream policy"""
+        anthropic_url = f"{self.base_url}/v1/messages"
+        body = self._message_params(messages, model or self.model, max_tokens)
+
+        async def attempt() -> Dict[str, Any]:
+            response = await self._http().post(anthropic_url, headers=self._headers(), json=body, timeout=120.0)
+
+            if response.status_code != 200:
+                raise UpstreamError(
+                    response.status_code,
+                    response.text,
+                    retry_after=parse_retry_after(response.headers.get("retry-after")),
+                )
+
+            return response.json()
+
+        return await self.upstream.call(call_type, attempt)
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json",
+            "HTTP-Referer": "http://localhost:5173",
+            "X-Title": "TMAS Chatbot"
+        }
 
+    @staticmethod
+    def _message_params(messages: list, model: str, max_tokens: int) -> Dict[str, Any]:
+        """Messages API request body for our system + user message list"""
         # Extract system prompt separately (Claude expects it as its own field)
         system_prompt = ""
         if messages and messages[0]["role"] == "system":
@@ -301,60 +638,101 @@ class ConceptAnimation(Scene):
                     else msg["content"]  # Already in Claude's block format
                 )
             })
+        return {
+            "model": model,
+            "max_tokens": max_tokens,
+            "temperature": 0.7,
+            "system": system_prompt,
+            "messages": anthropic_messages
+        }
+
+    async def _batch_api_call(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """One Message Batches API call under the upstream policy (as call type "batch")"""
+        async def attempt() -> httpx.Response:
+            response = await self._http().request(method, url, headers=self._headers(), timeout=120.0, **kwargs)
+            if response.status_code != 200:
+                raise UpstreamError(
+                    response.status_code,
+                    response.text,
+                    retry_after=parse_retry_after(response.headers.get("retry-after")),
+                )
+            return response
 
-        for attempt in range(max_retries + 1):
-            try:
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        anthropic_url,
-                        headers={
-                            "x-api-key": self.api_key,
-                            "anthropic-version": "2023-06-01",
-                            "content-type": "application/json",
-                            "HTTP-Referer": "http://localhost:5173",
-                            "X-Title": "TMAS Chatbot"
-                        },
-                        json={
-                            "model": self.model,
-                            "max_tokens": 4000,
-                            "temperature": 0.7,
-                            "system": system_prompt,
-                            "messages": anthropic_messages
-                        },
-                        timeout=120.0
-                    )
-
-                    if response.status_code != 200:
-                        raise Exception(
-                            f"API request failed: {response.status_code} - {response.text}"
-                        )
-
-                    return response.json()
+        return await self.upstream.call("batch", attempt)
 
-            except httpx.TimeoutException:
-                if attempt < max_retries:
-                    print(f"API request timed out, retrying... (attempt {attempt + 1}/{max_retries + 1})")
-                    await asyncio.sleep(2 ** attempt)
-                else:
-                    raise Exception("API request timed out after all retries")
+    async def generate_batch_responses(
+        self,
+        prompts: Dict[str, str],
+        poll_interval: float = 30.0,
+        timeout: float = 24 * 3600,
+        on_status: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Explanations and Manim code for many text prompts via the Message Batches API.
 
-            except Exception as e:
-                if attempt < max_retries:
-                    print(f"API request failed, retrying... (attempt {attempt + 1}/{max_retries + 1}): {str(e)}")
-                    await asyncio.sleep(2 ** attempt)
+        `prompts` maps a custom id to the question. Polls the batch every
+        `poll_interval` seconds (calling `on_status` with each status) until it
+        ends, then returns custom id -> (explanation, manim_code), or an
+        Exception for requests that errored, were canceled or expired.
+        """
+        model, max_tokens, _ = self.select_model("batch")
+        requests = [
+            {
+                "custom_id": custom_id,
+                "params": self._message_params(self._prepare_messages(self._build_prompt(text, None), None), model, max_tokens),
+            }
+            for custom_id, text in prompts.items()
+        ]
+        batches_url = f"{self.base_url}/v1/messages/batches"
+        with tracer.span("llm.batch", model=model, requests=len(requests)) as span:
+            status = (await self._batch_api_call("POST", batches_url, json={"requests": requests})).json()
+            span.set_attribute("batch_id", status["id"])
+            tracer.log("Message batch created", batch_id=status["id"], requests=len(requests))
+            deadline = time.monotonic() + timeout
+            while status.get("processing_status") != "ended":
+                if on_status:
+                    on_status(status)
+                if time.monotonic() > deadline:
+                    raise asyncio.TimeoutError(f"Message batch {status['id']} did not end in {timeout:.0f}s")
+                await asyncio.sleep(poll_interval)
+                status = (await self._batch_api_call("GET", f"{batches_url}/{status['id']}")).json()
+            if on_status:
+                on_status(status)
+
+            results_url = status.get("results_url") or f"{batches_url}/{status['id']}/results"
+            results = {}
+            for line in (await self._batch_api_call("GET", results_url)).text.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                result = entry.get("result") or {}
+                if result.get("type") == "succeeded":
+                    try:
+                        results[entry["custom_id"]] = self._parse_response(result["message"])
+                    except Exception as e:
+                        results[entry["custom_id"]] = e
                 else:
-                    raise
+                    error = (result.get("error") or {}).get("message") or result.get("type", "unknown")
+                    results[entry["custom_id"]] = Exception(f"Batch request {result.get('type', 'failed')}: {error}")
+            span.set_attributes(
+                succeeded=sum(1 for value in results.values() if not isinstance(value, Exception)),
+                failed=sum(1 for value in results.values() if isinstance(value, Exception)),
+            )
+            return results
+
+    @staticmethod
+    def _response_text(api_response: Dict[str, Any]) -> str:
+        """Concatenated text blocks of a Claude API response"""
+        if "content" not in api_response:
+            raise Exception("Unexpected Claude API response format")
+        return "".join(
+            block["text"] for block in api_response["content"] if block["type"] == "text"
+        )
 
-    
     def _parse_response(self, api_response: Dict[str, Any]) -> Tuple[str, str]:
         """Parse Claude API response into explanation + Manim code"""
         try:
-            if "content" not in api_response:
-                raise Exception("Unexpected Claude API response format")
-
-            content_text = "".join(
-                block["text"] for block in api_response["content"] if block["type"] == "text"
-            )
+            content_text = self._response_text(api_response)
 
             # Extract code if present
             code_match = re.search(r"```python(.*?)(```|$)", content_text, re.DOTALL)
@@ -387,45 +765,83 @@ class ConceptAnimation(Scene):
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ]
-        response = await self._make_api_request(messages)
-        content = response["choices"][0]["message"]["content"]
+        response = await self._make_api_request(messages, call_type="debug")
+        content = self._response_text(response)
+        # The model sometimes fences the script despite being asked not to
+        code_match = re.search(r"```(?:python)?\s*\n(.*?)(```|$)", content, re.DOTALL)
+        if code_match:
+            return code_match.group(1).strip()
         return content.strip()
     
+    async def generate_scene_edit(self, code: str, instruction: str, feedback: Optional[str] = None) -> str:
+        """
+        Ask for a minimal edit of an existing scene instead of a new one.
+
+        Returns the raw reply: a one-sentence summary of the change followed
+        by SEARCH/REPLACE blocks against `code` (see services.scene_edits).
+        `feedback` explains why the previous reply could not be applied.
+        """
+        system_prompt = (
+            "You are an expert Manim scene editor. You change existing scenes as little as possible. "
+            "Reply with one sentence describing the change for the student, then only SEARCH/REPLACE blocks:\n"
+            "<<<<<<< SEARCH\n<exact lines from the scene>\n=======\n<replacement lines>\n>>>>>>> REPLACE\n"
+            "Each SEARCH section must match the scene exactly once. Never rewrite the whole scene."
+        )
+        user_prompt = f"Edit request: {instruction}\n\nCurrent scene:\n```python\n{code}\n```"
+        if feedback:
+            user_prompt += f"\n\nYour previous edit could not be applied: {feedback}\nReply with corrected blocks."
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        response = await self._make_api_request(messages, call_type="edit")
+        return self._response_text(response)
+
     async def test_connection(self) -> bool:
         """Test the API connection"""
+        start_time = time.perf_counter()
+        outcome = "error"
+        model, max_tokens, _ = self.select_model("health")
         try:
             messages = [
                 {"role": "user", "content": "Hello, this is a test message."}
             ]
             
-            # Use a shorter timeout for connection test
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    "https://api.anthropic.com/v1/messages",
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json",
-                        "HTTP-Referer": "http://localhost:5173",
-                                                    "X-Title": "TMAS Chatbot"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": messages,
-                        "max_tokens": 5,  # Very short response for test
-                        "temperature": 0.7
-                    }
-                )
-                
-                if response.status_code != 200:
-                    print(f"Connection test failed with status code: {response.status_code}")
-                    return False
-                
-                result = response.json()
-                return "choices" in result and len(result["choices"]) > 0
+            # Shorter timeout than generation calls; also warms the shared connection pool
+            response = await self._http().post(
+                f"{self.base_url}/v1/messages",
+                headers={
+                    "x-api-key": self.api_key,
+                    "anthropic-version": "2023-06-01",
+                    "content-type": "application/json",
+                    "HTTP-Referer": "http://localhost:5173",
+                    "X-Title": "TMAS Chatbot"
+                },
+                json={
+                    "model": model,
+                    "messages": messages,
+                    "max_tokens": max_tokens,  # Very short response for test
+                    "temperature": 0.7
+                },
+                timeout=10.0,
+            )
+            
+            if response.status_code != 200:
+                print(f"Connection test failed with status code: {response.status_code}")
+                return False
+            
+            result = response.json()
+            outcome = "success"
+            return len(result.get("content") or []) > 0
                 
         except httpx.TimeoutException:
             print("Connection test timed out")
+            outcome = "timeout"
             return False
         except Exception as e:
             print(f"Connection test failed: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
+        finally:
+            LLM_REQUEST_SECONDS.observe(
+                time.perf_counter() - start_time, call_type="health", outcome=outcome
+            ) 
\ No newline at end of file
@@ -0,0 +1,54 @@
+"""
+Library of hand-tuned, parametrized Manim templates for common question types.
+
+A question that matches a template is animated from the template instead of
+LLM-generated code, skipping code generation and the debug/re-render loop.
+"""
+from typing import List, Optional
+
+from utils.metrics import TEMPLATE_MATCHES
+from utils.tracing import tracer
+
+from .base import AnimationTemplate, TemplateMatch
+from . import bst, dijkstra, function_plot, graph_traversal, sorting
+
+TEMPLATES: List[AnimationTemplate] = sorted(
+    [sorting.TEMPLATE, graph_traversal.TEMPLATE, dijkstra.TEMPLATE, bst.TEMPLATE, function_plot.TEMPLATE],
+    key=lambda template: -template.priority,
+)
+
+
+class TemplateLibrary:
+    """Picks a template for a question and extracts its parameters"""
+
+    def __init__(self, enabled: bool = True, templates: Optional[List[AnimationTemplate]] = None):
+        self.enabled = enabled
+        self.templates = templates if templates is not None else TEMPLATES
+
+    def match(self, question: Optional[str], explanation: str = "", stage: str = "primary") -> Optional[TemplateMatch]:
+        """
+        Template for the question, or None.
+
+        The intent is decided by the question alone; parameters come from the
+        question first and the explanation second, with each template's
+        defaults as the last resort.
+        """
+        if not self.enabled or not question:
+            return None
+        for template in self.templates:
+            if not template.matches(question):
+                continue
+            try:
+                params = template.extract(question, explanation or "")
+            except Exception as e:
+                tracer.log("Template parameter extraction failed", template=template.name, error=str(e))
+                params = None
+            if params is None:
+                continue
+            TEMPLATE_MATCHES.inc(template=template.name, stage=stage)
+            tracer.log("Question matched animation template", template=template.name, stage=stage)
+            return TemplateMatch(template, params)
+        return None
+
+
+__all__ = ["AnimationTemplate", "TemplateLibrary", "TemplateMatch", "TEMPLATES"]
@@ -0,0 +1,189 @@
+"""
+Template type and parameter extraction helpers shared by the animation templates
+"""
+import ast
+import math
+import re
+from typing import Callable, List, Optional, Tuple
+
+
+class AnimationTemplate:
+    """
+    Hand-written Manim scene parametrized by a PARAMS dict.
+
+    `extract` returns the parameters for a question (or None when the
+    question does not fit), `describe` a short explanation used when no
+    LLM explanation is available.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        class_name: str,
+        intent: str,
+        source: str,
+        extract: Callable[[str, str], Optional[dict]],
+        describe: Callable[[dict], str],
+        priority: int = 0,
+    ):
+        self.name = name
+        self.class_name = class_name
+        self.intent = re.compile(intent, re.IGNORECASE)
+        self.source = source
+        self.extract = extract
+        self.describe = describe
+        self.priority = priority
+
+    def matches(self, text: str) -> bool:
+        return bool(self.intent.search(text or ""))
+
+    def render_code(self, params: dict) -> str:
+        """Complete scene module: imports, PARAMS literal, then the template body"""
+        return f"from manim import *\n\nPARAMS = {params!r}\n{self.source}"
+
+
+class TemplateMatch:
+    """A template chosen for a question, with its extracted parameters"""
+
+    def __init__(self, template: AnimationTemplate, params: dict):
+        self.template = template
+        self.params = params
+
+    @property
+    def name(self) -> str:
+        return self.template.name
+
+    @property
+    def class_name(self) -> str:
+        return self.template.class_name
+
+    @property
+    def code(self) -> str:
+        return self.template.render_code(self.params)
+
+    @property
+    def summary(self) -> str:
+        return self.template.describe(self.params)
+
+
+def _number(token: str):
+    value = float(token)
+    return int(value) if value.is_integer() else value
+
+
+def extract_number_list(text: str, min_count: int = 3, max_count: int = 8) -> Optional[list]:
+    """
+    First list of numbers in the text: a [bracketed] list, or a run of at
+    least `min_count` numbers separated by commas and/or spaces.
+    """
+    for match in re.finditer(r"\[([^\]]+)\]", text):
+        numbers = re.findall(r"-?\d+(?:\.\d+)?", match.group(1))
+        if len(numbers) >= min_count:
+            return [_number(n) for n in numbers[:max_count]]
+    run = re.search(r"-?\d+(?:\.\d+)?(?:\s*,\s*|\s+)(?:-?\d+(?:\.\d+)?(?:\s*,\s*|\s+|$)){%d,}" % (min_count - 1), text)
+    if run:
+        numbers = re.findall(r"-?\d+(?:\.\d+)?", run.group(0))
+        return [_number(n) for n in numbers[:max_count]]
+    return None
+
+
+EDGE_RE = re.compile(
+    r"\b([A-Za-z0-9]{1,2})\s*(?:-{1,2}>?|–|→|<->)\s*([A-Za-z0-9]{1,2})\b"
+    r"(?:\s*(?:\(|:|=|,?\s*(?:weight|w|cost)\s*=?)\s*(\d+(?:\.\d+)?)\)?)?"
+)
+
+
+def extract_edges(text: str, min_edges: int = 2, max_edges: int = 14) -> Optional[List[Tuple]]:
+    """
+    Edges written like A-B, A->B or A - B (weight 4) / A-B:4. Returns
+    (u, v) or (u, v, weight) tuples, or None when fewer than `min_edges`.
+    """
+    edges = []
+    seen = set()
+    for u, v, weight in EDGE_RE.findall(text):
+        if u == v or (u, v) in seen or (v, u) in seen:
+            continue
+        seen.add((u, v))
+        edges.append((u, v, _number(weight)) if weight else (u, v))
+    if len(edges) < min_edges:
+        return None
+    return edges[:max_edges]
+
+
+def extract_start_node(text: str, vertices: list) -> Optional[str]:
+    match = re.search(
+        r"\b(?:from|start(?:ing)?(?:\s+(?:at|from))?|source)\s+(?:node|vertex)?\s*([A-Za-z0-9]{1,2})\b",
+        text,
+        re.IGNORECASE,
+    )
+    if match:
+        for vertex in vertices:
+            if vertex.lower() == match.group(1).lower():
+                return vertex
+    return None
+
+
+def vertices_of(edges: List[Tuple]) -> list:
+    vertices = []
+    for edge in edges:
+        for vertex in edge[:2]:
+            if vertex not in vertices:
+                vertices.append(vertex)
+    return vertices
+
+
+# Names an extracted function expression may use, evaluated with math's implementations
+SAFE_FUNCTIONS = {
+    "sin": math.sin, "cos": math.cos, "tan": math.tan, "exp": math.exp,
+    "log": math.log, "ln": math.log, "sqrt": math.sqrt, "abs": abs,
+    "pi": math.pi, "e": math.e,
+}
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow, ast.USub, ast.UAdd, ast.Mod,
+)
+# Largest |exponent| allowed; an unbounded one ("x + 9^9^9") would hang evaluation
+MAX_EXPONENT = 10
+
+
+def _small_exponent(node: ast.AST) -> bool:
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        node = node.operand
+    return (
+        isinstance(node, ast.Constant)
+        and type(node.value) in (int, float)
+        and abs(node.value) <= MAX_EXPONENT
+    )
+
+
+def normalise_expression(expression: str) -> Optional[str]:
+    """
+    Python form of a maths expression such as '2x^2 + sin(x)', or None if it
+    uses anything beyond x, numbers, arithmetic and SAFE_FUNCTIONS. Powers
+    need a constant exponent of at most MAX_EXPONENT and cannot be nested.
+    """
+    expression = expression.strip().rstrip(".?!").replace("^", "**").replace("·", "*")
+    expression = re.sub(r"(\d)\s*([a-z(])", r"\1*\2", expression)  # 2x -> 2*x, 3(x+1) -> 3*(x+1)
+    expression = re.sub(r"\)\s*([a-z0-9(])", r")*\1", expression)  # (x+1)(x-1) -> (x+1)*(x-1)
+    expression = re.sub(r"\bx\s*\(", "x*(", expression)
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError:
+        return None
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            return None
+        if isinstance(node, ast.Name) and node.id != "x" and node.id not in SAFE_FUNCTIONS:
+            return None
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name) and node.func.id in SAFE_FUNCTIONS):
+            return None
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow):
+            if not _small_exponent(node.right):
+                return None
+            if any(isinstance(inner, ast.BinOp) and isinstance(inner.op, ast.Pow) for inner in ast.walk(node.left)):
+                return None
+    return expression
+
+
+def evaluate(expression: str, x: float) -> float:
+    return eval(expression, {"__builtins__": {}}, {**SAFE_FUNCTIONS, "x": x})
@@ -0,0 +1,121 @@
+"""
+Inserting a sequence of values into a binary search tree
+"""
+from typing import Optional
+
+from .base import AnimationTemplate, extract_number_list
+
+DEFAULT_VALUES = [50, 30, 70, 20, 40, 60, 80]
+MAX_DEPTH = 4  # Deeper levels fall off the bottom of the frame
+
+SOURCE = '''
+
+def bst_layout(values):
+    """Insertion path and final (x, y) position for each value, in insertion order"""
+    children = {}
+    positions = {}
+    paths = []
+    root = values[0]
+    positions[root] = (0.0, 2.2)
+    paths.append([])
+    for value in values[1:]:
+        node, depth, path = root, 1, []
+        while True:
+            path.append(node)
+            side = "left" if value < node else "right"
+            child = children.get((node, side))
+            if child is None:
+                x, y = positions[node]
+                offset = 3.2 / (2 ** (depth - 1))
+                positions[value] = (x - offset if side == "left" else x + offset, y - 1.2)
+                children[(node, side)] = value
+                break
+            node, depth = child, depth + 1
+        paths.append(path)
+    return paths, positions
+
+
+class BSTInsertionTemplate(Scene):
+    def construct(self):
+        values = PARAMS["values"]
+        step_time = PARAMS["step_time"]
+
+        title = Text(PARAMS["title"], font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        paths, positions = bst_layout(values)
+        nodes = {}
+        for value, path in zip(values, paths):
+            target = np.array([*positions[value], 0]) + DOWN * 0.6
+            node = VGroup(
+                Circle(radius=0.35, color=WHITE, fill_color=BLUE_E, fill_opacity=1),
+                Text(str(value), font_size=24),
+            ).move_to(LEFT * 5.5 + UP * 2.4)
+            self.play(FadeIn(node, shift=DOWN * 0.3), run_time=step_time / 2)
+            for ancestor in path:
+                comparison = nodes[ancestor]
+                self.play(
+                    node.animate.next_to(comparison, UP + (LEFT if value < ancestor else RIGHT), buff=0.1),
+                    comparison[0].animate.set_color(YELLOW),
+                    run_time=step_time / 2,
+                )
+                self.play(comparison[0].animate.set_color(WHITE), run_time=step_time / 4)
+            animations = [node.animate.move_to(target)]
+            if path:
+                parent = nodes[path[-1]]
+                edge = Line(parent.get_center(), target, buff=0.35, color=GREY_B)
+                animations.append(Create(edge))
+                self.add_foreground_mobjects(parent)
+            self.play(*animations, run_time=step_time)
+            nodes[value] = node
+            self.add_foreground_mobjects(node)
+
+        self.wait(1.5)
+'''
+
+
+def _within_depth(values: list) -> list:
+    """Longest prefix of values whose tree is at most MAX_DEPTH levels below the root"""
+    children = {}
+    for count, value in enumerate(values[1:], start=1):
+        node, depth = values[0], 1
+        while (node, value < node) in children:
+            node, depth = children[(node, value < node)], depth + 1
+        if depth > MAX_DEPTH:
+            return values[:count]
+        children[(node, value < node)] = value
+    return values
+
+
+def extract(question: str, explanation: str = "") -> Optional[dict]:
+    values = extract_number_list(question, min_count=3, max_count=10) or extract_number_list(explanation, max_count=10) or DEFAULT_VALUES
+    # Duplicates have no agreed place in a BST; keep the first occurrence
+    values = list(dict.fromkeys(values))
+    values = _within_depth(values)
+    if len(values) < 2:
+        return None
+    return {
+        "values": values,
+        "title": "Binary Search Tree Insertion",
+        "step_time": 0.6,
+    }
+
+
+def describe(params: dict) -> str:
+    return (
+        "In a binary search tree every node's left subtree holds smaller values and its right "
+        "subtree larger ones. To insert a value, start at the root and go left or right at each "
+        "node by comparing, until you reach an empty spot where the new node is attached.\n\n"
+        f"The animation inserts {params['values']} in order, highlighting each comparison on the way down."
+    )
+
+
+TEMPLATE = AnimationTemplate(
+    name="bst",
+    class_name="BSTInsertionTemplate",
+    intent=r"binary search tree|\bbst\b",
+    source=SOURCE,
+    extract=extract,
+    describe=describe,
+    priority=20,
+)
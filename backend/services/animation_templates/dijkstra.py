@@ -0,0 +1,130 @@
+"""
+Dijkstra's shortest paths on a small weighted undirected graph
+"""
+from typing import Optional
+
+from .base import AnimationTemplate, extract_edges, extract_start_node, vertices_of
+from .graph_traversal import GRAPH_HELPERS
+
+DEFAULT_EDGES = [("A", "B", 4), ("A", "C", 2), ("B", "C", 1), ("B", "D", 5), ("C", "D", 8), ("C", "E", 10), ("D", "E", 2)]
+
+SOURCE = GRAPH_HELPERS + '''
+
+def dijkstra_steps(vertices, edges, start):
+    """("settle", vertex) and ("relax", u, v, new_distance or None) steps, plus final parents"""
+    adjacency = neighbours(vertices, edges)
+    distance = {vertex: float("inf") for vertex in vertices}
+    parent = {}
+    distance[start] = 0
+    settled = []
+    steps = []
+    while len(settled) < len(vertices):
+        candidates = [v for v in vertices if v not in settled and distance[v] < float("inf")]
+        if not candidates:
+            break
+        vertex = min(candidates, key=lambda v: distance[v])
+        settled.append(vertex)
+        steps.append(("settle", vertex, None, None))
+        for neighbour, weight in adjacency[vertex]:
+            if neighbour in settled:
+                continue
+            improved = distance[vertex] + weight < distance[neighbour]
+            if improved:
+                distance[neighbour] = distance[vertex] + weight
+                parent[neighbour] = vertex
+            steps.append(("relax", vertex, neighbour, distance[neighbour] if improved else None))
+    return steps, parent
+
+
+def format_distance(value):
+    if value == float("inf"):
+        return "∞"
+    return str(int(value)) if float(value).is_integer() else f"{value:g}"
+
+
+class DijkstraTemplate(Scene):
+    def construct(self):
+        vertices = PARAMS["vertices"]
+        edges = [tuple(edge) for edge in PARAMS["edges"]]
+        start = PARAMS["start"]
+
+        title = Text(PARAMS["title"], font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        positions = graph_layout(vertices)
+        nodes, lines, edge_lines = build_graph(vertices, edges, positions)
+        weights = VGroup()
+        for u, v, weight in edges:
+            label = Text(format_distance(weight), font_size=20, color=GREY_A)
+            label.move_to(lines[(u, v)].get_center() + 0.25 * normalize(rotate_vector(lines[(u, v)].get_unit_vector(), PI / 2)))
+            weights.add(label)
+        self.play(Create(edge_lines), FadeIn(weights), run_time=1)
+        self.play(LaggedStart(*[GrowFromCenter(node) for node in nodes.values()], lag_ratio=0.1))
+
+        center = DOWN * 0.4
+        distances = {}
+        for vertex in vertices:
+            outward = normalize(positions[vertex] - center)
+            value = 0 if vertex == start else float("inf")
+            distances[vertex] = Text(format_distance(value), font_size=22, color=YELLOW).move_to(positions[vertex] + 0.65 * outward)
+        self.play(*[FadeIn(label) for label in distances.values()])
+
+        steps, parent = dijkstra_steps(vertices, edges, start)
+        step_time = PARAMS["step_time"]
+        for kind, u, v, value in steps:
+            if kind == "settle":
+                self.play(nodes[u][0].animate.set_fill(GREEN, opacity=1), run_time=step_time)
+                continue
+            line = lines[(u, v)]
+            self.play(line.animate.set_color(YELLOW).set_stroke(width=6), run_time=step_time / 2)
+            animations = [line.animate.set_color(GREY_B).set_stroke(width=3)]
+            if value is not None:
+                updated = Text(format_distance(value), font_size=22, color=YELLOW).move_to(distances[v])
+                animations.append(Transform(distances[v], updated))
+                animations.append(nodes[v][0].animate.set_fill(ORANGE, opacity=1))
+            self.play(*animations, run_time=step_time / 2)
+
+        tree = [lines[(vertex, parent[vertex])] for vertex in parent]
+        self.play(*[line.animate.set_color(GREEN).set_stroke(width=7) for line in tree], run_time=1)
+        self.wait(1.5)
+'''
+
+
+def extract(question: str, explanation: str = "") -> Optional[dict]:
+    edges = extract_edges(question) or extract_edges(explanation)
+    if edges and any(len(edge) < 3 for edge in edges):
+        edges = None  # Unweighted edges do not make a useful Dijkstra example
+    edges = edges or DEFAULT_EDGES
+    vertices = vertices_of(edges)
+    if len(vertices) > 8:
+        return None
+    start = extract_start_node(question, vertices) or vertices[0]
+    return {
+        "vertices": vertices,
+        "edges": edges,
+        "start": start,
+        "title": f"Dijkstra's Algorithm from {start}",
+        "step_time": 0.8,
+    }
+
+
+def describe(params: dict) -> str:
+    return (
+        "Dijkstra's algorithm finds the shortest distance from a start node to every other node "
+        "when all edge weights are non-negative. It repeatedly settles the unvisited node with the "
+        "smallest known distance and relaxes its edges, lowering a neighbour's distance whenever "
+        "the path through the settled node is shorter.\n\n"
+        f"The animation starts at {params['start']}: each node shows its current distance, settled "
+        "nodes turn green and the final shortest-path tree is highlighted at the end."
+    )
+
+
+TEMPLATE = AnimationTemplate(
+    name="dijkstra",
+    class_name="DijkstraTemplate",
+    intent=r"dijkstra|shortest[- ]path",
+    source=SOURCE,
+    extract=extract,
+    describe=describe,
+    priority=40,
+)
@@ -0,0 +1,145 @@
+"""
+Plot of a single-variable function with a point tracing the curve
+"""
+import math
+import re
+from typing import Optional
+
+from .base import AnimationTemplate, evaluate, normalise_expression
+
+SOURCE = '''
+import math
+
+FUNCTIONS = {
+    "sin": math.sin, "cos": math.cos, "tan": math.tan, "exp": math.exp,
+    "log": math.log, "ln": math.log, "sqrt": math.sqrt, "abs": abs,
+    "pi": math.pi, "e": math.e,
+}
+
+
+def f(x):
+    return eval(PARAMS["expression"], {"__builtins__": {}}, {**FUNCTIONS, "x": x})
+
+
+class FunctionPlotTemplate(Scene):
+    def construct(self):
+        x_min, x_max = PARAMS["x_range"]
+        y_min, y_max = PARAMS["y_range"]
+
+        title = Text(PARAMS["title"], font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        axes = Axes(
+            x_range=[x_min, x_max, PARAMS["x_step"]],
+            y_range=[y_min, y_max, PARAMS["y_step"]],
+            x_length=10,
+            y_length=5.2,
+            tips=False,
+        ).to_edge(DOWN, buff=0.5)
+        x_label = Text("x", font_size=24).next_to(axes.x_axis.get_end(), RIGHT)
+        y_label = Text("y", font_size=24).next_to(axes.y_axis.get_end(), UP)
+        self.play(Create(axes), FadeIn(x_label), FadeIn(y_label), run_time=1.5)
+
+        curve = axes.plot(f, x_range=[x_min, x_max], color=YELLOW)
+        self.play(Create(curve), run_time=2.5)
+
+        tracker = ValueTracker(x_min)
+        dot = always_redraw(lambda: Dot(axes.c2p(tracker.get_value(), f(tracker.get_value())), color=RED))
+        self.add(dot)
+        self.play(tracker.animate.set_value(x_max), run_time=3, rate_func=linear)
+        self.wait(1.5)
+'''
+
+_EXPRESSION_RES = (
+    re.compile(r"\b(?:y|f\s*\(\s*x\s*\))\s*=\s*([^,;=\n?]+)", re.IGNORECASE),
+    re.compile(r"\b(?:plot|graph|sketch|draw)\s+(?:of\s+|the\s+(?:function|curve|graph)\s+(?:of\s+)?)?([a-z0-9(][^,;=\n?]*)", re.IGNORECASE),
+)
+
+
+def _find_expression(text: str) -> Optional[tuple]:
+    for pattern in _EXPRESSION_RES:
+        for match in pattern.finditer(text):
+            # Trailing words ("from -2 to 2", "for x > 0") are not part of the expression
+            raw = re.split(r"\s+(?:from|for|between|over|on|when|where|and|in)\b", match.group(1))[0]
+            expression = normalise_expression(raw.lower())
+            if expression and "x" in expression:
+                return raw.strip(" .?!"), expression
+    return None
+
+
+def _sample(expression: str, x_min: float, x_max: float, count: int = 200) -> Optional[list]:
+    values = []
+    for k in range(count + 1):
+        x = x_min + (x_max - x_min) * k / count
+        try:
+            y = float(evaluate(expression, x))
+        except (ValueError, ZeroDivisionError, OverflowError, TypeError):
+            return None
+        if math.isnan(y) or math.isinf(y) or abs(y) > 1e3:
+            return None
+        values.append(y)
+    return values
+
+
+def _nice_step(span: float) -> float:
+    raw = span / 8
+    magnitude = 10 ** math.floor(math.log10(raw)) if raw > 0 else 1
+    for factor in (1, 2, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def extract(question: str, explanation: str = "") -> Optional[dict]:
+    found = _find_expression(question) or _find_expression(explanation)
+    if not found:
+        return None
+    display, expression = found
+    match = re.search(r"from\s+(-?\d+(?:\.\d+)?)\s+to\s+(-?\d+(?:\.\d+)?)", question, re.IGNORECASE)
+    ranges = [(float(match.group(1)), float(match.group(2)))] if match else []
+    # log and sqrt are undefined for x <= 0, tan blows up at pi/2: fall back to narrower domains
+    ranges += [(-5.0, 5.0), (0.1, 5.0), (-1.4, 1.4)]
+    for x_min, x_max in ranges:
+        if x_max <= x_min:
+            continue
+        samples = _sample(expression, x_min, x_max)
+        if samples is None:
+            continue
+        y_min, y_max = min(samples), max(samples)
+        if any(abs(b - a) > (y_max - y_min) / 4 for a, b in zip(samples, samples[1:])):
+            continue  # Jumps across an asymptote would be drawn as a vertical line
+        if y_max - y_min < 1e-9:
+            y_min, y_max = y_min - 1, y_max + 1
+        padding = (y_max - y_min) * 0.1
+        y_min, y_max = y_min - padding, y_max + padding
+        x_step, y_step = _nice_step(x_max - x_min), _nice_step(y_max - y_min)
+        return {
+            "expression": expression,
+            "x_range": [x_min, x_max],
+            "y_range": [math.floor(y_min / y_step) * y_step, math.ceil(y_max / y_step) * y_step],
+            "x_step": x_step,
+            "y_step": y_step,
+            "title": f"y = {display}",
+        }
+    return None
+
+
+def describe(params: dict) -> str:
+    x_min, x_max = params["x_range"]
+    return (
+        f"The graph shows {params['title']} for x from {x_min:g} to {x_max:g}. "
+        "Each point on the curve pairs an input x with the output of the function, so the "
+        "shape shows where the function rises, falls and crosses the axes.\n\n"
+        "In the animation a point traces the curve from left to right."
+    )
+
+
+TEMPLATE = AnimationTemplate(
+    name="function_plot",
+    class_name="FunctionPlotTemplate",
+    intent=r"\b(plot|graph|sketch|draw|visuali[sz]e)\b.*(\by\s*=|f\s*\(\s*x\s*\)|\bx\b|function)",
+    source=SOURCE,
+    extract=extract,
+    describe=describe,
+    priority=0,
+)
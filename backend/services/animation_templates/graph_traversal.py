@@ -0,0 +1,148 @@
+"""
+Breadth-first and depth-first search on a small undirected graph
+"""
+import re
+from typing import Optional
+
+from .base import AnimationTemplate, extract_edges, extract_start_node, vertices_of
+
+DEFAULT_EDGES = [("A", "B"), ("A", "C"), ("B", "D"), ("B", "E"), ("C", "F"), ("E", "F")]
+
+# Shared with the Dijkstra template: circular layout of labelled nodes and edges
+GRAPH_HELPERS = '''
+
+def graph_layout(vertices, radius=2.4, center=DOWN * 0.4):
+    positions = {}
+    for k, vertex in enumerate(vertices):
+        angle = PI / 2 - TAU * k / len(vertices)
+        positions[vertex] = center + radius * np.array([np.cos(angle), np.sin(angle), 0])
+    return positions
+
+
+def build_graph(vertices, edges, positions):
+    nodes = {}
+    for vertex in vertices:
+        circle = Circle(radius=0.35, color=WHITE, fill_color=GREY_E, fill_opacity=1)
+        label = Text(str(vertex), font_size=26)
+        nodes[vertex] = VGroup(circle, label).move_to(positions[vertex])
+    lines = {}
+    for edge in edges:
+        u, v = edge[0], edge[1]
+        line = Line(positions[u], positions[v], buff=0.35, color=GREY_B, stroke_width=3)
+        lines[(u, v)] = lines[(v, u)] = line
+    return nodes, lines, VGroup(*dict.fromkeys(lines.values()))
+
+
+def neighbours(vertices, edges):
+    adjacency = {vertex: [] for vertex in vertices}
+    for edge in edges:
+        weight = edge[2] if len(edge) > 2 else 1
+        adjacency[edge[0]].append((edge[1], weight))
+        adjacency[edge[1]].append((edge[0], weight))
+    for vertex in adjacency:
+        adjacency[vertex].sort(key=lambda item: str(item[0]))
+    return adjacency
+'''
+
+SOURCE = GRAPH_HELPERS + '''
+
+def traversal_steps(vertices, edges, start, algorithm):
+    """(vertex, parent, frontier) for each visit; frontier is the queue or stack afterwards"""
+    adjacency = neighbours(vertices, edges)
+    visited = []
+    frontier = [(start, None)]
+    steps = []
+    while frontier:
+        vertex, parent = frontier.pop() if algorithm == "dfs" else frontier.pop(0)
+        if vertex in visited:
+            continue
+        visited.append(vertex)
+        candidates = reversed(adjacency[vertex]) if algorithm == "dfs" else adjacency[vertex]
+        queued = {item[0] for item in frontier}
+        for neighbour, _ in candidates:
+            # A stack may hold a vertex twice (the later push wins); a queue never needs to
+            if neighbour not in visited and (algorithm == "dfs" or neighbour not in queued):
+                frontier.append((neighbour, vertex))
+        waiting = [item[0] for item in frontier if item[0] not in visited]
+        steps.append((vertex, parent, list(dict.fromkeys(waiting))))
+    return steps
+
+
+class GraphTraversalTemplate(Scene):
+    def construct(self):
+        vertices = PARAMS["vertices"]
+        edges = [tuple(edge) for edge in PARAMS["edges"]]
+        algorithm = PARAMS["algorithm"]
+
+        title = Text(PARAMS["title"], font_size=36, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        positions = graph_layout(vertices)
+        nodes, lines, edge_lines = build_graph(vertices, edges, positions)
+        self.play(Create(edge_lines), run_time=1)
+        self.play(LaggedStart(*[GrowFromCenter(node) for node in nodes.values()], lag_ratio=0.1))
+
+        structure = "Stack" if algorithm == "dfs" else "Queue"
+        frontier_text = Text(f"{structure}: [{PARAMS['start']}]", font_size=24).to_corner(DL)
+        order_text = Text("Visited:", font_size=24).to_corner(DR)
+        self.play(FadeIn(frontier_text), FadeIn(order_text))
+
+        order = []
+        for vertex, parent, frontier in traversal_steps(vertices, edges, PARAMS["start"], algorithm):
+            animations = [nodes[vertex][0].animate.set_fill(GREEN, opacity=1)]
+            if parent is not None:
+                animations.append(lines[(parent, vertex)].animate.set_color(YELLOW).set_stroke(width=6))
+            for waiting in frontier:
+                animations.append(nodes[waiting][0].animate.set_fill(ORANGE, opacity=1))
+            order.append(str(vertex))
+            new_frontier = Text(f"{structure}: [{', '.join(map(str, frontier))}]", font_size=24).to_corner(DL)
+            new_order = Text("Visited: " + " ".join(order), font_size=24).to_corner(DR)
+            animations += [Transform(frontier_text, new_frontier), Transform(order_text, new_order)]
+            self.play(*animations, run_time=PARAMS["step_time"])
+
+        self.wait(1.5)
+'''
+
+
+def extract(question: str, explanation: str = "") -> Optional[dict]:
+    algorithm = "dfs" if re.search(r"\bdfs\b|depth[- ]first", question, re.IGNORECASE) else "bfs"
+    edges = extract_edges(question) or extract_edges(explanation) or DEFAULT_EDGES
+    edges = [edge[:2] for edge in edges]
+    vertices = vertices_of(edges)
+    if len(vertices) > 10:
+        return None
+    start = extract_start_node(question, vertices) or vertices[0]
+    name = "Depth-First Search" if algorithm == "dfs" else "Breadth-First Search"
+    return {
+        "algorithm": algorithm,
+        "vertices": vertices,
+        "edges": edges,
+        "start": start,
+        "title": f"{name} from {start}",
+        "step_time": 0.8,
+    }
+
+
+def describe(params: dict) -> str:
+    if params["algorithm"] == "dfs":
+        text = ("Depth-first search follows one path as deep as it can before backtracking, "
+                "using a stack (or recursion) to remember where to continue.")
+    else:
+        text = ("Breadth-first search visits the graph level by level: first the start node, then all "
+                "of its neighbours, then their unvisited neighbours, using a queue.")
+    return (
+        f"{text}\n\nThe animation starts at {params['start']}: visited nodes turn green, nodes waiting "
+        f"in the {'stack' if params['algorithm'] == 'dfs' else 'queue'} are orange and the edges used "
+        f"to reach each node are highlighted."
+    )
+
+
+TEMPLATE = AnimationTemplate(
+    name="graph_traversal",
+    class_name="GraphTraversalTemplate",
+    intent=r"\b(bfs|dfs)\b|breadth[- ]first|depth[- ]first",
+    source=SOURCE,
+    extract=extract,
+    describe=describe,
+    priority=30,
+)
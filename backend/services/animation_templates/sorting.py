@@ -0,0 +1,145 @@
+"""
+Comparison sorts (bubble, selection, insertion) on a short array
+"""
+import re
+from typing import Optional
+
+from .base import AnimationTemplate, extract_number_list
+
+ALGORITHMS = ("bubble", "selection", "insertion")
+DEFAULT_VALUES = [5, 2, 8, 1, 9, 3]
+
+SOURCE = '''
+
+def sort_steps(values, algorithm):
+    """("compare", i, j), ("swap", i, j) and ("done", i) steps for the algorithm"""
+    a = list(values)
+    n = len(a)
+    steps = []
+    if algorithm == "selection":
+        for i in range(n):
+            smallest = i
+            for j in range(i + 1, n):
+                steps.append(("compare", smallest, j))
+                if a[j] < a[smallest]:
+                    smallest = j
+            if smallest != i:
+                a[i], a[smallest] = a[smallest], a[i]
+                steps.append(("swap", i, smallest))
+            steps.append(("done", i, i))
+    elif algorithm == "insertion":
+        for i in range(1, n):
+            j = i
+            while j > 0:
+                steps.append(("compare", j - 1, j))
+                if a[j - 1] <= a[j]:
+                    break
+                a[j - 1], a[j] = a[j], a[j - 1]
+                steps.append(("swap", j - 1, j))
+                j -= 1
+        steps.extend(("done", i, i) for i in range(n))
+    else:
+        for end in range(n - 1, 0, -1):
+            for j in range(end):
+                steps.append(("compare", j, j + 1))
+                if a[j] > a[j + 1]:
+                    a[j], a[j + 1] = a[j + 1], a[j]
+                    steps.append(("swap", j, j + 1))
+            steps.append(("done", end, end))
+        steps.append(("done", 0, 0))
+    return steps
+
+
+class SortingTemplate(Scene):
+    def construct(self):
+        values = PARAMS["values"]
+        step_time = PARAMS["step_time"]
+
+        title = Text(PARAMS["title"], font_size=40, color=BLUE).to_edge(UP)
+        self.play(Write(title))
+
+        cells = []
+        for value in values:
+            box = Square(side_length=1.0, color=BLUE, fill_opacity=0.25)
+            label = Text(str(value), font_size=32)
+            cells.append(VGroup(box, label))
+        row = VGroup(*cells).arrange(RIGHT, buff=0.25)
+        if row.width > config.frame_width - 1:
+            row.scale_to_fit_width(config.frame_width - 1)
+        positions = [cell.get_center() for cell in cells]
+        self.play(LaggedStart(*[FadeIn(cell, shift=UP * 0.3) for cell in cells], lag_ratio=0.1))
+
+        done = set()
+        for kind, i, j in sort_steps(values, PARAMS["algorithm"]):
+            if kind == "compare":
+                self.play(
+                    cells[i][0].animate.set_color(YELLOW),
+                    cells[j][0].animate.set_color(YELLOW),
+                    run_time=step_time / 2,
+                )
+                self.play(
+                    cells[i][0].animate.set_color(GREEN if i in done else BLUE),
+                    cells[j][0].animate.set_color(GREEN if j in done else BLUE),
+                    run_time=step_time / 2,
+                )
+            elif kind == "swap":
+                self.play(
+                    cells[i].animate.move_to(positions[j]),
+                    cells[j].animate.move_to(positions[i]),
+                    path_arc=PI / 2,
+                    run_time=step_time,
+                )
+                cells[i], cells[j] = cells[j], cells[i]
+            else:
+                done.add(i)
+                self.play(cells[i][0].animate.set_color(GREEN), run_time=step_time / 2)
+
+        result = Text("Sorted!", font_size=36, color=GREEN).next_to(row, DOWN, buff=0.8)
+        self.play(Write(result))
+        self.wait(1.5)
+'''
+
+
+def extract(question: str, explanation: str = "") -> Optional[dict]:
+    text = f"{question}\n{explanation}"
+    if re.search(r"\b(merge|quick|heap|radix|counting|bucket|shell)\s*sort", question, re.IGNORECASE):
+        # Divide-and-conquer and non-comparison sorts need their own scenes
+        return None
+    algorithm = "bubble"
+    match = re.search(r"\b(bubble|selection|insertion)\s*sort", text, re.IGNORECASE)
+    if match:
+        algorithm = match.group(1).lower()
+    values = extract_number_list(question) or extract_number_list(explanation) or DEFAULT_VALUES
+    return {
+        "algorithm": algorithm,
+        "values": values,
+        "title": f"{algorithm.capitalize()} Sort",
+        "step_time": 0.4 if len(values) <= 6 else 0.3,
+    }
+
+
+def describe(params: dict) -> str:
+    descriptions = {
+        "bubble": "Bubble sort repeatedly compares neighbouring elements and swaps them when "
+                  "they are out of order, so the largest remaining value bubbles to the end on every pass.",
+        "selection": "Selection sort finds the smallest remaining element on each pass and swaps it "
+                     "into the next position of the sorted prefix.",
+        "insertion": "Insertion sort takes the elements one at a time and shifts each one left "
+                     "until it sits in the right place among the already sorted elements.",
+    }
+    return (
+        f"{descriptions[params['algorithm']]}\n\n"
+        f"The animation sorts {params['values']}: compared elements are highlighted in yellow "
+        f"and elements in their final position turn green."
+    )
+
+
+TEMPLATE = AnimationTemplate(
+    name="sorting",
+    class_name="SortingTemplate",
+    intent=r"\b(bubble|selection|insertion)\s*sort|\bsort(ing)?\b.*\b(array|list|numbers)\b|\bsort(ing)? algorithm",
+    source=SOURCE,
+    extract=extract,
+    describe=describe,
+    priority=10,
+)
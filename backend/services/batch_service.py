@@ -0,0 +1,264 @@
+"""
+Bulk lesson generation: many prompts answered and rendered as one batch
+"""
+import asyncio
+import re
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from utils.metrics import BATCH_ITEMS, BATCH_RENDER_QUEUE_DEPTH, RENDER_QUEUE_DEPTH, RENDERS_IN_FLIGHT
+from utils.tracing import tracer
+
+# Item statuses
+ITEM_QUEUED = "queued"
+ITEM_ANSWERING = "answering"
+ITEM_WAITING_RENDER = "waiting_render"
+ITEM_RENDERING = "rendering"
+ITEM_SUCCEEDED = "succeeded"
+ITEM_FAILED = "failed"
+ITEM_FINISHED_STATUSES = (ITEM_SUCCEEDED, ITEM_FAILED)
+
+
+class BatchRejected(Exception):
+    """Raised when too many batches are already running"""
+
+
+class BatchItem:
+    """One prompt of a batch; its video is stored under its own request id"""
+
+    def __init__(self, index: int, prompt: str):
+        self.index = index
+        self.prompt = prompt
+        self.request_id = str(uuid.uuid4())
+        self.status = ITEM_QUEUED
+        self.explanation: Optional[str] = None
+        self.manim_code: Optional[str] = None
+        self.has_video = False
+        self.error: Optional[str] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ITEM_FINISHED_STATUSES
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self.status = status
+        self.error = error
+        BATCH_ITEMS.inc(outcome=status if status == ITEM_FAILED or self.has_video else "no_video")
+
+    def to_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "request_id": self.request_id,
+            "prompt": self.prompt,
+            "status": self.status,
+            "explanation": self.explanation,
+            "video_url": f"/chat/video/{self.request_id}" if self.has_video else None,
+            "video_status_url": f"/chat/video_status/{self.request_id}" if self.manim_code else None,
+            "error": self.error,
+        }
+
+
+class Batch:
+    """A set of prompts submitted together, with aggregate progress"""
+
+    def __init__(self, prompts: List[str], use_batches_api: bool):
+        self.id = uuid.uuid4().hex
+        self.items = [BatchItem(index, prompt) for index, prompt in enumerate(prompts)]
+        self.use_batches_api = use_batches_api
+        self.upstream_batch_id: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def progress(self) -> dict:
+        counts = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        done = sum(1 for item in self.items if item.finished)
+        return {
+            "total": len(self.items),
+            "finished": done,
+            "videos": sum(1 for item in self.items if item.has_video),
+            "percent": round(100 * done / len(self.items), 1) if self.items else 100.0,
+            "by_status": counts,
+        }
+
+    def to_dict(self, include_items: bool = True) -> dict:
+        result = {
+            "batch_id": self.id,
+            "status": "finished" if self.finished else "running",
+            "use_batches_api": self.use_batches_api,
+            "upstream_batch_id": self.upstream_batch_id,
+            "progress": self.progress(),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+        if include_items:
+            result["items"] = [item.to_dict() for item in self.items]
+        return result
+
+
+class BatchRunner:
+    """
+    Answers and renders batches in the background.
+
+    LLM calls go out at most `llm_concurrency` at a time as call type
+    "batch" (so LLM_CALL_TYPE_CONCURRENCY can cap them separately from
+    interactive generation), or all at once through the Message Batches API.
+    Renders share the render pipeline with interactive traffic at a lower
+    priority: a batch render only starts while no interactive render is
+    queued or running, and at most `render_concurrency` batch renders run
+    at once.
+    """
+
+    def __init__(
+        self,
+        ai,
+        manim,
+        llm_concurrency: int = 4,
+        render_concurrency: int = 1,
+        render_attempts: int = 2,
+        poll_interval: float = 30.0,
+        ttl_seconds: float = 3600,
+        max_active: int = 5,
+    ):
+        self.ai = ai
+        self.manim = manim
+        self.llm_concurrency = llm_concurrency
+        self.render_attempts = render_attempts
+        self.poll_interval = poll_interval
+        self.ttl_seconds = ttl_seconds
+        self.max_active = max_active
+        self.batches: Dict[str, Batch] = {}
+        self._render_slots = asyncio.Semaphore(render_concurrency)
+        self._batch_renders = 0
+
+    def get(self, batch_id: str) -> Optional[Batch]:
+        return self.batches.get(batch_id)
+
+    def submit(self, prompts: List[str], use_batches_api: bool = False) -> Batch:
+        self.prune()
+        if sum(1 for batch in self.batches.values() if not batch.finished) >= self.max_active:
+            raise BatchRejected(f"Too many running batches ({self.max_active})")
+        batch = Batch(prompts, use_batches_api)
+        self.batches[batch.id] = batch
+        batch.task = asyncio.create_task(self._run(batch))
+        return batch
+
+    async def _run(self, batch: Batch) -> None:
+        with tracer.span("batch", batch_id=batch.id, items=len(batch.items), use_batches_api=batch.use_batches_api) as span:
+            try:
+                if batch.use_batches_api:
+                    await self._answer_with_batches_api(batch)
+                else:
+                    llm_slots = asyncio.Semaphore(self.llm_concurrency)
+                    await asyncio.gather(*(self._answer_and_render(item, llm_slots) for item in batch.items))
+            except asyncio.CancelledError:
+                for item in batch.items:
+                    if not item.finished:
+                        item.finish(ITEM_FAILED, "Batch cancelled")
+                raise
+            except Exception as e:
+                span.record_exception(e)
+                for item in batch.items:
+                    if not item.finished:
+                        item.finish(ITEM_FAILED, str(e))
+            finally:
+                batch.finished_at = time.time()
+                span.set_attributes(**{f"items.{status}": count for status, count in batch.progress()["by_status"].items()})
+                tracer.log("Batch finished", batch_id=batch.id, **batch.progress()["by_status"])
+
+    async def _answer_and_render(self, item: BatchItem, llm_slots: asyncio.Semaphore) -> None:
+        async with llm_slots:
+            item.status = ITEM_ANSWERING
+            try:
+                item.explanation, item.manim_code = await self.ai.generate_response(text=item.prompt, call_type="batch")
+            except Exception as e:
+                item.finish(ITEM_FAILED, str(e))
+                return
+        await self._render(item)
+
+    async def _answer_with_batches_api(self, batch: Batch) -> None:
+        for item in batch.items:
+            item.status = ITEM_ANSWERING
+
+        def on_status(status: dict) -> None:
+            batch.upstream_batch_id = status.get("id")
+
+        results = await self.ai.generate_batch_responses(
+            {item.request_id: item.prompt for item in batch.items},
+            poll_interval=self.poll_interval,
+            on_status=on_status,
+        )
+        renders = []
+        for item in batch.items:
+            result = results.get(item.request_id, Exception("Missing from batch results"))
+            if isinstance(result, Exception):
+                item.finish(ITEM_FAILED, str(result))
+                continue
+            item.explanation, item.manim_code = result
+            renders.append(self._render(item))
+        await asyncio.gather(*renders)
+
+    def _interactive_idle(self) -> bool:
+        """No interactive render is waiting or running (batch renders excluded)"""
+        return RENDER_QUEUE_DEPTH.get() == 0 and RENDERS_IN_FLIGHT.get() <= self._batch_renders
+
+    async def _render(self, item: BatchItem) -> None:
+        if not item.manim_code:
+            item.finish(ITEM_SUCCEEDED)
+            return
+        match = re.search(r'class\s+(\w+)\(Scene\):', item.manim_code)
+        class_name = match.group(1) if match else "ConceptAnimation"
+        item.status = ITEM_WAITING_RENDER
+        with BATCH_RENDER_QUEUE_DEPTH.track_inprogress():
+            async with self._render_slots:
+                while not self._interactive_idle():
+                    await asyncio.sleep(1)
+                item.status = ITEM_RENDERING
+                self._batch_renders += 1
+                try:
+                    await self._render_attempts(item, class_name)
+                finally:
+                    self._batch_renders -= 1
+
+    async def _render_attempts(self, item: BatchItem, class_name: str) -> None:
+        tier = self.manim.select_tier()
+        code = item.manim_code
+        error = None
+        for attempt in range(self.render_attempts):
+            try:
+                video_path, error, code = await self.manim.render_and_store_video(code, class_name, item.request_id, tier=tier)
+            except Exception as e:
+                video_path, error = None, str(e)
+            if error is None:
+                item.has_video = video_path is not None
+                item.finish(ITEM_SUCCEEDED)
+                return
+            if attempt + 1 < self.render_attempts:
+                try:
+                    code = await self.ai.debug_manim_code(code, error)
+                except Exception as e:
+                    tracer.log("AI debugger failed for batch item", request_id=item.request_id, error=str(e))
+                    break
+        self.manim.no_video_requests.add(item.request_id)
+        # The explanation is still useful without the video
+        last_line = (error or "").strip().splitlines()[-1:] or ["unknown error"]
+        item.finish(ITEM_SUCCEEDED, f"Render failed: {last_line[0]}")
+
+    def prune(self) -> None:
+        """Forget finished batches older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        for batch_id in [batch.id for batch in self.batches.values() if batch.finished and batch.finished_at < cutoff]:
+            del self.batches[batch_id]
+
+    async def cancel_all(self) -> None:
+        tasks = [batch.task for batch in self.batches.values() if batch.task is not None and not batch.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
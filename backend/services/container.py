@@ -0,0 +1,175 @@
+"""
+Lazily constructed services with lifespan-managed startup, shutdown and readiness
+"""
+import asyncio
+import os
+import time
+from typing import Optional
+
+from utils.config import settings
+from utils.loop_monitor import loop_monitor
+from utils.tracing import tracer
+
+
+class ServiceContainer:
+    """
+    Holds the application's services, built on first use.
+
+    Importing the app constructs nothing; startup() (run by the lifespan)
+    prepares directories and starts background warm-ups, including the
+    upstream connection check that used to run on the first user request.
+    """
+
+    def __init__(self):
+        self._ai = None
+        self._manim = None
+        self._images = None
+        self._templates = None
+        self._jobs = None
+        self._batches = None
+        self._abandonment = None
+        self.started = False
+        self.config_error: Optional[str] = None
+        self.ai_connection = "pending"  # pending, ok, failed or skipped
+        self.startup_seconds: Optional[float] = None
+        self._tasks = []
+
+    @property
+    def ai(self):
+        if self._ai is None:
+            from services.ai_service import AIService
+            self._ai = AIService()
+        return self._ai
+
+    @property
+    def manim(self):
+        if self._manim is None:
+            from services.manim_service import ManimService
+            self._manim = ManimService()
+        return self._manim
+
+    @property
+    def images(self):
+        if self._images is None:
+            from services.image_service import ImageService
+            self._images = ImageService()
+        return self._images
+
+    @property
+    def templates(self):
+        if self._templates is None:
+            from services.animation_templates import TemplateLibrary
+            self._templates = TemplateLibrary(enabled=settings.TEMPLATES_ENABLED)
+        return self._templates
+
+    @property
+    def jobs(self):
+        if self._jobs is None:
+            from services.jobs import JobStore
+            self._jobs = JobStore(ttl_seconds=settings.JOB_TTL_SECONDS, max_active=settings.JOBS_MAX_ACTIVE)
+        return self._jobs
+
+    @property
+    def batches(self):
+        if self._batches is None:
+            from services.batch_service import BatchRunner
+            self._batches = BatchRunner(
+                self.ai,
+                self.manim,
+                llm_concurrency=settings.BATCH_LLM_CONCURRENCY,
+                render_concurrency=settings.BATCH_RENDER_CONCURRENCY,
+                render_attempts=settings.BATCH_RENDER_ATTEMPTS,
+                poll_interval=settings.BATCH_POLL_INTERVAL,
+                ttl_seconds=settings.JOB_TTL_SECONDS,
+                max_active=settings.BATCH_MAX_ACTIVE,
+            )
+        return self._batches
+
+    @property
+    def abandonment(self):
+        if self._abandonment is None:
+            from services.abandonment import AbandonmentMonitor
+            self._abandonment = AbandonmentMonitor(
+                timeout=settings.ABANDON_TIMEOUT_SECONDS,
+                check_interval=settings.ABANDON_CHECK_INTERVAL,
+                enabled=settings.ABANDON_CANCEL_ENABLED,
+            )
+        return self._abandonment
+
+    async def startup(self) -> None:
+        """Validate configuration, prepare directories and start background warm-ups"""
+        start_time = time.perf_counter()
+        if settings.LOOP_MONITOR_ENABLED:
+            loop_monitor.start()
+        try:
+            settings.validate_config()
+        except ValueError as e:
+            # Stay alive so the problem shows up in /health/ready instead of a crash loop
+            self.config_error = str(e)
+            tracer.log("Configuration invalid, not ready", error=self.config_error)
+
+        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        os.makedirs(settings.MEDIA_DIR, exist_ok=True)
+        self.manim.cleanup_temp_files()
+        if settings.TEX_CACHE_WARMUP or settings.FALLBACK_SCENE_PREWARM:
+            self.manim.start_warmup(tex=settings.TEX_CACHE_WARMUP, fallback_scenes=settings.FALLBACK_SCENE_PREWARM)
+
+        if self.config_error is None and settings.AI_CONNECTION_WARMUP:
+            self._tasks.append(asyncio.create_task(self._warm_ai_connection()))
+        else:
+            self.ai_connection = "skipped"
+
+        self.started = True
+        self.startup_seconds = time.perf_counter() - start_time
+        tracer.log("Application started", startup_s=round(self.startup_seconds, 3))
+
+    async def _warm_ai_connection(self) -> None:
+        """Check the upstream API and leave a warm keep-alive connection in the client pool"""
+        try:
+            ok = await asyncio.wait_for(self.ai.test_connection(), timeout=30)
+        except Exception as e:
+            tracer.log("AI connection warm-up failed", error=str(e) or type(e).__name__)
+            ok = False
+        self.record_ai_connection(ok)
+
+    def record_ai_connection(self, ok: bool) -> None:
+        self.ai_connection = "ok" if ok else "failed"
+        tracer.log("AI connection checked", status=self.ai_connection)
+
+    async def shutdown(self) -> None:
+        """Stop background work and close network clients"""
+        await loop_monitor.stop()
+        tasks = list(self._tasks)
+        if self._manim is not None:
+            if self._manim.warmup_task is not None:
+                tasks.append(self._manim.warmup_task)
+            tasks.extend(self._manim.background_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._jobs is not None:
+            await self._jobs.cancel_all()
+        if self._batches is not None:
+            await self._batches.cancel_all()
+        if self._abandonment is not None:
+            await self._abandonment.stop()
+        if self._ai is not None:
+            await self._ai.aclose()
+
+    def readiness(self) -> dict:
+        """
+        Whether this instance should receive traffic.
+
+        An unreachable upstream does not make the instance unready: the
+        circuit breaker and response cache handle that per request.
+        """
+        checks = {
+            "started": self.started,
+            "config": self.config_error or "ok",
+            "ai_connection": self.ai_connection,
+        }
+        return {
+            "ready": self.started and self.config_error is None,
+            "checks": checks,
+            "startup_seconds": round(self.startup_seconds, 3) if self.startup_seconds is not None else None,
+        }
@@ -0,0 +1,278 @@
+"""
+Generic fallback scenes, rendered once per topic hint and render tier and cached on disk
+"""
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from typing import Awaitable, Callable, Dict, Optional
+
+from services.render_tiers import MODE_VIDEO, RenderTier
+from utils.file_utils import ensure_directory_exists
+from utils.metrics import CACHE_REQUESTS
+from utils.tracing import tracer
+
+
+# (keyword in the failed code, title shown by the fallback scene), first match wins
+QUESTION_HINTS = [
+    ("dijkstra", "Dijkstra's Algorithm"),
+    ("sort", "Sorting Algorithm"),
+    ("graph", "Graph Algorithm"),
+    ("tree", "Tree Data Structure"),
+    ("search", "Search Algorithm"),
+    ("path", "Path Finding"),
+    ("math", "Mathematical Concept"),
+    ("equation", "Mathematical Concept"),
+    ("physics", "Physics Concept"),
+    ("chemistry", "Chemistry Concept"),
+]
+DEFAULT_HINT = "your question"
+
+FALLBACK_CLASS_NAME = "FallbackScene"
+
+FALLBACK_SCENE_TEMPLATE = '''
+from manim import *
+
+class {class_name}(Scene):
+    def construct(self):
+        # Create a substantial educational animation related to the user's question
+        title = Text("{question_hint}", font_size=36, color=BLUE)
+        self.play(Write(title))
+        self.wait(0.5)
+        
+        # Step 1: Show initial state
+        step1_text = Text("Step 1: Understanding the Problem", font_size=24, color=WHITE).next_to(title, DOWN)
+        self.play(Write(step1_text))
+        self.wait(0.5)
+        
+        # Create multiple geometric shapes with labels
+        circle = Circle(color=RED, radius=0.4).shift(LEFT * 3 + UP)
+        circle_label = Text("A", font_size=20, color=WHITE).next_to(circle, DOWN)
+        circle_group = VGroup(circle, circle_label)
+        
+        square = Square(color=GREEN, side_length=0.8).shift(RIGHT * 3 + UP)
+        square_label = Text("B", font_size=20, color=WHITE).next_to(square, DOWN)
+        square_group = VGroup(square, square_label)
+        
+        triangle = Triangle(color=YELLOW).scale(0.4).shift(UP * 2)
+        triangle_label = Text("C", font_size=20, color=WHITE).next_to(triangle, DOWN)
+        triangle_group = VGroup(triangle, triangle_label)
+        
+        # Animate shapes appearing one by one
+        self.play(Create(circle_group))
+        self.wait(0.3)
+        self.play(Create(square_group))
+        self.wait(0.3)
+        self.play(Create(triangle_group))
+        self.wait(0.5)
+        
+        # Step 2: Show connections
+        step2_text = Text("Step 2: Creating Connections", font_size=24, color=WHITE).next_to(step1_text, DOWN)
+        self.play(Write(step2_text))
+        self.wait(0.3)
+        
+        # Add connecting lines with animations
+        line1 = Line(circle.get_center(), square.get_center(), color=WHITE, stroke_width=3)
+        line2 = Line(square.get_center(), triangle.get_center(), color=WHITE, stroke_width=3)
+        line3 = Line(triangle.get_center(), circle.get_center(), color=WHITE, stroke_width=3)
+        
+        self.play(Create(line1))
+        self.wait(0.2)
+        self.play(Create(line2))
+        self.wait(0.2)
+        self.play(Create(line3))
+        self.wait(0.5)
+        
+        # Step 3: Show transformations
+        step3_text = Text("Step 3: Processing Data", font_size=24, color=WHITE).next_to(step2_text, DOWN)
+        self.play(Write(step3_text))
+        self.wait(0.3)
+        
+        # Animate transformations with different effects
+        self.play(
+            circle.animate.scale(1.3).set_color(PURPLE),
+            circle_label.animate.set_color(PURPLE),
+            run_time=1
+        )
+        self.wait(0.3)
+        
+        self.play(
+            square.animate.rotate(PI/6).set_color(ORANGE),
+            square_label.animate.set_color(ORANGE),
+            run_time=1
+        )
+        self.wait(0.3)
+        
+        self.play(
+            triangle.animate.scale(1.2).set_color(PINK),
+            triangle_label.animate.set_color(PINK),
+            run_time=1
+        )
+        self.wait(0.5)
+        
+        # Step 4: Show data flow
+        step4_text = Text("Step 4: Data Flow", font_size=24, color=WHITE).next_to(step3_text, DOWN)
+        self.play(Write(step4_text))
+        self.wait(0.3)
+        
+        # Animate data flow along the lines
+        data_dot1 = Dot(color=BLUE, radius=0.1).move_to(circle.get_center())
+        data_dot2 = Dot(color=BLUE, radius=0.1).move_to(square.get_center())
+        data_dot3 = Dot(color=BLUE, radius=0.1).move_to(triangle.get_center())
+        
+        self.play(Create(data_dot1))
+        self.play(data_dot1.animate.move_to(square.get_center()), run_time=1)
+        self.play(Create(data_dot2))
+        self.play(data_dot2.animate.move_to(triangle.get_center()), run_time=1)
+        self.play(Create(data_dot3))
+        self.play(data_dot3.animate.move_to(circle.get_center()), run_time=1)
+        self.wait(0.5)
+        
+        # Step 5: Final result
+        step5_text = Text("Step 5: Final Result", font_size=24, color=WHITE).next_to(step4_text, DOWN)
+        self.play(Write(step5_text))
+        self.wait(0.3)
+        
+        # Highlight all elements
+        self.play(
+            VGroup(circle_group, square_group, triangle_group).animate.set_color(GREEN),
+            VGroup(line1, line2, line3).animate.set_color(GREEN).set_stroke_width(6),
+            VGroup(data_dot1, data_dot2, data_dot3).animate.set_color(GREEN)
+        )
+        self.wait(1)
+        
+        # Final summary
+        summary = Text("Algorithm Complete!", font_size=28, color=GREEN)
+        summary.next_to(title, UP)
+        self.play(Write(summary))
+        self.wait(1.5)
+        
+        # Clean up with fade out
+        all_elements = VGroup(
+            title, step1_text, step2_text, step3_text, step4_text, step5_text,
+            circle_group, square_group, triangle_group,
+            line1, line2, line3, data_dot1, data_dot2, data_dot3, summary
+        )
+        self.play(FadeOut(all_elements))
+        self.wait(0.5)
+'''
+
+
+def question_hint(manim_code: str) -> str:
+    """Topic title for the fallback scene, guessed from the code that failed to render"""
+    code = (manim_code or "").lower()
+    for keyword, hint in QUESTION_HINTS:
+        if keyword in code:
+            return hint
+    return DEFAULT_HINT
+
+
+def all_hints() -> list:
+    return list(dict.fromkeys([hint for _, hint in QUESTION_HINTS] + [DEFAULT_HINT]))
+
+
+class FallbackSceneCache:
+    """
+    <cache_dir>/<hint>-<tier>-<digest>.mp4 for every (hint, tier) pair.
+
+    The digest covers the scene source and the tier's manim flags, so a
+    changed scene or tier renders afresh instead of serving a stale file.
+    Concurrent requests for the same missing entry share one render.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str,
+        run_command: Callable[..., Awaitable],
+        optimize: Optional[Callable[..., Awaitable]] = None,
+        enabled: bool = True,
+        timeout: float = 120,
+    ):
+        self.cache_dir = cache_dir
+        self.run_command = run_command
+        self.optimize = optimize
+        self.enabled = enabled
+        self.timeout = timeout
+        self._locks: Dict[str, asyncio.Lock] = {}
+        if enabled:
+            ensure_directory_exists(cache_dir)
+
+    @staticmethod
+    def scene_code(hint: str, class_name: str = FALLBACK_CLASS_NAME) -> str:
+        return FALLBACK_SCENE_TEMPLATE.format(class_name=class_name, question_hint=hint.replace('"', "'"))
+
+    def key(self, hint: str, tier: RenderTier) -> str:
+        digest = hashlib.sha256(
+            json.dumps([self.scene_code(hint), tier.manim_args()]).encode("utf-8")
+        ).hexdigest()[:12]
+        slug = re.sub(r"[^a-z0-9]+", "_", hint.lower()).strip("_")
+        return f"{slug}-{tier.name}-{digest}"
+
+    def path(self, hint: str, tier: RenderTier) -> str:
+        return os.path.join(self.cache_dir, f"{self.key(hint, tier)}.mp4")
+
+    def cached(self, hint: str, tier: RenderTier) -> Optional[str]:
+        path = self.path(hint, tier)
+        return path if os.path.exists(path) else None
+
+    async def get(self, hint: str, tier: RenderTier, label: str = "") -> Optional[str]:
+        """Cached video for (hint, tier), rendering it first if needed"""
+        if not self.enabled or tier.mode != MODE_VIDEO:
+            return None
+        path = self.cached(hint, tier)
+        if path:
+            CACHE_REQUESTS.inc(cache="fallback_scene", result="hit")
+            return path
+        CACHE_REQUESTS.inc(cache="fallback_scene", result="miss")
+        lock = self._locks.setdefault(self.key(hint, tier), asyncio.Lock())
+        async with lock:
+            # Rendered by whoever held the lock before us
+            return self.cached(hint, tier) or await self._render(hint, tier, label)
+
+    async def _render(self, hint: str, tier: RenderTier, label: str) -> Optional[str]:
+        key = self.key(hint, tier)
+        work_dir = os.path.join(self.cache_dir, f"work_{key}")
+        shutil.rmtree(work_dir, ignore_errors=True)
+        os.makedirs(work_dir)
+        try:
+            module_name = "fallback_scene"
+            with open(os.path.join(work_dir, f"{module_name}.py"), "w", encoding="utf-8") as f:
+                f.write(self.scene_code(hint))
+            cmd = [
+                sys.executable, "-m", "manim",
+                *tier.manim_args(),
+                "--media_dir", ".",
+                f"{module_name}.py",
+                FALLBACK_CLASS_NAME,
+            ]
+            result = await self.run_command(
+                cmd, cwd=work_dir, timeout=self.timeout, kind="fallback_scene", label=label or key, tier=tier
+            )
+            videos = glob.glob(os.path.join(work_dir, "videos", module_name, "*", f"{FALLBACK_CLASS_NAME}.mp4"))
+            if result.returncode != 0 or not videos:
+                tracer.log("Fallback scene render failed", hint=hint, tier=tier.name, returncode=result.returncode)
+                return None
+            if self.optimize:
+                await self.optimize(videos[0], label=key, webm=False)
+            target = self.path(hint, tier)
+            os.replace(videos[0], target)
+            tracer.log("Fallback scene cached", hint=hint, tier=tier.name, video_bytes=os.path.getsize(target))
+            return target
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def warm(self, tier: RenderTier, is_idle: Callable[[], bool], poll_interval: float = 5.0) -> None:
+        """Render every hint for a tier, one at a time and only while no other render runs"""
+        if not self.enabled or tier.mode != MODE_VIDEO:
+            return
+        for hint in all_hints():
+            if self.cached(hint, tier):
+                continue
+            while not is_idle():
+                await asyncio.sleep(poll_interval)
+            await self.get(hint, tier, label="warmup")
+        tracer.log("Fallback scene warm-up finished", tier=tier.name)
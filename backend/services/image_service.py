@@ -1,11 +1,12 @@
 """
 Image processing service for handling uploaded images
 """
+import asyncio
 import os
-import pytesseract
-from PIL import Image
 from typing import Optional
 from utils.file_utils import save_base64_image, is_valid_image_file
+from utils.metrics import OCR_SECONDS
+from utils.tracing import tracer
 
 
 class ImageService:
@@ -26,21 +27,27 @@ class ImageService:
             Tuple of (file_path, extracted_text)
         """
         try:
-            # Save the image to disk
-            file_path, filename = save_base64_image(image_base64, self.upload_dir)
-            
-            # Validate the image
-            if not is_valid_image_file(file_path):
-                raise ValueError("Invalid image file")
-            
-            # Extract text from image using OCR
-            extracted_text = self._extract_text_from_image(file_path)
+            with OCR_SECONDS.time(), tracer.span("ocr") as span:
+                # Decoding, validation and OCR are CPU-bound; keep them off the event loop
+                file_path, extracted_text = await asyncio.to_thread(self._process_image_sync, image_base64)
+                span.set_attribute("extracted_chars", len(extracted_text or ""))
             
             return file_path, extracted_text
             
         except Exception as e:
             raise Exception(f"Failed to process image: {str(e)}")
     
+    def _process_image_sync(self, image_base64: str) -> tuple[str, Optional[str]]:
+        # Save the image to disk
+        file_path, filename = save_base64_image(image_base64, self.upload_dir)
+        
+        # Validate the image
+        if not is_valid_image_file(file_path):
+            raise ValueError("Invalid image file")
+        
+        # Extract text from image using OCR
+        return file_path, self._extract_text_from_image(file_path)
+    
     def _extract_text_from_image(self, image_path: str) -> Optional[str]:
         """
         Extract text from image using OCR
@@ -51,6 +58,10 @@ class ImageService:
         Returns:
             Extracted text or None if no text found
         """
+        # OCR dependencies are heavy to import; load them when first needed
+        import pytesseract
+        from PIL import Image
+        
         try:
             # Open the image
             image = Image.open(image_path)
@@ -107,6 +118,8 @@ class ImageService:
         Returns:
             Dictionary with image information
         """
+        from PIL import Image
+        
         try:
             with Image.open(image_path) as img:
                 return {
@@ -0,0 +1,143 @@
+"""
+In-memory store for chat requests answered asynchronously (202 Accepted + job id)
+"""
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from utils.tracing import tracer
+
+# Job statuses
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+
+
+class JobRejected(Exception):
+    """Raised when too many jobs are already pending"""
+
+
+class Job:
+    """One asynchronous chat request and its eventual result"""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = JOB_QUEUED
+        self.stage: Optional[str] = None  # e.g. answering, rendering
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.status_code = 200
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.version = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def update(self, **fields) -> None:
+        """Change fields and wake anyone waiting for this job"""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def set_stage(self, stage: str) -> None:
+        self.update(stage=stage)
+
+    async def wait_for_change(self, version: int, timeout: float) -> bool:
+        """Wait until the job changes after `version`; False on timeout"""
+        if self.version != version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "status_code": self.status_code if self.finished else None,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobStore:
+    """
+    Runs job coroutines as background tasks and keeps their results.
+
+    Finished jobs are kept for ttl_seconds so clients can collect them;
+    at most max_active jobs may be unfinished at once.
+    """
+
+    def __init__(self, ttl_seconds: float = 3600, max_active: int = 100):
+        self.ttl_seconds = ttl_seconds
+        self.max_active = max_active
+        self.jobs: Dict[str, Job] = {}
+
+    def active_count(self) -> int:
+        return sum(1 for job in self.jobs.values() if not job.finished)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def submit(self, kind: str, run: Callable[[Job], Awaitable[dict]]) -> Job:
+        """
+        Start `run(job)` in the background.
+
+        `run` returns the JSON-ready result. An exception with `status_code`
+        and `detail` (HTTPException) fails the job with that status; any
+        other exception fails it with 500.
+        """
+        self.prune()
+        if self.active_count() >= self.max_active:
+            raise JobRejected(f"Too many pending jobs ({self.max_active})")
+        job = Job(kind)
+        self.jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job, run))
+        return job
+
+    async def _run(self, job: Job, run: Callable[[Job], Awaitable[dict]]) -> None:
+        with tracer.span(f"job.{job.kind}", job_id=job.id) as span:
+            job.update(status=JOB_RUNNING)
+            try:
+                result = await run(job)
+                job.update(status=JOB_SUCCEEDED, result=result, finished_at=time.time())
+            except asyncio.CancelledError:
+                job.update(status=JOB_FAILED, error="Job cancelled", status_code=503, finished_at=time.time())
+                raise
+            except Exception as e:
+                span.record_exception(e)
+                job.update(
+                    status=JOB_FAILED,
+                    error=str(getattr(e, "detail", None) or e),
+                    status_code=getattr(e, "status_code", 500),
+                    finished_at=time.time(),
+                )
+            span.set_attributes(status=job.status, status_code=job.status_code)
+
+    def prune(self) -> None:
+        """Forget finished jobs older than the TTL"""
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [job.id for job in self.jobs.values() if job.finished and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    async def cancel_all(self) -> None:
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,187 @@
+"""
+Live HLS playlists of renders in progress, built from manim's partial movie segments
+"""
+import asyncio
+import math
+import os
+import re
+import shutil
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from services.preview_generator import completed_segments
+from utils.file_utils import ensure_directory_exists
+from utils.metrics import LIVE_SEGMENTS
+from utils.tracing import tracer
+
+DURATION_RE = re.compile(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)")
+PLAYLIST_MEDIA_TYPE = "application/vnd.apple.mpegurl"
+SEGMENT_MEDIA_TYPE = "video/mp2t"
+SEGMENT_NAME_RE = re.compile(r"^segment_\d{5}\.ts$")
+
+
+class LiveStream:
+    """One request's growing EVENT playlist; segments are only ever appended"""
+
+    def __init__(self, request_id: str, directory: str, url_prefix: str, target_duration: float):
+        self.request_id = request_id
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self.target_duration = target_duration
+        self.segments: List[tuple] = []  # (file name, duration in seconds)
+        self.sources: List[str] = []  # partial movie files already published
+        self.finished = False
+        self.started_at = time.time()
+
+    @property
+    def duration(self) -> float:
+        return sum(duration for _, duration in self.segments)
+
+    def playlist(self) -> str:
+        # Segment URLs are absolute so the playlist works from any endpoint that serves it
+        target = max([self.target_duration, *(duration for _, duration in self.segments)])
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{math.ceil(target)}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for name, duration in self.segments:
+            lines += [f"#EXTINF:{duration:.3f},", f"{self.url_prefix}/{name}"]
+        if self.finished:
+            lines.append("#EXT-X-ENDLIST")
+        return "\n".join(lines) + "\n"
+
+
+class LiveStreamPublisher:
+    """
+    Publishes each finished partial movie of a render as an HLS segment.
+
+    Manim writes one partial movie per play()/wait() before combining them,
+    so a player can start on the first animation while the rest renders.
+    Segments are remuxed (no re-encode) to MPEG-TS with timestamps offset by
+    the segments before them into <output_dir>/<request_id>/. Commands run
+    through `run_command`, the executor-backed ffmpeg runner, so remuxes do
+    not count as renders in flight.
+    """
+
+    def __init__(
+        self,
+        run_command: Callable[..., Awaitable],
+        output_dir: str,
+        enabled: bool = True,
+        poll_interval: float = 0.5,
+        target_duration: float = 4.0,
+        ttl_seconds: float = 3600,
+        timeout: float = 30,
+    ):
+        self.run_command = run_command
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self.poll_interval = poll_interval
+        self.target_duration = target_duration
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.streams: Dict[str, LiveStream] = {}
+        self.ffmpeg = shutil.which("ffmpeg")
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and self.ffmpeg is not None
+
+    def get(self, request_id: str) -> Optional[LiveStream]:
+        return self.streams.get(request_id)
+
+    def segment_path(self, request_id: str, name: str) -> Optional[str]:
+        stream = self.streams.get(request_id)
+        if stream is None or not SEGMENT_NAME_RE.match(name):
+            return None
+        path = os.path.join(stream.directory, name)
+        return path if os.path.exists(path) else None
+
+    async def follow(
+        self,
+        request_id: str,
+        media_dir: str,
+        module_name: str,
+        class_name: str,
+        stop: asyncio.Event,
+        url_prefix: str,
+    ) -> None:
+        """Publish segments as the render writes them; after `stop`, publish the rest and end the playlist"""
+        self.prune()
+        # A retry of the same request starts over: its scene code changed
+        self.discard(request_id)
+        directory = os.path.join(os.path.abspath(self.output_dir), request_id)
+        ensure_directory_exists(directory)
+        stream = LiveStream(request_id, directory, url_prefix, self.target_duration)
+        self.streams[request_id] = stream
+        with tracer.span("live_stream", request_id=request_id) as span:
+            while True:
+                stopped = stop.is_set()
+                segments = completed_segments(media_dir, module_name, class_name, render_finished=stopped)
+                for source in [segment for segment in segments if segment not in stream.sources]:
+                    if not await self._publish(stream, source):
+                        stopped = True
+                        break
+                if stopped:
+                    break
+                try:
+                    await asyncio.wait_for(stop.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            stream.finished = True
+            span.set_attributes(segments=len(stream.segments), duration_s=round(stream.duration, 3))
+
+    async def _publish(self, stream: LiveStream, source: str) -> bool:
+        name = f"segment_{len(stream.segments):05d}.ts"
+        target = os.path.join(stream.directory, name)
+        temp_target = f"{target}.tmp.ts"
+        cmd = [
+            self.ffmpeg, "-y", "-hide_banner", "-loglevel", "info",
+            "-i", source,
+            "-c", "copy",
+            "-bsf:v", "h264_mp4toannexb",
+            "-output_ts_offset", f"{stream.duration:.6f}",
+            "-f", "mpegts",
+            temp_target,
+        ]
+        result = await self.run_command(
+            cmd, cwd=stream.directory, timeout=self.timeout, kind="live_segment", label=stream.request_id
+        )
+        match = DURATION_RE.search(result.stderr or "")
+        if result.returncode != 0 or match is None or not os.path.exists(temp_target):
+            LIVE_SEGMENTS.inc(outcome="error")
+            tracer.log("Live segment remux failed", segment=os.path.basename(source), returncode=result.returncode)
+            if os.path.exists(temp_target):
+                os.remove(temp_target)
+            return False
+        hours, minutes, seconds = match.groups()
+        os.replace(temp_target, target)
+        stream.segments.append((name, int(hours) * 3600 + int(minutes) * 60 + float(seconds)))
+        stream.sources.append(source)
+        LIVE_SEGMENTS.inc(outcome="published")
+        if len(stream.segments) == 1:
+            tracer.log("Live stream started", request_id=stream.request_id, after_s=round(time.time() - stream.started_at, 3))
+        return True
+
+    def discard(self, request_id: str) -> None:
+        stream = self.streams.pop(request_id, None)
+        if stream is not None:
+            shutil.rmtree(stream.directory, ignore_errors=True)
+
+    def prune(self) -> None:
+        """Drop finished streams older than the TTL (the finished video replaces them)"""
+        cutoff = time.time() - self.ttl_seconds
+        for request_id in [rid for rid, stream in self.streams.items() if stream.finished and stream.started_at < cutoff]:
+            self.discard(request_id)
+        if not os.path.isdir(self.output_dir):
+            return
+        # Directories left behind by an earlier process
+        for entry in os.scandir(self.output_dir):
+            try:
+                if entry.is_dir() and entry.name not in self.streams and entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except FileNotFoundError:
+                continue
@@ -1,21 +1,208 @@
 """
 Manim service for executing animation code and generating video files
 """
+import glob
 import os
+import re
 import sys
 import tempfile
 import subprocess
 import uuid
 import asyncio
 import base64
+import shutil
+import signal
+import threading
 import time
-from typing import Optional, Tuple
+from typing import Callable, List, Optional, Tuple
 from pathlib import Path
 from utils.config import settings
-from utils.file_utils import ensure_directory_exists, generate_unique_filename
+from utils.file_utils import ensure_directory_exists, generate_unique_filename, link_or_copy
+from utils.tracing import tracer
+from utils.metrics import (
+    FALLBACKS,
+    FFMPEG_SECONDS,
+    RENDERS_IN_FLIGHT,
+    RENDER_ATTEMPTS,
+    RENDER_LIMIT_EXCEEDED,
+    RENDER_QUEUE_DEPTH,
+    RENDER_SECONDS,
+    RENDER_TIER_SELECTIONS,
+    TIMEOUTS,
+)
+from services.render_tiers import MODE_NONE, MODE_STATIC, MODE_VIDEO, RenderTier, RenderTierPolicy
+from services.video_optimizer import VideoOptimizer
+from services.preview_generator import PreviewGenerator, completed_segments
+from services.fallback_scenes import FallbackSceneCache, question_hint
+from services.render_cache import RenderCache
+from services.scene_edits import SceneStore
+from services.media_store import MediaStore
+from services.live_stream import LiveStreamPublisher
+from services.tex_cache import WARMUP_SCENE, TexCache
+from services.render_sandbox import RenderLimits, RenderSandbox
+from services.render_scheduling import RenderScheduling
 from fastapi.responses import StreamingResponse
 
 
+QUALITY_FLAGS = {
+    "low_quality": "l",
+    "medium_quality": "m",
+    "high_quality": "h",
+    "production_quality": "p",
+    "fourk_quality": "k",
+}
+
+# Appended to scene modules rendered under a tier with max_duration. The module
+# is fully imported before manim calls construct(), so patching Scene here
+# turns every play()/wait() past the cap into a no-op.
+DURATION_CAP_TEMPLATE = """
+
+# Render tier duration cap
+from manim import Scene as _TierScene
+
+
+def _tier_capped(method):
+    def capped(self, *args, **kwargs):
+        if getattr(self.renderer, "time", 0) >= {max_duration}:
+            return None
+        return method(self, *args, **kwargs)
+    return capped
+
+
+_TierScene.play = _tier_capped(_TierScene.play)
+_TierScene.wait = _tier_capped(_TierScene.wait)
+"""
+
+
+class RenderProcessResult:
+    """Outcome and resource usage of one Manim subprocess"""
+
+    def __init__(
+        self,
+        returncode: int,
+        stdout: str = "",
+        stderr: str = "",
+        wall_time: float = 0.0,
+        cpu_time: float = 0.0,
+        peak_rss_kb: int = 0,
+        timed_out: bool = False,
+        limit_exceeded: Optional[str] = None,
+        cpus: str = "",
+    ):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.wall_time = wall_time
+        self.cpu_time = cpu_time
+        self.peak_rss_kb = peak_rss_kb
+        self.timed_out = timed_out
+        self.limit_exceeded = limit_exceeded  # "memory" or "cpu" when a sandbox limit stopped the render
+        self.cpus = cpus  # CPUs the process was allowed to run on, e.g. "1-7"
+
+    @property
+    def avg_cores(self) -> float:
+        """Average number of cores kept busy over the render's wall time"""
+        return self.cpu_time / self.wall_time if self.wall_time > 0 else 0.0
+
+
+def _kill_process_group(pid: int) -> None:
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_render_process(
+    cmd: list,
+    cwd: str,
+    timeout: float,
+    sandbox: Optional[RenderSandbox] = None,
+    limits: Optional[RenderLimits] = None,
+    scheduling: Optional[RenderScheduling] = None,
+    on_start: Optional[Callable[[int], None]] = None,
+) -> RenderProcessResult:
+    """
+    Run a render command to completion in the calling thread.
+
+    The child gets its own process group so a timeout kills manim together
+    with any latex/ffmpeg children, and wait4() gives us its CPU time and
+    peak RSS. With a sandbox, the child also runs under its resource limits
+    (and cgroup, if enabled) with a scrubbed environment, and the scheduling
+    policy sets its niceness, IO priority and CPU affinity. `on_start` gets
+    the child's pid (its process group id) as soon as it is running.
+    """
+    sandboxed = sandbox is not None and sandbox.enabled
+    popen_kwargs = {}
+    if sandboxed:
+        limits = limits or sandbox.limits_for()
+        popen_kwargs = sandbox.popen_kwargs(limits)
+    with tempfile.TemporaryFile() as out, tempfile.TemporaryFile() as err:
+        start_time = time.perf_counter()
+        process = subprocess.Popen(cmd, cwd=cwd, stdout=out, stderr=err, start_new_session=True, **popen_kwargs)
+        if scheduling is not None:
+            scheduling.apply(process.pid)
+        if on_start is not None:
+            on_start(process.pid)
+        cgroup = sandbox.attach(process.pid, limits) if sandboxed else None
+        timed_out = threading.Event()
+
+        def on_timeout():
+            timed_out.set()
+            _kill_process_group(process.pid)
+
+        timer = threading.Timer(timeout, on_timeout)
+        timer.start()
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        finally:
+            timer.cancel()
+        returncode = os.waitstatus_to_exitcode(status)
+        # wait4 already reaped the child; keep Popen from waiting on it again
+        process.returncode = returncode
+        wall_time = time.perf_counter() - start_time
+        cpu_time = usage.ru_utime + usage.ru_stime
+        peak_rss_kb = usage.ru_maxrss
+        out.seek(0)
+        err.seek(0)
+        stderr = err.read().decode("utf-8", errors="replace")
+        limit_exceeded = None
+        if timed_out.is_set():
+            stderr = f"{stderr}\nExecution timed out after {timeout}s".lstrip()
+        elif sandboxed:
+            limit_exceeded = sandbox.exceeded_limit(limits, returncode, cpu_time, stderr, cgroup)
+            if limit_exceeded == "memory":
+                stderr = f"{stderr}\nRender stopped: exceeded the memory limit of {limits.memory_mb} MB".lstrip()
+            elif limit_exceeded == "cpu":
+                stderr = f"{stderr}\nRender stopped: exceeded the CPU time limit of {limits.cpu_seconds}s".lstrip()
+        if cgroup is not None:
+            # The group's peak covers latex/ffmpeg children that rusage may miss
+            peak_rss_kb = max(peak_rss_kb, cgroup.peak_rss_kb())
+            cgroup.remove()
+        return RenderProcessResult(
+            returncode=-1 if timed_out.is_set() else returncode,
+            stdout=out.read().decode("utf-8", errors="replace"),
+            stderr=stderr,
+            wall_time=wall_time,
+            cpu_time=cpu_time,
+            peak_rss_kb=peak_rss_kb,
+            timed_out=timed_out.is_set(),
+            limit_exceeded=limit_exceeded,
+            cpus=scheduling.cpus_label() if scheduling is not None else "",
+        )
+
+
+def _read_file_base64(path: str) -> str:
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode("utf-8")
+
+
+# Module name of every render in a lineage directory (manim keys its segment cache by module)
+EDIT_MODULE = "scene"
+# manim's log lines for a reused and a freshly rendered animation segment
+CACHED_SEGMENT_RE = re.compile(r"Using cached data")
+RENDERED_SEGMENT_RE = re.compile(r"Animation \d+ : Partial movie file written")
+
+
 class ManimService:
     """Service for executing Manim code and generating animations"""
     
@@ -25,29 +212,106 @@ class ManimService:
         self.frame_rate = settings.MANIM_FRAME_RATE
         self.video_map = {}  # request_id -> video_path
         self.no_video_requests = set()  # request_ids that won't have videos
+        self.video_tiers = {}  # request_id -> render tier name
+        self.video_variants = {}  # request_id -> {mime type: path} of alternative encodings
+        self.scheduling = RenderScheduling(
+            enabled=settings.RENDER_SCHEDULING_ENABLED,
+            nice=settings.RENDER_NICE,
+            ioprio_class=settings.RENDER_IOPRIO_CLASS,
+            ioprio_level=settings.RENDER_IOPRIO_LEVEL,
+            reserved_cores=settings.RENDER_RESERVED_CORES,
+            ffmpeg_threads=settings.FFMPEG_THREADS,
+        )
+        self.optimizer = VideoOptimizer(
+            self._run_ffmpeg_command,
+            enabled=settings.VIDEO_OPTIMIZE_ENABLED,
+            reencode=settings.VIDEO_REENCODE,
+            x264_crf=settings.VIDEO_X264_CRF,
+            x264_preset=settings.VIDEO_X264_PRESET,
+            webm=settings.VIDEO_WEBM_ENABLED,
+            vp9_crf=settings.VIDEO_VP9_CRF,
+            thread_args=self.scheduling.ffmpeg_thread_args(),
+        )
+        self.previews = {}  # request_id -> {"poster", "preview", "source"}
+        self.preview_generator = PreviewGenerator(
+            self._run_ffmpeg_command,
+            output_dir=os.path.join(settings.MEDIA_DIR, "previews"),
+            enabled=settings.PREVIEW_ENABLED,
+            fps=settings.PREVIEW_FPS,
+            width=settings.PREVIEW_WIDTH,
+            max_seconds=settings.PREVIEW_MAX_SECONDS,
+            thread_args=self.scheduling.ffmpeg_thread_args(),
+        )
+        self.live = LiveStreamPublisher(
+            self._run_ffmpeg_command,
+            output_dir=os.path.join(settings.MEDIA_DIR, "live"),
+            enabled=settings.LIVE_STREAM_ENABLED,
+            poll_interval=settings.LIVE_STREAM_POLL_INTERVAL,
+            target_duration=settings.LIVE_STREAM_TARGET_DURATION,
+        )
+        self.tier_policy = RenderTierPolicy(enabled=settings.RENDER_TIERS_ENABLED)
+        self.sandbox = RenderSandbox(
+            enabled=settings.RENDER_SANDBOX_ENABLED,
+            memory_mb=settings.RENDER_MEMORY_MB,
+            cpu_seconds=settings.RENDER_CPU_SECONDS,
+            cpu_cores=settings.RENDER_CPU_CORES,
+            pids_max=settings.RENDER_PIDS_MAX,
+            env_passthrough=settings.RENDER_ENV_PASSTHROUGH,
+            cgroup_root=settings.RENDER_CGROUP_ROOT,
+        )
+        self.tex_cache = TexCache(
+            settings.TEX_CACHE_DIR,
+            max_bytes=settings.TEX_CACHE_MAX_MB * 1024 * 1024,
+            enabled=settings.TEX_CACHE_ENABLED,
+        )
+        self.fallback_scenes = FallbackSceneCache(
+            settings.FALLBACK_SCENE_DIR,
+            self._run_manim_command,
+            optimize=self.optimizer.optimize,
+            enabled=settings.FALLBACK_SCENE_CACHE_ENABLED,
+        )
+        self.render_cache = RenderCache(
+            settings.RENDER_CACHE_DIR,
+            max_bytes=settings.RENDER_CACHE_MAX_MB * 1024 * 1024,
+            enabled=settings.RENDER_CACHE_ENABLED,
+        )
+        self.media = MediaStore(
+            settings.MEDIA_DIR,
+            settings.MEDIA_STORE_INDEX,
+            ttl_seconds=settings.MEDIA_STORE_TTL_HOURS * 3600,
+            enabled=settings.MEDIA_STORE_ENABLED,
+        )
+        self.scenes = SceneStore(settings.SCENE_STORE_DIR, ttl_seconds=settings.SCENE_EDIT_TTL_HOURS * 3600)
+        self._lineage_locks = {}  # lineage id -> asyncio.Lock, one edit render per lineage directory
+        self.warmup_task = None
+        self.background_tasks = set()  # preview watchers and live streams of running renders
         
         # Ensure output directory exists
         ensure_directory_exists(self.output_dir)
     
-    async def generate_animation(self, manim_code: str) -> Optional[str]:
+    async def generate_animation(self, manim_code: str, tier: Optional[RenderTier] = None) -> Optional[str]:
         """
         Execute Manim code and generate animation video
         
         Args:
             manim_code: Python code containing Manim animation
+            tier: Render tier to use; chosen from the current load if omitted
             
         Returns:
             Path to the generated video file, or None if failed
         """
         if not manim_code.strip():
             return None
+        tier = tier or self.select_tier()
+        if tier.mode == MODE_NONE:
+            return None
         
         try:
             # Create a temporary file for the Manim code
-            temp_file = await self._create_temp_manim_file(manim_code)
+            temp_file = await self._create_temp_manim_file(self._prepare_code(manim_code, tier))
             
             # Execute the Manim code
-            video_path = await self._execute_manim(temp_file)
+            video_path = await self._execute_manim(temp_file, tier)
             
             # Clean up temporary file
             os.unlink(temp_file)
@@ -58,398 +322,631 @@ class ManimService:
             print(f"Manim execution failed: {str(e)}")
             return None
         
-    async def generate_animation_base64(self, manim_code: str, class_name: str = "ConceptAnimation") -> str:
+    async def generate_animation_base64(
+        self,
+        manim_code: str,
+        class_name: str = "ConceptAnimation",
+        tier: Optional[RenderTier] = None,
+    ) -> str:
         """
         Execute Manim code, return base64-encoded video, and delete temp files.
         """
-        temp_file = await self._create_temp_manim_file(manim_code)
-        video_path = await self._execute_manim(temp_file)
+        tier = tier or self.select_tier()
+        if tier.mode == MODE_NONE:
+            return None
+        prepared_code = self._prepare_code(manim_code, tier)
+        cached_path = self.render_cache.get(prepared_code, class_name, tier)
+        if cached_path:
+            tracer.log("Serving cached render", class_name=class_name, tier=tier.name)
+            return await asyncio.to_thread(_read_file_base64, cached_path)
+        temp_file = await self._create_temp_manim_file(prepared_code)
+        video_path = await self._execute_manim(temp_file, tier)
         os.unlink(temp_file)
         if video_path and os.path.exists(video_path):
-            with open(video_path, "rb") as f:
-                video_bytes = f.read()
+            # Inlined as base64 MP4, so no WebM variant
+            await self.optimizer.optimize(video_path, label=class_name, webm=False)
+            await asyncio.to_thread(self.render_cache.put, prepared_code, class_name, tier, video_path)
+            video_base64 = await asyncio.to_thread(_read_file_base64, video_path)
             os.unlink(video_path)
-            return base64.b64encode(video_bytes).decode("utf-8")
+            return video_base64
         return None
     
     async def generate_animation_stream(self, manim_code: str, class_name: str = "ConceptAnimation"):
         """
         Generate Manim animation and stream the video as a response (no permanent file)
         """
-        # Create temp directory in current working directory
-        temp_dir = os.path.join(os.getcwd(), "temp_manim")
-        os.makedirs(temp_dir, exist_ok=True)
-        
-        temp_py_path = os.path.join(temp_dir, f"animation_{uuid.uuid4().hex[:8]}.py")
-        temp_video_path = os.path.join(temp_dir, f"video_{uuid.uuid4().hex[:8]}.mp4")
+        # Own working directory under temp_manim, removed once the video has been streamed
+        work_dir = tempfile.mkdtemp(prefix="stream_", dir=self._temp_root())
+        module_name = f"animation_{uuid.uuid4().hex[:8]}"
         
         try:
             # Write the Manim code
-            with open(temp_py_path, 'w', encoding='utf-8') as f:
+            with open(os.path.join(work_dir, f"{module_name}.py"), 'w', encoding='utf-8') as f:
                 f.write(manim_code)
             
-            # Run Manim
+            # Run Manim in the render executor, off the event loop
             cmd = [
                 sys.executable, "-m", "manim",
                 "-pql",
-                "--media_dir", temp_dir,
-                temp_py_path,
+                "--media_dir", ".",
+                f"{module_name}.py",
                 class_name
             ]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = await self._run_manim_command(cmd, cwd=work_dir, timeout=300, kind="stream", label=class_name)
             if result.returncode != 0:
                 print(result.stderr)
                 raise RuntimeError("Manim execution failed")
             
             # Find the generated video file
-            mp4_files = [f for f in os.listdir(temp_dir) if f.endswith('.mp4')]
-            if not mp4_files:
+            video_path = self._find_scene_video(work_dir, module_name, class_name)
+            if not video_path:
                 raise RuntimeError("No video file generated by Manim")
-            
-            video_path = os.path.join(temp_dir, mp4_files[0])
-            video_file = open(video_path, 'rb')
-            return StreamingResponse(video_file, media_type="video/mp4")
-            
-        finally:
-            # Clean up temporary files
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+
+        def stream_and_clean_up():
             try:
-                if os.path.exists(temp_py_path):
-                    os.remove(temp_py_path)
-            except:
-                pass
+                with open(video_path, 'rb') as video_file:
+                    while chunk := video_file.read(64 * 1024):
+                        yield chunk
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        return StreamingResponse(stream_and_clean_up(), media_type="video/mp4")
     
-    async def render_and_store_video(self, manim_code: str, class_name: str, request_id: str):
-        print(f"[ManimService] render_and_store_video called with request_id: {request_id}")
-        print(f"[ManimService] Class name: {class_name}")
-        
+    async def _store_video(self, request_id: str, video_path: str) -> dict:
+        """
+        Optimize a finished render, then make it (and its variants and previews) available.
+
+        Returns the files made from the video by role (webm, poster,
+        preview), for the render cache to keep next to it.
+        """
+        report = await self.optimizer.optimize(video_path, label=request_id)
+        # Before mapping: the video is deleted once a client has fetched it
+        previews = await self.preview_generator.generate(request_id, video_path)
+        await self._publish_video(request_id, video_path, report["webm"], previews)
+        return {"webm": report["webm"], **previews}
+
+    async def _store_cached_video(self, request_id: str, video_path: str, variants: dict) -> None:
+        """
+        Make an already optimized video (a cache hit) available without running ffmpeg again.
+
+        `variants` are the files cached next to it (see RenderCache.variants);
+        previews are only generated when the cache has none.
+        """
+        webm_path = variants.get("webm")
+        if webm_path:
+            webm_path = link_or_copy(webm_path, f"{os.path.splitext(video_path)[0]}.webm")
+        if variants.get("poster"):
+            previews = self.preview_generator.adopt(request_id, variants)
+        else:
+            previews = await self.preview_generator.generate(request_id, video_path)
+        await self._publish_video(request_id, video_path, webm_path, previews)
+
+    async def _publish_video(self, request_id: str, video_path: str, webm_path: Optional[str], previews: dict) -> None:
+        if webm_path:
+            self.video_variants[request_id] = {"video/webm": webm_path}
+        if previews["poster"]:
+            self.previews[request_id] = {**previews, "source": "video"}
+        await asyncio.to_thread(self.media.put, request_id, video_path, "video/mp4")
+        if webm_path:
+            await asyncio.to_thread(self.media.put, request_id, webm_path, "video/webm")
+        self.video_map[request_id] = video_path
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Run background work tied to a render; the reference kept here stops it being garbage-collected"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self._background_task_done)
+        return task
+
+    def _background_task_done(self, task: asyncio.Task) -> None:
+        self.background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            tracer.log("Background render task failed", error=str(task.exception()) or type(task.exception()).__name__)
+
+    async def _watch_partial_movies(
+        self,
+        request_id: str,
+        media_dir: str,
+        module_name: str,
+        class_name: str,
+        stop: asyncio.Event,
+    ) -> None:
+        """Make an early poster and preview from the first finished partial movie segment"""
+        while not stop.is_set():
+            segments = completed_segments(media_dir, module_name, class_name)
+            if segments:
+                previews = await self.preview_generator.generate(request_id, segments[0], segment=True)
+                # The finished video's previews may have landed meanwhile; keep those
+                if previews["poster"] and request_id not in self.previews:
+                    self.previews[request_id] = {**previews, "source": "segment"}
+                    tracer.log("Early preview ready from partial movie", segment=os.path.basename(segments[0]))
+                return
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=settings.PREVIEW_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def get_video_status(self, request_id: str) -> dict:
+        """Render status of a request with its poster and preview, if any"""
+        if request_id in self.video_map:
+            status = "ready"
+        elif request_id in self.no_video_requests:
+            status = "no_video"
+        else:
+            status = "pending"
+        previews = self.previews.get(request_id, {})
+        live = self.live.get(request_id)
+        return {
+            "request_id": request_id,
+            "status": status,
+            "render_tier": self.video_tiers.get(request_id),
+            "poster": previews.get("poster"),
+            "preview": previews.get("preview"),
+            "preview_source": previews.get("source"),
+            "media_url": self.media.url(request_id) if status == "ready" else None,
+            "live": live is not None and bool(live.segments),
+        }
+
+    def get_video_variant(self, request_id: str, accept: str) -> Tuple[Optional[str], str]:
+        """Best (path, media type) for a request given the client's Accept header"""
+        accept = (accept or "").lower()
+        if "video/webm" in accept:
+            stored = self.media.get(request_id, "video/webm")
+            if stored:
+                return stored["path"], "video/webm"
+            webm_path = self.video_variants.get(request_id, {}).get("video/webm")
+            if webm_path and os.path.exists(webm_path):
+                return webm_path, "video/webm"
+        stored = self.media.get(request_id, "video/mp4")
+        # The stored copy outlives the render's own file, which is deleted once fetched
+        return (stored["path"] if stored else self.video_map.get(request_id)), "video/mp4"
+
+    def select_tier(self) -> RenderTier:
+        """Choose the render tier for a new animation job from the current load"""
+        queue_depth = int(RENDER_QUEUE_DEPTH.get())
+        in_flight = int(RENDERS_IN_FLIGHT.get())
+        tier = self.tier_policy.select(queue_depth, in_flight)
+        RENDER_TIER_SELECTIONS.inc(tier=tier.name)
+        tracer.log("Render tier selected", tier=tier.name, queue_depth=queue_depth, in_flight=in_flight)
+        return tier
+
+    def start_warmup(self, tex: bool = True, fallback_scenes: bool = True) -> None:
+        """
+        Background warm-up: compile common Tex/Text into the shared cache, then
+        pre-render the fallback scenes for the best video tier. Each render
+        waits until no other render is queued or running.
+        """
+        self.warmup_task = asyncio.create_task(self._warm_up(tex, fallback_scenes))
+
+    def _renderer_idle(self) -> bool:
+        return RENDER_QUEUE_DEPTH.get() == 0 and RENDERS_IN_FLIGHT.get() == 0
+
+    async def _warm_up(self, tex: bool, fallback_scenes: bool) -> None:
+        try:
+            if tex and self.tex_cache.enabled:
+                while not self._renderer_idle():
+                    await asyncio.sleep(5)
+                result = await self.render_scene(
+                    WARMUP_SCENE, "TexCacheWarmup", quality="l", kind="tex_warmup", last_frame_only=True
+                )
+                shutil.rmtree(result["work_dir"], ignore_errors=True)
+                tracer.log("Tex cache warm-up finished", returncode=result["returncode"], cache_bytes=self.tex_cache.size())
+            tier = self.tier_policy.tiers[0]
+            if fallback_scenes and tier.mode == MODE_VIDEO:
+                await self.fallback_scenes.warm(tier, self._renderer_idle)
+        except Exception as e:
+            tracer.log("Render warm-up failed", error=str(e))
+
+    @staticmethod
+    def _prepare_code(manim_code: str, tier: RenderTier) -> str:
+        """Apply the tier's maximum scene duration to a scene module"""
+        if tier.mode != MODE_VIDEO or not tier.max_duration:
+            return manim_code
+        return manim_code + DURATION_CAP_TEMPLATE.format(max_duration=float(tier.max_duration))
+
+    async def render_and_store_video(
+        self,
+        manim_code: str,
+        class_name: str,
+        request_id: str,
+        tier: Optional[RenderTier] = None,
+    ):
+        tier = tier or self.select_tier()
+        self.video_tiers[request_id] = tier.name
+        # The last code tried for a request is what a follow-up edit starts from
+        lineage = self.scenes.get(request_id)
+        self.scenes.put(
+            request_id,
+            manim_code,
+            class_name,
+            tier=tier.name,
+            parent_id=lineage and lineage["parent_id"],
+            lineage_id=lineage and lineage["lineage_id"],
+            instruction=lineage and lineage["instruction"],
+        )
+        if tier.mode == MODE_NONE:
+            tracer.log("Render skipped under load, explanation only", tier=tier.name)
+            FALLBACKS.inc(stage="render", reason="load_shed")
+            self.no_video_requests.add(request_id)
+            return (None, None, manim_code)
+
         temp_dir = os.path.join(os.getcwd(), "temp_manim")
         os.makedirs(temp_dir, exist_ok=True)
-        print(f"[ManimService] Using temp_dir: {temp_dir}")
+        prepared_code = self._prepare_code(manim_code, tier)
+        cached_path = self.render_cache.get(prepared_code, class_name, tier)
+        if cached_path:
+            video_path = link_or_copy(cached_path, os.path.join(temp_dir, f"cached_{request_id}.mp4"))
+            await self._store_cached_video(
+                request_id, video_path, self.render_cache.variants(prepared_code, class_name, tier)
+            )
+            tracer.log("Cached render mapped", video_path=video_path, tier=tier.name)
+            return (video_path, None, manim_code)
         
         temp_py_path = os.path.join(temp_dir, f"animation_{request_id}.py")
         try:
             with open(temp_py_path, 'w', encoding='utf-8') as f:
-                f.write(manim_code)
-            print(f"[ManimService] Wrote Manim code to: {temp_py_path}")
+                f.write(prepared_code)
             
             rel_py_path = os.path.basename(temp_py_path)
             cmd = [
                 sys.executable, "-m", "manim",
-                "-pql",
+                *tier.manim_args(),
                 "--media_dir", ".",
                 rel_py_path,
                 class_name
             ]
-            print(f"[ManimService] Running Manim subprocess: {' '.join(cmd)}")
+            module_name = os.path.splitext(rel_py_path)[0]
+            # A retry reuses the module name: drop the failed attempt's segments and
+            # videos (possibly at another tier's resolution) before they are published
+            shutil.rmtree(os.path.join(temp_dir, "videos", module_name), ignore_errors=True)
+            stop_watching = asyncio.Event()
+            if tier.mode == MODE_VIDEO and self.preview_generator.available and request_id not in self.previews:
+                # Not awaited: a preview already being generated finishes on its own
+                self._spawn(self._watch_partial_movies(request_id, temp_dir, module_name, class_name, stop_watching))
+            if tier.mode == MODE_VIDEO and self.live.available:
+                self._spawn(
+                    self.live.follow(
+                        request_id, temp_dir, module_name, class_name, stop_watching,
+                        url_prefix=f"/chat/video/{request_id}/live",
+                    )
+                )
             try:
-                result = await asyncio.wait_for(
-                    asyncio.get_event_loop().run_in_executor(
-                        None,
-                        lambda: subprocess.run(
-                            cmd, 
-                            capture_output=True, 
-                            text=True,
-                            env=os.environ.copy(),
-                            cwd=temp_dir,
-                            timeout=300
-                        )
-                    ),
-                    timeout=130
+                result = await self._run_manim_command(
+                    cmd, cwd=temp_dir, timeout=tier.timeout or 130, kind="scene", label=request_id, tier=tier
                 )
-            except asyncio.TimeoutError:
-                print(f"[ManimService] Manim execution timed out for {request_id}")
-                result = type('MockResult', (), {
-                    'returncode': -1,
-                    'stdout': '',
-                    'stderr': 'Execution timed out'
-                })()
-            except Exception as e:
-                print(f"[ManimService] Manim execution failed with exception: {e}")
-                result = type('MockResult', (), {
-                    'returncode': -1,
-                    'stdout': '',
-                    'stderr': f'Execution failed: {str(e)}'
-                })()
-            print(f"[ManimService] Subprocess result: {result.returncode}")
-            print(f"[ManimService] Subprocess stdout: {result.stdout}")
-            print(f"[ManimService] Subprocess stderr: {result.stderr}")
-            
+            finally:
+                stop_watching.set()
+            if result.returncode == 0 and tier.mode == MODE_STATIC:
+                still_path = self._find_scene_still(temp_dir, module_name, class_name)
+                poster = self.preview_generator.poster_from_image(request_id, still_path) if still_path else None
+                if poster:
+                    self.previews[request_id] = {"poster": poster, "preview": None, "source": "still"}
+                video_path = await self._render_still_video(temp_dir, module_name, class_name, tier, request_id)
+                if video_path:
+                    await self._store_video(request_id, video_path)
+                    tracer.log("Static frame video mapped", video_path=video_path)
+                else:
+                    self.no_video_requests.add(request_id)
+                return (video_path, None, manim_code)
             if result.returncode != 0:
-                print(f"[ManimService] Manim execution failed with return code: {result.returncode}")
-                print(f"[ManimService] Generated code that failed:")
-                with open(temp_py_path, 'r', encoding='utf-8') as f:
-                    print(f.read())
-                # Check for partial videos
-                partial_videos = []
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        if file.endswith('.mp4'):
-                            partial_videos.append(os.path.join(root, file))
+                tracer.log("Manim execution failed", returncode=result.returncode)
+                # Check for partial videos (this module's only: other renders share temp_manim)
+                partial_videos = self._module_videos(temp_dir, module_name)
                 if partial_videos:
-                    print(f"[ManimService] Found partial videos despite error: {partial_videos}")
                     largest_video = max(partial_videos, key=lambda x: os.path.getsize(x))
-                    print(f"[ManimService] Using largest partial video: {largest_video}")
-                    self.video_map[request_id] = largest_video
+                    tracer.log("Using largest partial video despite error", partial_videos=len(partial_videos), video_path=largest_video)
+                    await self._store_video(request_id, largest_video)
                     return (largest_video, None, manim_code)
                 # Return error and code for debugging
                 return (None, result.stderr, manim_code)
+            # The scene's own output first: other renders share temp_manim
+            video_path = self._find_scene_video(temp_dir, module_name, class_name)
+            if video_path:
+                if self.scenes.enabled:
+                    lineage_dir = self._lineage_dir((lineage and lineage["lineage_id"]) or request_id)
+                    await asyncio.to_thread(self._seed_lineage_dir, lineage_dir, temp_dir, module_name, class_name)
+                stored = await self._store_video(request_id, video_path)
+                await asyncio.to_thread(self.render_cache.put, prepared_code, class_name, tier, video_path, stored)
+                tracer.log("Scene video mapped", video_path=video_path, video_bytes=os.path.getsize(video_path))
+                return (video_path, None, manim_code)
             # Normal video search
-            print(f"[ManimService] Files in temp_dir after execution: {os.listdir(temp_dir)}")
-            mp4_files = []
-            for root, dirs, files in os.walk(temp_dir):
-                for file in files:
-                    if file.endswith('.mp4'):
-                        mp4_files.append(os.path.join(root, file))
-            print(f"[ManimService] Found mp4 files: {mp4_files}")
+            mp4_files = self._module_videos(temp_dir, module_name)
             if mp4_files:
                 mp4_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
                 current_time = time.time()
                 recent_videos = [f for f in mp4_files if current_time - os.path.getmtime(f) < 60]
                 if recent_videos:
                     video_path = recent_videos[0]
-                    self.video_map[request_id] = video_path
-                    print(f"[ManimService] Recent video mapped: {request_id} -> {video_path}")
-                    print(f"[ManimService] Video file size: {os.path.getsize(video_path)} bytes")
+                    await self._store_video(request_id, video_path)
+                    tracer.log("Recent video mapped", video_path=video_path, video_bytes=os.path.getsize(video_path))
                     return (video_path, None, manim_code)
                 else:
                     video_path = mp4_files[0]
-                    self.video_map[request_id] = video_path
-                    print(f"[ManimService] Video mapped: {request_id} -> {video_path}")
-                    print(f"[ManimService] Video file size: {os.path.getsize(video_path)} bytes")
+                    await self._store_video(request_id, video_path)
+                    tracer.log("Video mapped", video_path=video_path, video_bytes=os.path.getsize(video_path))
                     return (video_path, None, manim_code)
             else:
-                print(f"[ManimService] No .mp4 files found in {temp_dir} after execution!")
-                
-                # Try creating a more substantial fallback Manim scene
-                print(f"[ManimService] Creating substantial fallback Manim scene...")
-                
-                # Extract the original question from the manim_code if possible
-                # Look for any text that might indicate what the user asked about
-                question_hint = "your question"
-                if "Dijkstra" in manim_code or "dijkstra" in manim_code.lower():
-                    question_hint = "Dijkstra's Algorithm"
-                elif "sort" in manim_code.lower():
-                    question_hint = "Sorting Algorithm"
-                elif "graph" in manim_code.lower():
-                    question_hint = "Graph Algorithm"
-                elif "tree" in manim_code.lower():
-                    question_hint = "Tree Data Structure"
-                elif "search" in manim_code.lower():
-                    question_hint = "Search Algorithm"
-                elif "path" in manim_code.lower():
-                    question_hint = "Path Finding"
-                elif "sort" in manim_code.lower():
-                    question_hint = "Sorting"
-                elif "math" in manim_code.lower() or "equation" in manim_code.lower():
-                    question_hint = "Mathematical Concept"
-                elif "physics" in manim_code.lower():
-                    question_hint = "Physics Concept"
-                elif "chemistry" in manim_code.lower():
-                    question_hint = "Chemistry Concept"
-                
-                simple_manim_code = f'''
-from manim import *
-
-class {class_name}(Scene):
-    def construct(self):
-        # Create a substantial educational animation related to the user's question
-        title = Text("{question_hint}", font_size=36, color=BLUE)
-        self.play(Write(title))
-        self.wait(0.5)
-        
-        # Step 1: Show initial state
-        step1_text = Text("Step 1: Understanding the Problem", font_size=24, color=WHITE).next_to(title, DOWN)
-        self.play(Write(step1_text))
-        self.wait(0.5)
-        
-        # Create multiple geometric shapes with labels
-        circle = Circle(color=RED, radius=0.4).shift(LEFT * 3 + UP)
-        circle_label = Text("A", font_size=20, color=WHITE).next_to(circle, DOWN)
-        circle_group = VGroup(circle, circle_label)
-        
-        square = Square(color=GREEN, side_length=0.8).shift(RIGHT * 3 + UP)
-        square_label = Text("B", font_size=20, color=WHITE).next_to(square, DOWN)
-        square_group = VGroup(square, square_label)
-        
-        triangle = Triangle(color=YELLOW).scale(0.4).shift(UP * 2)
-        triangle_label = Text("C", font_size=20, color=WHITE).next_to(triangle, DOWN)
-        triangle_group = VGroup(triangle, triangle_label)
-        
-        # Animate shapes appearing one by one
-        self.play(Create(circle_group))
-        self.wait(0.3)
-        self.play(Create(square_group))
-        self.wait(0.3)
-        self.play(Create(triangle_group))
-        self.wait(0.5)
-        
-        # Step 2: Show connections
-        step2_text = Text("Step 2: Creating Connections", font_size=24, color=WHITE).next_to(step1_text, DOWN)
-        self.play(Write(step2_text))
-        self.wait(0.3)
-        
-        # Add connecting lines with animations
-        line1 = Line(circle.get_center(), square.get_center(), color=WHITE, stroke_width=3)
-        line2 = Line(square.get_center(), triangle.get_center(), color=WHITE, stroke_width=3)
-        line3 = Line(triangle.get_center(), circle.get_center(), color=WHITE, stroke_width=3)
-        
-        self.play(Create(line1))
-        self.wait(0.2)
-        self.play(Create(line2))
-        self.wait(0.2)
-        self.play(Create(line3))
-        self.wait(0.5)
-        
-        # Step 3: Show transformations
-        step3_text = Text("Step 3: Processing Data", font_size=24, color=WHITE).next_to(step2_text, DOWN)
-        self.play(Write(step3_text))
-        self.wait(0.3)
-        
-        # Animate transformations with different effects
-        self.play(
-            circle.animate.scale(1.3).set_color(PURPLE),
-            circle_label.animate.set_color(PURPLE),
-            run_time=1
-        )
-        self.wait(0.3)
-        
-        self.play(
-            square.animate.rotate(PI/6).set_color(ORANGE),
-            square_label.animate.set_color(ORANGE),
-            run_time=1
-        )
-        self.wait(0.3)
-        
-        self.play(
-            triangle.animate.scale(1.2).set_color(PINK),
-            triangle_label.animate.set_color(PINK),
-            run_time=1
-        )
-        self.wait(0.5)
-        
-        # Step 4: Show data flow
-        step4_text = Text("Step 4: Data Flow", font_size=24, color=WHITE).next_to(step3_text, DOWN)
-        self.play(Write(step4_text))
-        self.wait(0.3)
-        
-        # Animate data flow along the lines
-        data_dot1 = Dot(color=BLUE, radius=0.1).move_to(circle.get_center())
-        data_dot2 = Dot(color=BLUE, radius=0.1).move_to(square.get_center())
-        data_dot3 = Dot(color=BLUE, radius=0.1).move_to(triangle.get_center())
-        
-        self.play(Create(data_dot1))
-        self.play(data_dot1.animate.move_to(square.get_center()), run_time=1)
-        self.play(Create(data_dot2))
-        self.play(data_dot2.animate.move_to(triangle.get_center()), run_time=1)
-        self.play(Create(data_dot3))
-        self.play(data_dot3.animate.move_to(circle.get_center()), run_time=1)
-        self.wait(0.5)
-        
-        # Step 5: Final result
-        step5_text = Text("Step 5: Final Result", font_size=24, color=WHITE).next_to(step4_text, DOWN)
-        self.play(Write(step5_text))
-        self.wait(0.3)
-        
-        # Highlight all elements
-        self.play(
-            VGroup(circle_group, square_group, triangle_group).animate.set_color(GREEN),
-            VGroup(line1, line2, line3).animate.set_color(GREEN).set_stroke_width(6),
-            VGroup(data_dot1, data_dot2, data_dot3).animate.set_color(GREEN)
-        )
-        self.wait(1)
-        
-        # Final summary
-        summary = Text("Algorithm Complete!", font_size=28, color=GREEN)
-        summary.next_to(title, UP)
-        self.play(Write(summary))
-        self.wait(1.5)
-        
-        # Clean up with fade out
-        all_elements = VGroup(
-            title, step1_text, step2_text, step3_text, step4_text, step5_text,
-            circle_group, square_group, triangle_group,
-            line1, line2, line3, data_dot1, data_dot2, data_dot3, summary
-        )
-        self.play(FadeOut(all_elements))
-        self.wait(0.5)
-'''
-                
-                simple_py_path = os.path.join(temp_dir, f"simple_{request_id}.py")
-                with open(simple_py_path, 'w', encoding='utf-8') as f:
-                    f.write(simple_manim_code)
-                
-                # Try the simple scene
-                simple_cmd = [
-                    sys.executable, "-m", "manim",
-                    "-pql",
-                    "--media_dir", ".",
-                    os.path.basename(simple_py_path),
-                    class_name
-                ]
-                
-                try:
-                    simple_result = await asyncio.wait_for(
-                        asyncio.get_event_loop().run_in_executor(
-                            None,
-                            lambda: subprocess.run(
-                                simple_cmd,
-                                capture_output=True,
-                                text=True,
-                                cwd=temp_dir,
-                                timeout=60  # 1 minute timeout for simple scene
-                            )
-                        ),
-                        timeout=70  # Slightly longer timeout for the async wrapper
-                    )
-                except asyncio.TimeoutError:
-                    print(f"[ManimService] Simple scene execution timed out for {request_id}")
-                    simple_result = type('MockResult', (), {
-                        'returncode': -1,
-                        'stdout': '',
-                        'stderr': 'Simple scene execution timed out'
-                    })()
-                except Exception as e:
-                    print(f"[ManimService] Simple scene execution failed with exception: {e}")
-                    simple_result = type('MockResult', (), {
-                        'returncode': -1,
-                        'stdout': '',
-                        'stderr': f'Simple scene execution failed: {str(e)}'
-                    })()
-                
-                print(f"[ManimService] Simple scene result: {simple_result.returncode}")
-                print(f"[ManimService] Simple scene stdout: {simple_result.stdout}")
-                print(f"[ManimService] Simple scene stderr: {simple_result.stderr}")
-                
-                # Check for generated video again
-                mp4_files = []
-                for root, dirs, files in os.walk(temp_dir):
-                    for file in files:
-                        if file.endswith('.mp4'):
-                            mp4_files.append(os.path.join(root, file))
-                
-                if mp4_files:
-                    video_path = mp4_files[0]
-                    self.video_map[request_id] = video_path
-                    print(f"[ManimService] Simple video mapped: {request_id} -> {video_path}")
-                else:
-                    # No video was generated, don't create a fake one
-                    print(f"[ManimService] No video files generated by simple scene either")
-                    print(f"[ManimService] Request {request_id} will not have a video")
-                    # Mark this request as not having a video
-                    self.no_video_requests.add(request_id)
+                # Already over budget: serve the pre-rendered generic scene for this topic
+                tracer.log("No .mp4 files found after execution, serving cached fallback scene")
+                FALLBACKS.inc(stage="render", reason="no_video")
+                hint = question_hint(manim_code)
+                cached_path = await self.fallback_scenes.get(hint, tier, label=request_id)
+                if cached_path:
+                    video_path = link_or_copy(cached_path, os.path.join(temp_dir, f"fallback_{request_id}.mp4"))
+                    # Optimized when it was cached
+                    await self._store_cached_video(request_id, video_path, {})
+                    tracer.log("Fallback scene mapped", hint=hint, video_path=video_path)
+                    return (video_path, None, manim_code)
+                # No video was generated, don't create a fake one
+                tracer.log("Fallback scene unavailable, request will not have a video")
+                self.no_video_requests.add(request_id)
+                return (None, None, manim_code)
                 
         finally:
             # Clean up temporary files
             try:
                 if os.path.exists(temp_py_path):
                     os.remove(temp_py_path)
-                simple_py_path = os.path.join(temp_dir, f"simple_{request_id}.py")
-                if os.path.exists(simple_py_path):
-                    os.remove(simple_py_path)
             except Exception as e:
-                print(f"[ManimService] Cleanup error: {e}")
+                tracer.log("Cleanup error", error=str(e))
                 pass
 
+    async def _run_manim_command(
+        self,
+        cmd: list,
+        cwd: str,
+        timeout: float,
+        kind: str,
+        label: str = "",
+        tier: Optional[RenderTier] = None,
+        counts_as_render: bool = True,
+    ) -> RenderProcessResult:
+        """
+        Run a Manim command in the default executor and record render metrics.
+
+        The command runs in the render sandbox with the tier's limits (the
+        sandbox defaults without a tier). Timeouts and launch failures are
+        reported as returncode -1. With counts_as_render off (ffmpeg
+        post-processing) the command is left out of RENDERS_IN_FLIGHT, which
+        drives tier selection and idle checks, and out of the render metrics.
+        """
+        start_time = time.perf_counter()
+        outcome = "success"
+        limits = self.sandbox.limits_for(tier)
+        cancelled = threading.Event()
+        pids = []
+
+        def on_start(pid: int) -> None:
+            pids.append(pid)
+            if cancelled.is_set():
+                _kill_process_group(pid)
+
+        span_name = f"render.{kind}" if counts_as_render else f"ffmpeg.{kind}"
+        with tracer.span(span_name, label=label, command=" ".join(cmd[2:])) as span:
+            if counts_as_render:
+                RENDERS_IN_FLIGHT.inc()
+            try:
+                result = await asyncio.get_event_loop().run_in_executor(
+                    None, lambda: self._run_with_tex_cache(cmd, cwd, timeout, limits, on_start)
+                )
+                if result.timed_out:
+                    tracer.log("Manim execution timed out", timeout_s=timeout)
+                    outcome = "timeout"
+                    TIMEOUTS.inc(stage="render" if counts_as_render else "ffmpeg")
+                    RENDER_LIMIT_EXCEEDED.inc(kind=kind, limit="wall")
+                elif result.limit_exceeded:
+                    tracer.log("Render stopped by sandbox limit", limit=result.limit_exceeded, **limits.to_dict())
+                    outcome = "limit_exceeded"
+                    RENDER_LIMIT_EXCEEDED.inc(kind=kind, limit=result.limit_exceeded)
+                elif result.returncode != 0:
+                    outcome = "error"
+            except asyncio.CancelledError:
+                # The executor thread would keep waiting on the process: kill it to free the thread and cores
+                cancelled.set()
+                for pid in pids:
+                    _kill_process_group(pid)
+                outcome = "cancelled"
+                raise
+            except Exception as e:
+                tracer.log("Manim execution failed with exception", error=str(e))
+                outcome = "error"
+                result = RenderProcessResult(returncode=-1, stderr=f"Execution failed: {str(e)}")
+            finally:
+                if counts_as_render:
+                    RENDERS_IN_FLIGHT.dec()
+                    RENDER_SECONDS.observe(time.perf_counter() - start_time, kind=kind, outcome=outcome)
+                    RENDER_ATTEMPTS.inc(kind=kind, outcome=outcome)
+                else:
+                    FFMPEG_SECONDS.observe(time.perf_counter() - start_time, kind=kind, outcome=outcome)
+            span.set_attributes(
+                outcome=outcome,
+                returncode=result.returncode,
+                cpu_time_s=round(result.cpu_time, 3),
+                peak_rss_kb=result.peak_rss_kb,
+                cpus=result.cpus,
+                avg_cores_used=round(result.avg_cores, 2),
+                memory_limit_mb=limits.memory_mb if self.sandbox.enabled else None,
+                cpu_limit_s=limits.cpu_seconds if self.sandbox.enabled else None,
+            )
+            if outcome != "success":
+                span.status = "error"
+                span.set_attribute("stderr_tail", (result.stderr or "")[-2000:])
+        return result
+
+    async def _run_ffmpeg_command(
+        self,
+        cmd: list,
+        cwd: str,
+        timeout: float,
+        kind: str,
+        label: str = "",
+        tier: Optional[RenderTier] = None,
+    ) -> RenderProcessResult:
+        """Run an ffmpeg command like _run_manim_command, without counting it as a render"""
+        return await self._run_manim_command(cmd, cwd, timeout, kind, label, tier, counts_as_render=False)
+
+    def _run_with_tex_cache(
+        self,
+        cmd: list,
+        cwd: str,
+        timeout: float,
+        limits: RenderLimits,
+        on_start: Optional[Callable[[int], None]] = None,
+    ) -> RenderProcessResult:
+        """run_render_process in the sandbox, with the shared Tex/Text cache checked out around manim commands"""
+        if not self.tex_cache.enabled or not self.tex_cache.is_manim_command(cmd):
+            return run_render_process(cmd, cwd, timeout, self.sandbox, limits, self.scheduling, on_start)
+        checkout = self.tex_cache.checkout()
+        result = None
+        try:
+            result = run_render_process(
+                self.tex_cache.with_config(cmd, checkout), cwd, timeout, self.sandbox, limits, self.scheduling, on_start
+            )
+            return result
+        finally:
+            # A killed render may leave half-written SVGs behind; only publish clean runs
+            self.tex_cache.checkin(checkout, publish=result is not None and result.returncode == 0)
+
+    async def render_scene(
+        self,
+        manim_code: str,
+        class_name: str,
+        quality: str = "l",
+        frame_rate: Optional[int] = None,
+        renderer: Optional[str] = None,
+        disable_caching: bool = False,
+        timeout: float = 300,
+        kind: str = "scene",
+        last_frame_only: bool = False,
+    ) -> dict:
+        """
+        Render a scene in its own working directory with explicit render settings.
+
+        Args:
+            manim_code: Complete Manim script
+            class_name: Scene class to render
+            quality: Manim quality letter (l, m, h, p, k) or a MANIM_QUALITY name
+            frame_rate: Optional --fps override
+            renderer: Optional --renderer (cairo or opengl)
+            disable_caching: Pass --disable_caching to measure cold renders
+            timeout: Seconds before the render process group is killed
+            last_frame_only: Pass -s: run construct() and save only the last frame (no video)
+
+        Returns:
+            Dict with video_path (or None), returncode, stderr, wall_time,
+            cpu_time, peak_rss_kb, cpus (allowed CPUs), avg_cores (average
+            busy cores), output_bytes and work_dir
+        """
+        quality = QUALITY_FLAGS.get(quality, quality)
+        work_dir = tempfile.mkdtemp(prefix="render_", dir=self._temp_root())
+        module_name = f"scene_{uuid.uuid4().hex[:8]}"
+        with open(os.path.join(work_dir, f"{module_name}.py"), "w", encoding="utf-8") as f:
+            f.write(manim_code)
+
+        cmd = [sys.executable, "-m", "manim", f"-q{quality}", "--media_dir", "."]
+        if frame_rate:
+            cmd += ["--fps", str(frame_rate)]
+        if renderer:
+            cmd += ["--renderer", renderer]
+        if disable_caching:
+            cmd.append("--disable_caching")
+        if last_frame_only:
+            cmd.append("-s")
+        cmd += [f"{module_name}.py", class_name]
+
+        result = await self._run_manim_command(cmd, cwd=work_dir, timeout=timeout, kind=kind, label=class_name)
+        video_path = self._find_scene_video(work_dir, module_name, class_name) if result.returncode == 0 else None
+        return {
+            "video_path": video_path,
+            "returncode": result.returncode,
+            "stderr": result.stderr,
+            "timed_out": result.timed_out,
+            "wall_time": result.wall_time,
+            "cpu_time": result.cpu_time,
+            "peak_rss_kb": result.peak_rss_kb,
+            "cpus": result.cpus,
+            "avg_cores": result.avg_cores,
+            "output_bytes": os.path.getsize(video_path) if video_path else 0,
+            "work_dir": work_dir,
+        }
+
+    async def _render_still_video(
+        self,
+        media_dir: str,
+        module_name: str,
+        class_name: str,
+        tier: RenderTier,
+        label: str = "",
+    ) -> Optional[str]:
+        """Turn the last frame saved by `manim -s` into a short, still mp4"""
+        still_path = self._find_scene_still(media_dir, module_name, class_name)
+        ffmpeg = shutil.which("ffmpeg")
+        if not still_path or not ffmpeg:
+            tracer.log("Static frame unavailable", still_found=bool(still_path), ffmpeg_found=bool(ffmpeg))
+            return None
+        video_dir = os.path.join(media_dir, "videos", module_name, "still")
+        os.makedirs(video_dir, exist_ok=True)
+        video_path = os.path.join(video_dir, f"{class_name}.mp4")
+        cmd = [
+            ffmpeg, "-y", "-loglevel", "error",
+            "-loop", "1", "-i", still_path,
+            "-t", str(tier.still_duration),
+            "-r", str(tier.frame_rate or 15),
+            "-vf", "scale=trunc(iw/2)*2:trunc(ih/2)*2",
+            "-c:v", "libx264", "-tune", "stillimage", "-pix_fmt", "yuv420p",
+            *self.scheduling.ffmpeg_thread_args(),
+            video_path,
+        ]
+        result = await self._run_ffmpeg_command(
+            cmd, cwd=media_dir, timeout=60, kind="still_encode", label=label, tier=tier
+        )
+        if result.returncode != 0 or not os.path.exists(video_path):
+            return None
+        return video_path
+
+    @staticmethod
+    def _find_scene_still(media_dir: str, module_name: str, class_name: str) -> Optional[str]:
+        """Locate the newest <media_dir>/images/<module>/<Class>*.png written by manim -s"""
+        images_dir = os.path.join(media_dir, "images", module_name)
+        candidates = []
+        for root, dirs, files in os.walk(images_dir):
+            for file in files:
+                if file.endswith(".png") and file.startswith(class_name):
+                    candidates.append(os.path.join(root, file))
+        if not candidates:
+            return None
+        return max(candidates, key=os.path.getmtime)
+
+    def _temp_root(self) -> str:
+        temp_dir = os.path.join(os.getcwd(), "temp_manim")
+        os.makedirs(temp_dir, exist_ok=True)
+        return temp_dir
+
+    @staticmethod
+    def _find_scene_video(work_dir: str, module_name: str, class_name: str) -> Optional[str]:
+        """Locate <work_dir>/videos/<module>/<resolution>/<Class>.mp4 written by manim"""
+        videos_dir = os.path.join(work_dir, "videos", module_name)
+        if not os.path.isdir(videos_dir):
+            return None
+        for resolution in os.listdir(videos_dir):
+            candidate = os.path.join(videos_dir, resolution, f"{class_name}.mp4")
+            if os.path.exists(candidate):
+                return candidate
+        return None
+
+    @staticmethod
+    def _module_videos(work_dir: str, module_name: str) -> List[str]:
+        """Every .mp4 manim wrote for one module, partial movie files included"""
+        videos = []
+        for root, dirs, files in os.walk(os.path.join(work_dir, "videos", module_name)):
+            for file in files:
+                if file.endswith('.mp4'):
+                    videos.append(os.path.join(root, file))
+        return videos
+
     def get_video_path(self, request_id: str):
         return self.video_map.get(request_id)
     
@@ -490,41 +987,48 @@ class {class_name}(Scene):
         
         return temp_file
     
-    async def _execute_manim(self, python_file: str) -> Optional[str]:
+    async def _execute_manim(self, python_file: str, tier: Optional[RenderTier] = None) -> Optional[str]:
         """Execute Manim command to render the animation"""
+        tier = tier or self.tier_policy.tiers[0]
         try:
             # Get the class name from the file
             class_name = self._extract_class_name(python_file)
+            module_name = os.path.splitext(os.path.basename(python_file))[0]
             
             # Build the Manim command
             cmd = [
                 sys.executable, "-m", "manim",
-                "-pql",  # Preview, quality, and loop
+                *tier.manim_args(),
                 "--media_dir", self.output_dir,
                 python_file,
                 class_name
             ]
             
-            # Execute the command
-            result = subprocess.run(
+            # Execute the command in the render executor, off the event loop
+            result = await self._run_manim_command(
                 cmd,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minute timeout - increased for complex animations
+                cwd=os.getcwd(),
+                timeout=tier.timeout or 300,  # 5 minute timeout - increased for complex animations
+                kind="sync",
+                label=class_name,
+                tier=tier,
             )
             
             if result.returncode != 0:
                 print(f"Manim execution error: {result.stderr}")
                 return None
             
+            if tier.mode == MODE_STATIC:
+                return await self._render_still_video(self.output_dir, module_name, class_name, tier)
+            
             # Find the generated video file
-            video_path = self._find_generated_video(class_name)
+            video_path = (
+                self._find_scene_video(self.output_dir, module_name, class_name)
+                or self._find_generated_video(class_name)
+            )
             
             return video_path
             
-        except subprocess.TimeoutExpired:
-            print("Manim execution timed out")
-            return None
         except Exception as e:
             print(f"Manim execution failed: {str(e)}")
             return None
@@ -570,13 +1074,159 @@ class {class_name}(Scene):
             return None
     
     def get_video_url(self, video_path: str) -> str:
-        """Convert file path to URL for frontend access"""
+        """Convert a file path under the media directory to its /media URL"""
         if not video_path:
             return ""
         
-        filename = os.path.basename(video_path)
-        return f"/media/{filename}"
+        relative_path = os.path.relpath(os.path.abspath(video_path), os.path.abspath(settings.MEDIA_DIR))
+        return f"/media/{Path(relative_path).as_posix()}"
     
+    def edit_tier(self, parent_tier: Optional[str]) -> RenderTier:
+        """
+        Tier for re-rendering an edited scene.
+
+        The parent's tier when the current load allows it: the same quality
+        and resolution is what lets manim reuse the parent's animation
+        segments. Under heavier load the cheaper tier from select_tier wins.
+        """
+        tier = self.select_tier()
+        tiers = self.tier_policy.tiers
+        parent = next((candidate for candidate in tiers if candidate.name == parent_tier), None)
+        if parent is not None and tier.mode == MODE_VIDEO and parent.mode == MODE_VIDEO and tiers.index(parent) >= tiers.index(tier):
+            return parent
+        return tier
+
+    def _lineage_dir(self, lineage_id: str) -> str:
+        return os.path.join(os.path.abspath(settings.SCENE_EDIT_DIR), re.sub(r"[^A-Za-z0-9_-]", "", lineage_id))
+
+    def _seed_lineage_dir(self, lineage_dir: str, media_dir: str, module_name: str, class_name: str) -> int:
+        """
+        Link a finished render's partial movie files into its lineage directory.
+
+        manim names segments by a hash of the animation and scene state, not
+        by module, so segments rendered for the original request are reused
+        by the first edit. They are kept here because temp_manim is removed
+        as soon as a video has been served.
+        """
+        pattern = os.path.join(media_dir, "videos", module_name, "*", "partial_movie_files", class_name)
+        copied = 0
+        for source in glob.glob(pattern):
+            resolution = os.path.basename(os.path.dirname(os.path.dirname(source)))
+            target = os.path.join(lineage_dir, "videos", EDIT_MODULE, resolution, "partial_movie_files", class_name)
+            os.makedirs(target, exist_ok=True)
+            for entry in os.scandir(source):
+                if entry.name.endswith(".mp4") and not os.path.exists(os.path.join(target, entry.name)):
+                    link_or_copy(entry.path, os.path.join(target, entry.name))
+                    copied += 1
+        return copied
+
+    async def render_scene_edit(
+        self,
+        request_id: str,
+        manim_code: str,
+        class_name: str,
+        parent: dict,
+        instruction: str,
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Render an edited scene, reusing what earlier versions already rendered.
+
+        Every edit of one original request renders in the same lineage
+        directory with the same module name, so manim's partial movie cache
+        skips animations whose content did not change; an identical scene is
+        served from the render cache. Returns (video_path, error).
+        """
+        lineage_id = parent["lineage_id"]
+        tier = self.edit_tier(parent.get("tier"))
+        self.scenes.put(
+            request_id, manim_code, class_name, tier=tier.name,
+            parent_id=parent["request_id"], lineage_id=lineage_id, instruction=instruction,
+        )
+        if tier.mode != MODE_VIDEO:
+            # Stills and explanation-only have no segments to reuse
+            video_path, error, _ = await self.render_and_store_video(manim_code, class_name, request_id, tier=tier)
+            return video_path, error
+
+        self.video_tiers[request_id] = tier.name
+        prepared_code = self._prepare_code(manim_code, tier)
+        temp_dir = self._temp_root()
+        cached_path = self.render_cache.get(prepared_code, class_name, tier)
+        if cached_path:
+            video_path = link_or_copy(cached_path, os.path.join(temp_dir, f"edit_{request_id}.mp4"))
+            await self._store_cached_video(
+                request_id, video_path, self.render_cache.variants(prepared_code, class_name, tier)
+            )
+            return video_path, None
+
+        lineage_root = os.path.abspath(settings.SCENE_EDIT_DIR)
+        await asyncio.to_thread(self.scenes.prune, lineage_root)
+        lineage_dir = self._lineage_dir(lineage_id)
+        lock = self._lineage_locks.setdefault(lineage_id, asyncio.Lock())
+        async with lock:
+            with tracer.span("scene_edit.render", lineage_id=lineage_id, parent_id=parent["request_id"], tier=tier.name) as span:
+                # Holds the original render's segments (see _seed_lineage_dir) and every earlier edit's
+                os.makedirs(lineage_dir, exist_ok=True)
+                with open(os.path.join(lineage_dir, f"{EDIT_MODULE}.py"), "w", encoding="utf-8") as f:
+                    f.write(prepared_code)
+                cmd = [
+                    sys.executable, "-m", "manim",
+                    *tier.manim_args(),
+                    "--media_dir", ".",
+                    f"{EDIT_MODULE}.py",
+                    class_name,
+                ]
+                result = await self._run_manim_command(
+                    cmd, cwd=lineage_dir, timeout=tier.timeout or 130, kind="edit", label=request_id, tier=tier
+                )
+                output = f"{result.stdout}\n{result.stderr}"
+                span.set_attributes(
+                    reused_segments=len(CACHED_SEGMENT_RE.findall(output)),
+                    rendered_segments=len(RENDERED_SEGMENT_RE.findall(output)),
+                    render_seconds=round(result.wall_time, 3),
+                )
+                scene_video = self._find_scene_video(lineage_dir, EDIT_MODULE, class_name) if result.returncode == 0 else None
+                if scene_video is None:
+                    span.status = "error"
+                    return None, result.stderr or "No video file generated by Manim"
+                # The lineage copy is overwritten by the next edit; serve and cache a copy of our own
+                video_path = link_or_copy(scene_video, os.path.join(temp_dir, f"edit_{request_id}.mp4"))
+        stored = await self._store_video(request_id, video_path)
+        await asyncio.to_thread(self.render_cache.put, prepared_code, class_name, tier, video_path, stored)
+        tracer.log("Edited scene mapped", video_path=video_path, lineage_id=lineage_id)
+        return video_path, None
+
+    async def prerender(self, manim_code: str, class_name: str, tier: RenderTier) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Render a scene into the render cache only (used by the offline precompute tool).
+
+        Goes through render_and_store_video, so the cached video is exactly
+        what a live request would have produced, then drops the per-request
+        copy, variants and previews. Returns (cached video path, error).
+        """
+        prepared_code = self._prepare_code(manim_code, tier)
+        cached_path = self.render_cache.get(prepared_code, class_name, tier)
+        if cached_path:
+            return cached_path, None
+        request_id = f"precompute_{uuid.uuid4().hex}"
+        try:
+            _, error, _ = await self.render_and_store_video(manim_code, class_name, request_id, tier=tier)
+        finally:
+            paths = [self.video_map.pop(request_id, None), *self.video_variants.pop(request_id, {}).values()]
+            for path in paths:
+                if path and os.path.exists(path):
+                    os.remove(path)
+            self.previews.pop(request_id, None)
+            self.video_tiers.pop(request_id, None)
+            self.no_video_requests.discard(request_id)
+            self.scenes.delete(request_id)
+            shutil.rmtree(self._lineage_dir(request_id), ignore_errors=True)
+            self.media.forget(request_id)
+            shutil.rmtree(os.path.join(self.preview_generator.output_dir, request_id), ignore_errors=True)
+        cached_path = self.render_cache.get(prepared_code, class_name, tier)
+        if cached_path is None and error is None:
+            error = "Render produced no cacheable video"
+        return cached_path, error
+
     def cleanup_old_videos(self, max_age_hours: int = 24) -> None:
         """Clean up old video files"""
         from ..utils.file_utils import cleanup_old_files
@@ -0,0 +1,207 @@
+"""
+Content-addressed store for finished videos under the media directory
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from utils.file_utils import ensure_directory_exists, link_or_copy
+from utils.metrics import MEDIA_STORE_WRITES
+from utils.tracing import tracer
+
+MEDIA_EXTENSIONS = {"video/mp4": ".mp4", "video/webm": ".webm"}
+CONTENT_ADDRESSED_RE = re.compile(r"^(?P<digest>[0-9a-f]{64})\.(mp4|webm)$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_digest(filename: str) -> Optional[str]:
+    """The sha256 a media file name was derived from, or None for other files"""
+    match = CONTENT_ADDRESSED_RE.match(os.path.basename(filename))
+    return match.group("digest") if match else None
+
+
+def strong_etag(digest: str) -> str:
+    return f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in if_none_match.split(","))
+
+
+class MediaStore:
+    """
+    <media_dir>/<sha256>.<ext> for every finished video, plus an index from request id.
+
+    A file's name is its content hash, so a URL always means the same bytes
+    and can be cached forever. Identical videos (a cached render, a fallback
+    scene served twice) share one file; renders are added as hard links, so
+    storing costs no copy when temp_manim is on the same filesystem. The
+    index (request id -> digest per media type) is a small JSON file that
+    survives restarts: each change is appended to <index>.journal, and prune
+    folds the journal into the index file, so a put costs one appended line
+    however many entries there are. Files no request refers to are removed
+    once their entries expire.
+    """
+
+    def __init__(self, media_dir: str, index_path: str, ttl_seconds: float = 7 * 24 * 3600, enabled: bool = True):
+        self.media_dir = media_dir
+        self.index_path = index_path
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self.journal_path = f"{index_path}.journal"
+        self._lock = threading.Lock()
+        self._index = {}
+        self._last_prune = 0.0
+        if enabled:
+            ensure_directory_exists(media_dir)
+            ensure_directory_exists(os.path.dirname(os.path.abspath(index_path)))
+            self._index = self._load_index()
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        try:
+            with open(self.journal_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        change = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short by a crash
+                    self._apply(index, change)
+        except OSError:
+            pass
+        return index
+
+    @staticmethod
+    def _apply(index: dict, change: dict) -> None:
+        if change.get("entry") is None:
+            index.pop(change["request_id"], None)
+        else:
+            index.setdefault(change["request_id"], {})[change["media_type"]] = change["entry"]
+
+    def _record(self, change: dict) -> None:
+        """Apply a change to the index and append it to the journal (under the lock)"""
+        self._apply(self._index, change)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(change) + "\n")
+
+    def _save_index(self) -> None:
+        """Write the whole index and empty the journal (under the lock)"""
+        # Write then rename so a crash never leaves a truncated index; replaying
+        # a journal that was not emptied yet onto the new index changes nothing
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.index_path)), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self.index_path)
+        open(self.journal_path, "w").close()
+
+    def put(self, request_id: str, path: str, media_type: str = "video/mp4") -> Optional[str]:
+        """Add a request's video (blocking: hashes the file); returns the stored file name"""
+        if not self.enabled or not path or not os.path.exists(path):
+            return None
+        digest = file_digest(path)
+        filename = f"{digest}{MEDIA_EXTENSIONS.get(media_type, os.path.splitext(path)[1])}"
+        target = os.path.join(self.media_dir, filename)
+        # Under the lock: prune must not see the file before its index entry
+        with self._lock:
+            if os.path.exists(target):
+                MEDIA_STORE_WRITES.inc(result="deduplicated")
+            else:
+                temp_target = f"{target}.{os.getpid()}.tmp"
+                try:
+                    link_or_copy(path, temp_target)
+                    os.replace(temp_target, target)
+                except OSError as e:
+                    tracer.log("Media store write failed", error=str(e))
+                    return None
+                MEDIA_STORE_WRITES.inc(result="stored")
+            entry = {"digest": digest, "filename": filename, "bytes": os.path.getsize(target), "stored_at": time.time()}
+            self._record({"request_id": request_id, "media_type": media_type, "entry": entry})
+        if time.time() - self._last_prune > 3600:
+            self.prune()
+        return filename
+
+    def get(self, request_id: str, media_type: str = "video/mp4") -> Optional[dict]:
+        """Index entry (digest, filename, bytes, path) for a request's video, if its file still exists"""
+        entry = self._index.get(request_id, {}).get(media_type)
+        if entry is None:
+            return None
+        path = os.path.join(self.media_dir, entry["filename"])
+        if not os.path.exists(path):
+            return None
+        return {**entry, "path": path}
+
+    def url(self, request_id: str, media_type: str = "video/mp4") -> Optional[str]:
+        entry = self.get(request_id, media_type)
+        return f"/media/{entry['filename']}" if entry else None
+
+    def _referenced(self) -> set:
+        return {entry["filename"] for entries in self._index.values() for entry in entries.values()}
+
+    def _remove_unreferenced(self, filenames) -> int:
+        referenced = self._referenced()
+        removed = 0
+        for filename in filenames:
+            if filename in referenced:
+                continue
+            try:
+                os.remove(os.path.join(self.media_dir, filename))
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def forget(self, request_id: str) -> None:
+        """Drop a request's entries, and their files unless another request shares them"""
+        with self._lock:
+            entries = self._index.get(request_id)
+            if entries:
+                self._record({"request_id": request_id, "entry": None})
+                self._remove_unreferenced(entry["filename"] for entry in entries.values())
+
+    def prune(self) -> int:
+        """Forget entries older than the TTL and delete files no remaining entry refers to"""
+        if not self.enabled:
+            return 0
+        self._last_prune = time.time()
+        cutoff = self._last_prune - self.ttl_seconds
+        with self._lock:
+            for request_id in list(self._index):
+                entries = {
+                    media_type: entry
+                    for media_type, entry in self._index[request_id].items()
+                    if entry["stored_at"] >= cutoff
+                }
+                if entries:
+                    self._index[request_id] = entries
+                else:
+                    del self._index[request_id]
+            self._save_index()
+            removed = self._remove_unreferenced(
+                entry.name for entry in os.scandir(self.media_dir) if content_digest(entry.name)
+            )
+        if removed:
+            tracer.log("Pruned media store", removed=removed)
+        return removed
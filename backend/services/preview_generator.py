@@ -0,0 +1,156 @@
+"""
+Poster frames and small animated previews for rendered (or still rendering) videos
+"""
+import glob
+import os
+import re
+import shutil
+from typing import Awaitable, Callable, List, Optional
+
+from utils.file_utils import ensure_directory_exists, link_or_copy
+from utils.tracing import tracer
+
+
+class PreviewGenerator:
+    """
+    Writes <output_dir>/<request_id>/poster.jpg and preview.gif with ffmpeg,
+    prefixed with segment_ when made from a partial movie segment.
+
+    Commands run through `run_command`, the executor-backed ffmpeg runner
+    (they do not count as renders in flight).
+    """
+
+    def __init__(
+        self,
+        run_command: Callable[..., Awaitable],
+        output_dir: str,
+        enabled: bool = True,
+        fps: int = 5,
+        width: int = 320,
+        max_seconds: float = 8.0,
+        timeout: float = 60,
+        thread_args: Optional[list] = None,
+    ):
+        self.run_command = run_command
+        self.output_dir = output_dir
+        self.enabled = enabled
+        self.fps = fps
+        self.width = width
+        self.max_seconds = max_seconds
+        self.timeout = timeout
+        self.thread_args = thread_args or []  # e.g. ["-threads", "2"]
+        self.ffmpeg = shutil.which("ffmpeg")
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and self.ffmpeg is not None
+
+    def _request_dir(self, request_id: str) -> str:
+        # Absolute: ffmpeg runs with the target's directory as its cwd
+        directory = os.path.join(os.path.abspath(self.output_dir), request_id)
+        ensure_directory_exists(directory)
+        return directory
+
+    async def _ffmpeg(self, args: list, target: str, kind: str, label: str) -> Optional[str]:
+        # Write next to the target and rename, so a poll never sees a partial file
+        temp_target = f"{target}.tmp{os.path.splitext(target)[1]}"
+        cmd = [self.ffmpeg, "-y", "-loglevel", "error", *args, *self.thread_args, temp_target]
+        result = await self.run_command(
+            cmd, cwd=os.path.dirname(target), timeout=self.timeout, kind=kind, label=label
+        )
+        if result.returncode != 0 or not os.path.exists(temp_target):
+            if os.path.exists(temp_target):
+                os.remove(temp_target)
+            return None
+        os.replace(temp_target, target)
+        return target
+
+    async def generate(self, request_id: str, video_path: str, segment: bool = False) -> dict:
+        """
+        Poster and animated preview for a video.
+
+        For a partial movie segment the poster is its last frame: the state
+        after the first animation. For a finished video, where scenes usually
+        end on a fade-out, ffmpeg's thumbnail filter picks a representative
+        frame instead.
+
+        Returns:
+            Dict with poster and preview paths (None where generation failed)
+        """
+        if not self.available or not os.path.exists(video_path):
+            return {"poster": None, "preview": None}
+        directory = self._request_dir(request_id)
+        prefix = "segment_" if segment else ""
+        scale = f"scale={self.width}:-2:flags=lanczos"
+        with tracer.span("video.preview", source="segment" if segment else "video") as span:
+            if segment:
+                poster_args = ["-sseof", "-0.1", "-i", video_path, "-frames:v", "1", "-vf", scale, "-q:v", "4"]
+            else:
+                poster_args = ["-i", video_path, "-vf", f"thumbnail=150,{scale}", "-frames:v", "1", "-q:v", "4"]
+            poster = await self._ffmpeg(poster_args, os.path.join(directory, f"{prefix}poster.jpg"), "preview_poster", request_id)
+            preview_args = [
+                "-t", str(self.max_seconds), "-i", video_path,
+                "-vf", f"fps={self.fps},{scale},split[a][b];[a]palettegen=max_colors=64[p];[b][p]paletteuse",
+                "-loop", "0",
+            ]
+            preview = await self._ffmpeg(preview_args, os.path.join(directory, f"{prefix}preview.gif"), "preview_gif", request_id)
+            span.set_attributes(poster=bool(poster), preview=bool(preview))
+        return {"poster": poster, "preview": preview}
+
+    def poster_from_image(self, request_id: str, image_path: str) -> Optional[str]:
+        """Use an already rendered still (static render tier) as the poster"""
+        if not self.enabled or not os.path.exists(image_path):
+            return None
+        target = os.path.join(self._request_dir(request_id), f"poster{os.path.splitext(image_path)[1]}")
+        shutil.copyfile(image_path, target)
+        return target
+
+    def adopt(self, request_id: str, previews: dict) -> dict:
+        """Link previews already made from an identical video (a render cache hit) into a request's directory"""
+        adopted = {"poster": None, "preview": None}
+        if not self.enabled:
+            return adopted
+        for role, path in previews.items():
+            if role in adopted and path and os.path.exists(path):
+                target = os.path.join(self._request_dir(request_id), f"{role}{os.path.splitext(path)[1]}")
+                adopted[role] = link_or_copy(path, target)
+        return adopted
+
+
+def completed_segments(media_dir: str, module_name: str, class_name: str, render_finished: bool = False) -> List[str]:
+    """
+    Partial movie files of a module's current render, in play order.
+
+    The caller clears the module's directory before each render, so every
+    segment here belongs to it. While manim runs it writes one segment per
+    play()/wait() in order, so every segment except the newest is complete.
+    Once it has combined them, its partial_movie_file_list.txt gives the
+    order (segments reused from manim's cache keep their old mtimes).
+    """
+    directories = glob.glob(os.path.join(media_dir, "videos", module_name, "*", "partial_movie_files", class_name))
+    if not directories:
+        return []
+    # One resolution directory per render; the newest is the current one
+    directory = max(directories, key=os.path.getmtime)
+    if render_finished:
+        listed = _listed_segments(directory)
+        if listed:
+            return listed
+    segments = sorted(glob.glob(os.path.join(directory, "*.mp4")), key=os.path.getmtime)
+    return segments if render_finished else segments[:-1]
+
+
+def _listed_segments(directory: str) -> Optional[List[str]]:
+    """Segments in the order of manim's ffmpeg concat list, or None before it is written"""
+    try:
+        with open(os.path.join(directory, "partial_movie_file_list.txt"), encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    segments = []
+    for line in lines:
+        match = re.match(r"^file '(?:file:)?(.+)'$", line.strip())
+        if match:
+            path = match.group(1)
+            segments.append(path if os.path.isabs(path) else os.path.join(directory, path))
+    return [path for path in segments if os.path.exists(path)] or None
@@ -0,0 +1,141 @@
+"""
+Cache of finished renders keyed by scene code and render tier
+"""
+import glob
+import hashlib
+import json
+import os
+from typing import Dict, Optional
+
+from utils.file_utils import ensure_directory_exists, link_or_copy
+from utils.metrics import CACHE_REQUESTS, RENDER_CACHE_BYTES
+from utils.tracing import tracer
+
+
+class RenderCache:
+    """
+    <cache_dir>/<digest>.mp4 for every (scene code, class, tier) rendered.
+
+    The digest covers the code as rendered (tier duration cap included), the
+    scene class and the tier's manim flags, so the same answer rendered at a
+    different quality is a separate entry. Entries are optimized MP4s, with
+    what was made from them kept next to them as <digest>-<role><ext> (WebM
+    variant, poster, preview) so a hit runs no ffmpeg at all. The least
+    recently used entries are evicted above max_bytes, variants included.
+    Filled by normal renders and by the offline precompute tool.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        if enabled:
+            ensure_directory_exists(cache_dir)
+            RENDER_CACHE_BYTES.set(self.size())
+
+    @staticmethod
+    def key(manim_code: str, class_name: str, tier) -> str:
+        return hashlib.sha256(
+            json.dumps([manim_code, class_name, tier.mode, tier.manim_args(), tier.still_duration]).encode("utf-8")
+        ).hexdigest()
+
+    def path(self, manim_code: str, class_name: str, tier) -> str:
+        return os.path.join(self.cache_dir, f"{self.key(manim_code, class_name, tier)}.mp4")
+
+    def get(self, manim_code: str, class_name: str, tier) -> Optional[str]:
+        """Cached video for the scene, or None; a hit counts as a use for eviction"""
+        if not self.enabled or not manim_code:
+            return None
+        path = self.path(manim_code, class_name, tier)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            CACHE_REQUESTS.inc(cache="render", result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache="render", result="hit")
+        return path
+
+    def variants(self, manim_code: str, class_name: str, tier) -> Dict[str, str]:
+        """Files cached alongside the scene's video, by role (webm, poster, preview)"""
+        stem, _ = os.path.splitext(self.path(manim_code, class_name, tier))
+        variants = {}
+        for path in glob.glob(f"{stem}-*"):
+            role, ext = os.path.splitext(os.path.basename(path)[len(os.path.basename(stem)) + 1:])
+            if not ext.endswith(".tmp"):
+                variants[role] = path
+        return variants
+
+    def put(
+        self,
+        manim_code: str,
+        class_name: str,
+        tier,
+        video_path: str,
+        variants: Optional[Dict[str, Optional[str]]] = None,
+    ) -> Optional[str]:
+        """
+        Add a finished video (blocking file I/O); the caller keeps its own files.
+
+        `variants` maps a role (webm, poster, preview) to a file made from
+        the video; they are stored before the video, so a hit finds them.
+        """
+        if not self.enabled or not manim_code or not video_path or not os.path.exists(video_path):
+            return None
+        target = self.path(manim_code, class_name, tier)
+        stem, _ = os.path.splitext(target)
+        files = [
+            (path, f"{stem}-{role}{os.path.splitext(path)[1]}")
+            for role, path in (variants or {}).items()
+            if path and os.path.exists(path)
+        ]
+        try:
+            for source, destination in [*files, (video_path, target)]:
+                temp_destination = f"{destination}.{os.getpid()}.tmp"
+                link_or_copy(source, temp_destination)
+                os.replace(temp_destination, destination)
+        except OSError as e:
+            tracer.log("Render cache write failed", error=str(e))
+            return None
+        self.evict()
+        return target
+
+    def _entries(self) -> list:
+        """(last use, total bytes, paths) per digest; the video's mtime is the entry's last use"""
+        groups = {}
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            group = groups.setdefault(entry.name[:64], [0.0, 0, []])
+            if entry.name.endswith(".mp4") and "-" not in entry.name:
+                group[0] = stat.st_mtime
+            group[1] += stat.st_size
+            group[2].append(entry.path)
+        return [tuple(group) for group in groups.values()]
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target_ratio: float = 0.9) -> int:
+        """Drop least recently used entries until the cache is under target_ratio * max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        if total > self.max_bytes:
+            # Variants without a video (an interrupted put) sort first, at mtime 0
+            for _, size, paths in sorted(entries, key=lambda entry: entry[0]):
+                if total <= self.max_bytes * target_ratio:
+                    break
+                for path in paths:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                total -= size
+                removed += 1
+            tracer.log("Render cache evicted entries", removed=removed, remaining_bytes=total)
+        RENDER_CACHE_BYTES.set(total)
+        return removed
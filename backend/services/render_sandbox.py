@@ -0,0 +1,235 @@
+"""
+Resource limits and a scrubbed environment for render subprocesses
+"""
+import os
+import re
+import signal
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from utils.tracing import tracer
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Environment variables a render needs to find latex, ffmpeg, fonts and its
+# Python packages; everything else (API keys included) is dropped
+DEFAULT_ENV_PASSTHROUGH = [
+    "PATH", "HOME", "USER", "LANG", "LC_ALL", "LC_CTYPE", "TZ",
+    "TMPDIR", "TEMP", "TMP", "PYTHONPATH", "VIRTUAL_ENV", "CONDA_PREFIX", "LD_LIBRARY_PATH",
+    "XDG_CACHE_HOME", "XDG_CONFIG_HOME", "XDG_DATA_HOME", "XDG_RUNTIME_DIR",
+    "FONTCONFIG_FILE", "FONTCONFIG_PATH", "TEXMFHOME", "TEXMFVAR", "TEXMFCONFIG",
+]
+# Never passed through, even when listed
+SECRET_NAME_RE = re.compile(r"KEY|SECRET|TOKEN|PASSWORD|CREDENTIAL", re.IGNORECASE)
+
+# RLIMIT_CPU sends SIGXCPU at the soft limit and SIGKILL this many seconds later
+CPU_HARD_LIMIT_GRACE = 5
+MEMORY_ERROR_RE = re.compile(r"\bMemoryError\b|Cannot allocate memory|std::bad_alloc|out of memory", re.IGNORECASE)
+
+
+class RenderLimits:
+    """
+    Caps for one render process.
+
+    memory_mb bounds each process's address space (RLIMIT_AS) and, with
+    cgroups, the whole process group's memory; cpu_seconds is per process
+    (RLIMIT_CPU); cpu_cores and pids_max only apply with cgroups. None
+    means unlimited.
+    """
+
+    def __init__(
+        self,
+        memory_mb: Optional[int] = None,
+        cpu_seconds: Optional[int] = None,
+        cpu_cores: Optional[float] = None,
+        pids_max: Optional[int] = None,
+    ):
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.cpu_cores = cpu_cores
+        self.pids_max = pids_max
+
+    def to_dict(self) -> dict:
+        return {
+            "memory_mb": self.memory_mb,
+            "cpu_seconds": self.cpu_seconds,
+            "cpu_cores": self.cpu_cores,
+            "pids_max": self.pids_max,
+        }
+
+
+class RenderCgroup:
+    """A cgroup v2 directory holding one render's process tree"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, name: str, value: str) -> None:
+        with open(os.path.join(self.path, name), "w") as f:
+            f.write(value)
+
+    def read(self, name: str) -> str:
+        try:
+            with open(os.path.join(self.path, name)) as f:
+                return f.read()
+        except OSError:
+            return ""
+
+    def add(self, pid: int) -> None:
+        self.write("cgroup.procs", str(pid))
+
+    def peak_rss_kb(self) -> int:
+        """Peak memory of the whole group (memory.peak needs Linux 5.19+)"""
+        value = self.read("memory.peak").strip()
+        return int(value) // 1024 if value.isdigit() else 0
+
+    def oom_killed(self) -> bool:
+        for line in self.read("memory.events").splitlines():
+            name, _, count = line.partition(" ")
+            if name == "oom_kill" and count.strip() not in ("", "0"):
+                return True
+        return False
+
+    def remove(self) -> None:
+        """Kill anything left in the group and delete it"""
+        try:
+            self.write("cgroup.kill", "1")
+        except OSError:
+            pass  # cgroup.kill needs Linux 5.14+
+        for _ in range(20):
+            try:
+                os.rmdir(self.path)
+                return
+            except FileNotFoundError:
+                return
+            except OSError:
+                time.sleep(0.05)  # Killed processes take a moment to leave
+        tracer.log("Render cgroup could not be removed", path=self.path)
+
+
+class RenderSandbox:
+    """
+    Runs each render with resource limits and a scrubbed environment.
+
+    RLIMIT_AS and RLIMIT_CPU are set in the child before exec and are
+    inherited by manim's latex and ffmpeg children. When cgroup_root points
+    at a writable, delegated cgroup v2 directory, every render also gets its
+    own child cgroup with memory.max, cpu.max and pids.max, which bound the
+    process tree as a whole.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        memory_mb: Optional[int] = None,
+        cpu_seconds: Optional[int] = None,
+        cpu_cores: Optional[float] = None,
+        pids_max: Optional[int] = None,
+        env_passthrough: Optional[List[str]] = None,
+        cgroup_root: str = "",
+    ):
+        self.enabled = enabled
+        self.defaults = RenderLimits(memory_mb, cpu_seconds, cpu_cores, pids_max)
+        self.env_passthrough = DEFAULT_ENV_PASSTHROUGH + [name for name in env_passthrough or [] if name]
+        self.cgroup_root = cgroup_root if enabled and cgroup_root and self._prepare_cgroup_root(cgroup_root) else ""
+
+    @staticmethod
+    def _prepare_cgroup_root(root: str) -> bool:
+        try:
+            os.makedirs(root, exist_ok=True)
+            if not os.path.exists(os.path.join(root, "cgroup.controllers")):
+                raise OSError("not a cgroup v2 directory")
+            with open(os.path.join(root, "cgroup.subtree_control"), "w") as f:
+                f.write("+memory +cpu +pids")
+            return True
+        except OSError as e:
+            tracer.log("Render cgroups unavailable, using rlimits only", cgroup_root=root, error=str(e))
+            return False
+
+    def limits_for(self, tier=None) -> RenderLimits:
+        """Sandbox defaults overridden by the render tier's own limits"""
+        limits = RenderLimits(**self.defaults.to_dict())
+        if tier is not None:
+            for name, value in tier.limits().items():
+                if value is not None:
+                    setattr(limits, name, value)
+        return limits
+
+    def env(self) -> Dict[str, str]:
+        """Environment for render subprocesses: passthrough variables only, never secrets"""
+        return {
+            name: os.environ[name]
+            for name in self.env_passthrough
+            if name in os.environ and not SECRET_NAME_RE.search(name)
+        }
+
+    def popen_kwargs(self, limits: RenderLimits) -> dict:
+        """env and preexec_fn arguments for subprocess.Popen/run"""
+        if not self.enabled:
+            return {}
+        return {"env": self.env(), "preexec_fn": self.preexec(limits)}
+
+    def preexec(self, limits: RenderLimits) -> Optional[Callable[[], None]]:
+        """Function run in the child before exec to apply rlimits"""
+        if resource is None or (limits.memory_mb is None and limits.cpu_seconds is None):
+            return None
+
+        def apply_limits():
+            # Runs between fork and exec: keep it to setrlimit calls
+            if limits.memory_mb is not None:
+                memory_bytes = limits.memory_mb * 1024 * 1024
+                resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+            if limits.cpu_seconds is not None:
+                resource.setrlimit(resource.RLIMIT_CPU, (limits.cpu_seconds, limits.cpu_seconds + CPU_HARD_LIMIT_GRACE))
+
+        return apply_limits
+
+    def attach(self, pid: int, limits: RenderLimits) -> Optional[RenderCgroup]:
+        """Move a freshly started render into its own cgroup, if cgroups are enabled"""
+        if not self.cgroup_root:
+            return None
+        cgroup = RenderCgroup(os.path.join(self.cgroup_root, f"render-{uuid.uuid4().hex[:12]}"))
+        try:
+            os.mkdir(cgroup.path)
+            if limits.memory_mb is not None:
+                cgroup.write("memory.max", str(limits.memory_mb * 1024 * 1024))
+                try:
+                    cgroup.write("memory.swap.max", "0")
+                except OSError:
+                    pass  # No swap accounting
+            if limits.cpu_cores is not None:
+                period = 100000
+                cgroup.write("cpu.max", f"{int(limits.cpu_cores * period)} {period}")
+            if limits.pids_max is not None:
+                cgroup.write("pids.max", str(limits.pids_max))
+            cgroup.add(pid)
+            return cgroup
+        except OSError as e:
+            tracer.log("Render cgroup setup failed", error=str(e))
+            cgroup.remove()
+            return None
+
+    @staticmethod
+    def exceeded_limit(
+        limits: RenderLimits,
+        returncode: int,
+        cpu_time: float,
+        stderr: str,
+        cgroup: Optional[RenderCgroup] = None,
+    ) -> Optional[str]:
+        """Which limit ended the render ("memory" or "cpu"), or None"""
+        if returncode == 0:
+            return None
+        if (cgroup is not None and cgroup.oom_killed()) or (
+            limits.memory_mb is not None and MEMORY_ERROR_RE.search(stderr or "")
+        ):
+            return "memory"
+        if limits.cpu_seconds is not None and (
+            returncode == -signal.SIGXCPU or (returncode == -signal.SIGKILL and cpu_time >= limits.cpu_seconds)
+        ):
+            return "cpu"
+        return None
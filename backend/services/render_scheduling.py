@@ -0,0 +1,132 @@
+"""
+CPU and IO scheduling policy that keeps render processes off the API's cores
+"""
+import ctypes
+import os
+import platform
+from typing import Callable, List, Optional, Set
+
+from utils.tracing import tracer
+
+IOPRIO_CLASSES = {"none": 0, "realtime": 1, "best-effort": 2, "idle": 3}
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+# ioprio_set has no Python binding; syscall numbers per architecture
+SYS_IOPRIO_SET = {"x86_64": 251, "amd64": 251, "i386": 289, "i686": 289, "aarch64": 30, "arm64": 30}
+
+
+def format_cpus(cpus) -> str:
+    """Compact CPU list, e.g. {1, 2, 3, 6} -> "1-3,6" """
+    ranges = []
+    for cpu in sorted(cpus):
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
+
+
+class RenderScheduling:
+    """
+    Niceness, IO priority and CPU affinity applied to every render process.
+
+    The lowest `reserved_cores` of the CPUs this process may run on are kept
+    free for the API process (the uvicorn event loop and its executor);
+    renders, and the latex/ffmpeg children they start, are pinned to the
+    rest. Libraries that size their thread pools from the affinity mask
+    (libav's encoder threads, OpenBLAS) follow the pinning automatically.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        nice: int = 10,
+        ioprio_class: str = "best-effort",
+        ioprio_level: int = 7,
+        reserved_cores: int = 1,
+        ffmpeg_threads: int = 0,
+    ):
+        self.enabled = enabled
+        self.nice = nice
+        self.ffmpeg_threads = ffmpeg_threads
+        self.ioprio = self._ioprio_value(ioprio_class, ioprio_level) if enabled else None
+        self.render_cpus = self._render_cpus(reserved_cores) if enabled else None
+        self._syscall = self._load_syscall() if self.ioprio is not None else None
+        if enabled:
+            tracer.log(
+                "Render scheduling policy",
+                nice=nice,
+                ioprio_class=ioprio_class if self.ioprio is not None else "unchanged",
+                render_cpus=format_cpus(self.render_cpus) if self.render_cpus else "all",
+                ffmpeg_threads=ffmpeg_threads or "auto",
+            )
+
+    @staticmethod
+    def _ioprio_value(ioprio_class: str, level: int) -> Optional[int]:
+        ioprio_class = (ioprio_class or "none").lower()
+        if ioprio_class not in IOPRIO_CLASSES:
+            tracer.log("Unknown render IO priority class, leaving IO priority unchanged", ioprio_class=ioprio_class)
+            return None
+        if ioprio_class == "none":
+            return None
+        # The idle class has no levels
+        level = 0 if ioprio_class == "idle" else max(0, min(7, level))
+        return (IOPRIO_CLASSES[ioprio_class] << IOPRIO_CLASS_SHIFT) | level
+
+    @staticmethod
+    def _render_cpus(reserved_cores: int) -> Optional[Set[int]]:
+        if reserved_cores <= 0 or not hasattr(os, "sched_getaffinity"):
+            return None
+        cpus = sorted(os.sched_getaffinity(0))
+        if len(cpus) <= reserved_cores:
+            tracer.log("Not enough CPUs to reserve cores for the API", cpus=len(cpus), reserved_cores=reserved_cores)
+            return None
+        return set(cpus[reserved_cores:])
+
+    @staticmethod
+    def _load_syscall() -> Optional[Callable]:
+        number = SYS_IOPRIO_SET.get(platform.machine().lower())
+        if number is None or platform.system() != "Linux":
+            return None
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+        except OSError:
+            return None
+        return lambda pid, ioprio: libc.syscall(number, IOPRIO_WHO_PROCESS, pid, ioprio)
+
+    def apply(self, pid: int) -> None:
+        """
+        Apply the policy to a freshly started render process.
+
+        Set from the parent by pid rather than in a preexec_fn, which can
+        deadlock when the parent has other threads (the executor). Popen
+        returns once the child has exec'd, before it can start threads or
+        children of its own, so everything it starts inherits the policy.
+        Failures leave the default scheduling.
+        """
+        if not self.enabled:
+            return
+        if self.nice:
+            try:
+                os.setpriority(os.PRIO_PROCESS, pid, self.nice)
+            except OSError:
+                pass
+        if self.ioprio is not None and self._syscall is not None:
+            self._syscall(pid, self.ioprio)
+        if self.render_cpus:
+            try:
+                os.sched_setaffinity(pid, self.render_cpus)
+            except OSError:
+                pass
+
+    def ffmpeg_thread_args(self) -> List[str]:
+        """-threads option for ffmpeg commands (nothing lets ffmpeg decide)"""
+        return ["-threads", str(self.ffmpeg_threads)] if self.enabled and self.ffmpeg_threads > 0 else []
+
+    def cpus_label(self) -> str:
+        """CPUs render processes may run on, e.g. "1-7" """
+        if self.render_cpus:
+            return format_cpus(self.render_cpus)
+        if hasattr(os, "sched_getaffinity"):
+            return format_cpus(os.sched_getaffinity(0))
+        return format_cpus(range(os.cpu_count() or 1))
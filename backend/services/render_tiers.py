@@ -0,0 +1,145 @@
+"""
+Load-adaptive render tiers: how much video we can afford to render right now
+"""
+import json
+from typing import List, Optional
+
+from utils.config import settings
+
+
+# Render modes, from most to least expensive
+MODE_VIDEO = "video"        # normal animated render
+MODE_STATIC = "static"      # render only the final frame and show it as a short video
+MODE_NONE = "none"          # explanation only, no render at all
+
+
+class RenderTier:
+    """
+    Render settings used while load stays within the tier's limits.
+
+    A tier applies when both the background render queue depth and the number
+    of render processes in flight are at or below its limits; None means
+    unlimited.
+
+    memory_mb, cpu_seconds and cpu_cores override the render sandbox's
+    defaults for renders in this tier, and timeout overrides the wall-clock
+    limit of a scene render.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        mode: str = MODE_VIDEO,
+        quality: str = "l",
+        frame_rate: Optional[int] = None,
+        resolution: Optional[str] = None,
+        max_duration: Optional[float] = None,
+        still_duration: float = 4.0,
+        max_queue_depth: Optional[int] = None,
+        max_in_flight: Optional[int] = None,
+        memory_mb: Optional[int] = None,
+        cpu_seconds: Optional[int] = None,
+        cpu_cores: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ):
+        if mode not in (MODE_VIDEO, MODE_STATIC, MODE_NONE):
+            raise ValueError(f"Unknown render mode '{mode}' for tier '{name}'")
+        self.name = name
+        self.mode = mode
+        self.quality = quality
+        self.frame_rate = frame_rate
+        self.resolution = resolution  # "width,height" as accepted by manim -r
+        self.max_duration = max_duration
+        self.still_duration = still_duration
+        self.max_queue_depth = max_queue_depth
+        self.max_in_flight = max_in_flight
+        self.memory_mb = memory_mb
+        self.cpu_seconds = cpu_seconds
+        self.cpu_cores = cpu_cores
+        self.timeout = timeout
+
+    def accepts(self, queue_depth: int, in_flight: int) -> bool:
+        if self.max_queue_depth is not None and queue_depth > self.max_queue_depth:
+            return False
+        if self.max_in_flight is not None and in_flight > self.max_in_flight:
+            return False
+        return True
+
+    def manim_args(self) -> List[str]:
+        """Quality, frame rate and resolution flags for the manim CLI"""
+        args = [f"-pq{self.quality}"]
+        if self.frame_rate:
+            args += ["--fps", str(self.frame_rate)]
+        if self.resolution:
+            args += ["-r", self.resolution]
+        if self.mode == MODE_STATIC:
+            args.append("-s")  # save the last frame only; animations are skipped
+        return args
+
+    def limits(self) -> dict:
+        """Render sandbox limits set by this tier (None keeps the sandbox default)"""
+        return {"memory_mb": self.memory_mb, "cpu_seconds": self.cpu_seconds, "cpu_cores": self.cpu_cores}
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "mode": self.mode,
+            "quality": self.quality,
+            "frame_rate": self.frame_rate,
+            "resolution": self.resolution,
+            "max_duration": self.max_duration,
+            "max_queue_depth": self.max_queue_depth,
+            "max_in_flight": self.max_in_flight,
+            **self.limits(),
+            "timeout": self.timeout,
+        }
+
+
+DEFAULT_TIERS = [
+    # -ql as before: 854x480 at 15 fps, no duration cap
+    RenderTier("full", max_queue_depth=2, max_in_flight=2),
+    # Under load, cheaper tiers also get tighter sandbox limits so one heavy scene
+    # cannot hold a CPU for long while many renders are queued
+    RenderTier(
+        "reduced", frame_rate=10, resolution="640,360", max_duration=30, max_queue_depth=6, max_in_flight=4,
+        cpu_seconds=120, timeout=90,
+    ),
+    RenderTier(
+        "static", mode=MODE_STATIC, resolution="640,360", max_queue_depth=12, max_in_flight=8,
+        memory_mb=2048, cpu_seconds=60, timeout=60,
+    ),
+    RenderTier("explanation_only", mode=MODE_NONE),
+]
+
+
+def load_tiers(spec: str = "") -> List[RenderTier]:
+    """
+    Parse tiers from a JSON list of RenderTier keyword arguments, ordered from
+    best to worst. The last tier should be unlimited so every load level maps
+    to a tier; an empty spec gives DEFAULT_TIERS.
+    """
+    if not spec.strip():
+        return list(DEFAULT_TIERS)
+    try:
+        tiers = [RenderTier(**entry) for entry in json.loads(spec)]
+    except (ValueError, TypeError) as e:
+        print(f"⚠️ Invalid RENDER_TIERS ({e}), using default render tiers")
+        return list(DEFAULT_TIERS)
+    return tiers or list(DEFAULT_TIERS)
+
+
+class RenderTierPolicy:
+    """Picks the best tier whose limits the current load fits within"""
+
+    def __init__(self, tiers: Optional[List[RenderTier]] = None, enabled: bool = True):
+        self.tiers = tiers if tiers is not None else load_tiers(settings.RENDER_TIERS)
+        self.enabled = enabled
+
+    def select(self, queue_depth: int, in_flight: int) -> RenderTier:
+        if not self.enabled:
+            return self.tiers[0]
+        for tier in self.tiers:
+            if tier.accepts(queue_depth, in_flight):
+                return tier
+        # Load beyond every configured limit: use the cheapest tier
+        return self.tiers[-1]
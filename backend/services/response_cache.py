@@ -0,0 +1,124 @@
+"""
+Disk-backed cache of LLM responses (explanation plus Manim code) keyed by question
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from typing import Optional, Tuple
+
+from utils.file_utils import ensure_directory_exists
+from utils.metrics import CACHE_REQUESTS
+from utils.tracing import tracer
+
+
+class ResponseCache:
+    """
+    One JSON file per normalised question text.
+
+    The least recently used entries are evicted above max_bytes. Answers from
+    the offline precompute tool are never overwritten by live answers.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._bytes = 0
+        if enabled:
+            ensure_directory_exists(cache_dir)
+            self._bytes = self.size()
+
+    @staticmethod
+    def key(text: str) -> str:
+        normalised = re.sub(r"\s+", " ", text.strip().lower())
+        return hashlib.sha256(normalised.encode("utf-8")).hexdigest()
+
+    def _path(self, text: str) -> str:
+        return os.path.join(self.cache_dir, f"{self.key(text)}.json")
+
+    def _load(self, path: str) -> Optional[dict]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, text: Optional[str], precomputed_only: bool = False) -> Optional[Tuple[str, str]]:
+        """Cached (explanation, manim_code) for a question, or None; a hit counts as a use for eviction"""
+        if not self.enabled or not text:
+            return None
+        cache_name = "precomputed_response" if precomputed_only else "llm_response"
+        path = self._path(text)
+        entry = self._load(path)
+        if entry is None or (precomputed_only and entry.get("source") != "precompute"):
+            CACHE_REQUESTS.inc(cache=cache_name, result="miss")
+            return None
+        CACHE_REQUESTS.inc(cache=cache_name, result="hit")
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return entry["explanation"], entry["manim_code"]
+
+    def put(self, text: Optional[str], explanation: str, manim_code: str, source: str = "live") -> None:
+        """Store an answer; source "precompute" marks answers from the offline precompute tool"""
+        if not self.enabled or not text:
+            return
+        path = self._path(text)
+        previous = self._load(path) if os.path.exists(path) else None
+        if previous is not None and previous.get("source") == "precompute" and source != "precompute":
+            # Precomputed answers are reviewed offline; a live answer must not replace one
+            return
+        entry = {
+            "question": text,
+            "explanation": explanation,
+            "manim_code": manim_code,
+            "source": source,
+            "created_at": time.time(),
+        }
+        # Write then rename so readers never see a partial file
+        data = json.dumps(entry)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+        previous_size = os.path.getsize(path) if previous is not None else 0
+        os.replace(temp_path, path)
+        self._bytes += os.path.getsize(path) - previous_size
+        if self._bytes > self.max_bytes:
+            self.evict()
+
+    def _entries(self) -> list:
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".json"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target_ratio: float = 0.9) -> int:
+        """Drop least recently used entries until the cache is under target_ratio * max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * target_ratio:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            tracer.log("Response cache evicted entries", removed=removed, remaining_bytes=total)
+        self._bytes = total
+        return removed
@@ -0,0 +1,151 @@
+"""
+Stored scene code per request and minimal SEARCH/REPLACE edits applied to it
+"""
+import ast
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from typing import List, Optional, Tuple
+
+from utils.file_utils import ensure_directory_exists
+from utils.tracing import tracer
+
+EDIT_BLOCK_RE = re.compile(
+    r"<<<<<<< SEARCH\n(?P<search>.*?)\n?=======\n(?P<replace>.*?)\n?>>>>>>> REPLACE",
+    re.DOTALL,
+)
+SCENE_CLASS_RE = re.compile(r"class\s+(\w+)\(Scene\):")
+
+
+class SceneEditError(Exception):
+    """The model's edit could not be applied or does not produce a valid scene"""
+
+
+def parse_edit_blocks(text: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """(summary, [(search, replace), ...]) from a model reply; the summary is the text before the first block"""
+    blocks = [(match.group("search"), match.group("replace")) for match in EDIT_BLOCK_RE.finditer(text or "")]
+    first = EDIT_BLOCK_RE.search(text or "")
+    summary = (text[:first.start()] if first else text or "").strip()
+    # The model sometimes fences the blocks despite being asked not to
+    summary = re.sub(r"```\w*\s*$", "", summary).strip()
+    return summary, blocks
+
+
+def apply_edit_blocks(code: str, blocks: List[Tuple[str, str]]) -> str:
+    """Apply each block in order; every SEARCH text must occur exactly once"""
+    if not blocks:
+        raise SceneEditError("The reply contained no SEARCH/REPLACE blocks")
+    for index, (search, replace) in enumerate(blocks, 1):
+        if not search.strip():
+            raise SceneEditError(f"Block {index} has an empty SEARCH section")
+        count = code.count(search)
+        if count == 0:
+            raise SceneEditError(f"Block {index}: SEARCH text not found in the scene:\n{search}")
+        if count > 1:
+            raise SceneEditError(f"Block {index}: SEARCH text occurs {count} times; include more context:\n{search}")
+        code = code.replace(search, replace, 1)
+    return code
+
+
+def validate_scene(code: str) -> str:
+    """Class name of the edited scene; raises SceneEditError if it is not a runnable scene module"""
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        raise SceneEditError(f"Edited scene has a syntax error on line {e.lineno}: {e.msg}")
+    match = SCENE_CLASS_RE.search(code)
+    if not match:
+        raise SceneEditError("Edited code no longer defines a Scene subclass")
+    return match.group(1)
+
+
+class SceneStore:
+    """
+    <store_dir>/<request_id>.json with the code behind each rendered request.
+
+    Every record carries its lineage: the id of the original request that a
+    chain of edits started from. Edits of one lineage share a render
+    directory, so manim can reuse the animation segments they have in common.
+    """
+
+    def __init__(self, store_dir: str, ttl_seconds: float = 24 * 3600, enabled: bool = True):
+        self.store_dir = store_dir
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        if enabled:
+            ensure_directory_exists(store_dir)
+
+    def _path(self, request_id: str) -> str:
+        # Request ids come from URLs: keep them to a safe file name
+        return os.path.join(self.store_dir, f"{re.sub(r'[^A-Za-z0-9_-]', '', request_id)}.json")
+
+    def put(
+        self,
+        request_id: str,
+        code: str,
+        class_name: str,
+        tier: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        lineage_id: Optional[str] = None,
+        instruction: Optional[str] = None,
+    ) -> None:
+        if not self.enabled or not code:
+            return
+        record = {
+            "request_id": request_id,
+            "code": code,
+            "class_name": class_name,
+            "tier": tier,
+            "parent_id": parent_id,
+            "lineage_id": lineage_id or request_id,
+            "instruction": instruction,
+            "created_at": time.time(),
+        }
+        # Write then rename so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f)
+        os.replace(temp_path, self._path(request_id))
+
+    def get(self, request_id: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(request_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def delete(self, request_id: str) -> None:
+        try:
+            os.remove(self._path(request_id))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, lineage_root: Optional[str] = None) -> int:
+        """Forget records, and lineage render directories under lineage_root, older than the TTL"""
+        if not self.enabled:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        stale = [(self.store_dir, lambda entry: entry.name.endswith(".json"))]
+        if lineage_root and os.path.isdir(lineage_root):
+            stale.append((lineage_root, lambda entry: entry.is_dir()))
+        removed = 0
+        for directory, wanted in stale:
+            for entry in os.scandir(directory):
+                try:
+                    if not wanted(entry) or entry.stat().st_mtime >= cutoff:
+                        continue
+                    if entry.is_dir():
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    else:
+                        os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    continue
+        if removed:
+            tracer.log("Pruned stored scenes", removed=removed)
+        return removed
@@ -0,0 +1,201 @@
+"""
+Shared cache of compiled Tex and Text SVGs, reused across Manim renders
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from utils.file_utils import ensure_directory_exists
+from utils.metrics import CACHE_REQUESTS, TEX_CACHE_BYTES
+from utils.tracing import tracer
+
+# Cache subdirectory -> manim config key it backs
+CACHE_DIRS = {"Tex": "tex_dir", "texts": "text_dir"}
+
+
+class TexCacheCheckout:
+    """Private Tex/text directories for one render, plus the manim config pointing at them"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.config_file = os.path.join(root, "manim.cfg")
+        self.seeded = {name: set() for name in CACHE_DIRS}
+
+    def dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+
+class TexCache:
+    """
+    Compiled SVGs live in <cache_dir>/Tex and <cache_dir>/texts.
+
+    Renders never write there directly. Each render gets a private copy,
+    seeded with hard links (so no data is copied), which manim reads and
+    writes through tex_dir/text_dir. After a successful render, new SVGs
+    are linked into the shared directories under a temporary name and
+    renamed into place, so no render ever sees a partial file. Eviction
+    removes the least recently used entries once the cache exceeds
+    max_bytes; Tex entries count as used whenever a render needs them.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, enabled: bool = True):
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.work_root = os.path.join(self.cache_dir, "work")
+        if enabled:
+            for name in CACHE_DIRS:
+                ensure_directory_exists(os.path.join(self.cache_dir, name))
+            # Private dirs left behind by a crashed process
+            shutil.rmtree(self.work_root, ignore_errors=True)
+            ensure_directory_exists(self.work_root)
+            TEX_CACHE_BYTES.set(self.size())
+
+    @staticmethod
+    def is_manim_command(cmd: list) -> bool:
+        return len(cmd) > 2 and cmd[1:3] == ["-m", "manim"]
+
+    def with_config(self, cmd: list, checkout: TexCacheCheckout) -> list:
+        """manim command with --config_file inserted after `python -m manim`"""
+        return cmd[:3] + ["--config_file", checkout.config_file] + cmd[3:]
+
+    def checkout(self) -> TexCacheCheckout:
+        """Create and seed private cache directories for one render (blocking file I/O)"""
+        checkout = TexCacheCheckout(tempfile.mkdtemp(prefix="render_", dir=self.work_root))
+        lines = ["[CLI]"]
+        for name, config_key in CACHE_DIRS.items():
+            shared, private = os.path.join(self.cache_dir, name), checkout.dir(name)
+            os.makedirs(private)
+            for entry in os.scandir(shared):
+                if not entry.name.endswith(".svg"):
+                    continue
+                try:
+                    os.link(entry.path, os.path.join(private, entry.name))
+                except FileNotFoundError:
+                    continue  # Evicted while we were seeding
+                except OSError:
+                    shutil.copyfile(entry.path, os.path.join(private, entry.name))
+                checkout.seeded[name].add(entry.name)
+            lines.append(f"{config_key} = {private}")
+        with open(checkout.config_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return checkout
+
+    def checkin(self, checkout: TexCacheCheckout, publish: bool = True) -> None:
+        """Publish new SVGs from a finished render, record hits, evict and clean up (blocking)"""
+        try:
+            if publish:
+                self._publish(checkout)
+        except OSError as e:
+            tracer.log("Tex cache publish failed", error=str(e))
+        finally:
+            shutil.rmtree(checkout.root, ignore_errors=True)
+
+    def _publish(self, checkout: TexCacheCheckout) -> None:
+        published = 0
+        now = time.time()
+        for name in CACHE_DIRS:
+            shared, private = os.path.join(self.cache_dir, name), checkout.dir(name)
+            if not os.path.isdir(private):
+                continue
+            hits = misses = 0
+            for entry in os.scandir(private):
+                if name == "Tex" and entry.name.endswith(".tex"):
+                    # manim writes <hash>.tex for every formula it needs, compiled or not
+                    svg_name = entry.name[:-4] + ".svg"
+                    if svg_name in checkout.seeded[name]:
+                        hits += 1
+                        try:
+                            os.utime(os.path.join(shared, svg_name), (now, now))
+                        except FileNotFoundError:
+                            pass
+                if not entry.name.endswith(".svg") or entry.name in checkout.seeded[name]:
+                    continue
+                target = os.path.join(shared, entry.name)
+                if os.path.exists(target):
+                    continue  # Published by a concurrent render
+                temp_target = f"{target}.{os.getpid()}.tmp"
+                try:
+                    os.link(entry.path, temp_target)
+                except OSError:
+                    shutil.copyfile(entry.path, temp_target)
+                os.replace(temp_target, target)
+                misses += 1
+                published += 1
+            if hits:
+                CACHE_REQUESTS.inc(hits, cache=name.lower(), result="hit")
+            if misses:
+                CACHE_REQUESTS.inc(misses, cache=name.lower(), result="miss")
+        if published:
+            self.evict()
+
+    def _entries(self) -> list:
+        entries = []
+        for name in CACHE_DIRS:
+            for entry in os.scandir(os.path.join(self.cache_dir, name)):
+                if entry.name.endswith(".svg"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target_ratio: float = 0.9) -> int:
+        """Drop least recently used entries until the cache is under target_ratio * max_bytes"""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes * target_ratio:
+                    break
+                try:
+                    # Renders holding a hard link to this file keep their copy
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            tracer.log("Tex cache evicted entries", removed=removed, remaining_bytes=total)
+        TEX_CACHE_BYTES.set(total)
+        return removed
+
+
+# Rendered once at startup (with -s, so only construction runs) to compile the
+# text and formulas that our templates, fallback scenes and typical LLM scenes use
+WARMUP_SCENE = r'''from manim import *
+
+
+class TexCacheWarmup(Scene):
+    def construct(self):
+        mobjects = []
+        # Animation template titles, labels and digits
+        for title in ["Bubble Sort", "Selection Sort", "Insertion Sort", "Binary Search Tree Insertion"]:
+            mobjects.append(Text(title, font_size=40, color=BLUE))
+            mobjects.append(Text(title, font_size=36, color=BLUE))
+        mobjects.append(Text("Sorted!", font_size=36, color=GREEN))
+        for value in range(100):
+            for size in (24, 30, 32):
+                mobjects.append(Text(str(value), font_size=size))
+        for label in "ABCDEFGHIJST":
+            mobjects.append(Text(label, font_size=26))
+        for word in ["x", "y", "Queue:", "Stack:", "Visited:"]:
+            mobjects.append(Text(word, font_size=24))
+        # Formulas that come up again and again in generated scenes
+        for formula in [
+            r"x^2", r"y = x^2", r"f(x)", r"\frac{a}{b}", r"\sqrt{x}", r"\pi", r"\theta",
+            r"a^2 + b^2 = c^2", r"E = mc^2", r"F = ma", r"\int_a^b f(x)\,dx",
+            r"\sum_{i=1}^{n} i", r"\frac{d}{dx}", r"O(n)", r"O(n^2)", r"O(n \log n)",
+            r"\lim_{x \to 0}", r"\Delta", r"\infty", r"=", r"+", r"-", r"\times",
+        ]:
+            mobjects.append(MathTex(formula))
+        for digit in range(10):
+            mobjects.append(MathTex(str(digit)))
+        # Constructing the mobjects compiles them; the frame itself does not matter
+        self.add(mobjects[0])
+'''
@@ -0,0 +1,131 @@
+"""
+Post-render video optimization: faststart MP4, tuned x264 and a WebM/VP9 variant
+"""
+import os
+import shutil
+from typing import Awaitable, Callable, Optional
+
+from utils.metrics import VIDEO_BYTES_SAVED, VIDEO_SIZE_RATIO
+from utils.tracing import tracer
+
+
+class VideoOptimizer:
+    """
+    Rewrites rendered videos for faster playback start and smaller downloads.
+
+    Commands run through `run_command`, the executor-backed ffmpeg runner, so
+    they get the same timeouts and spans as renders without counting as one.
+    """
+
+    def __init__(
+        self,
+        run_command: Callable[..., Awaitable],
+        enabled: bool = True,
+        reencode: bool = False,
+        x264_crf: int = 28,
+        x264_preset: str = "medium",
+        webm: bool = False,
+        vp9_crf: int = 40,
+        timeout: float = 120,
+        thread_args: Optional[list] = None,
+    ):
+        self.run_command = run_command
+        self.enabled = enabled
+        self.reencode = reencode
+        self.x264_crf = x264_crf
+        self.x264_preset = x264_preset
+        self.webm = webm
+        self.vp9_crf = vp9_crf
+        self.timeout = timeout
+        self.thread_args = thread_args or []  # e.g. ["-threads", "2"]
+        self.ffmpeg = shutil.which("ffmpeg")
+
+    @property
+    def available(self) -> bool:
+        return self.enabled and self.ffmpeg is not None
+
+    def mp4_args(self, reencode: bool) -> list:
+        if not reencode:
+            # Move the moov atom to the front without touching the streams
+            return ["-c", "copy", "-movflags", "+faststart"]
+        return [
+            "-c:v", "libx264",
+            "-preset", self.x264_preset,
+            "-crf", str(self.x264_crf),
+            "-tune", "animation",  # flat colour areas and sharp edges
+            "-pix_fmt", "yuv420p",
+            "-an",
+            "-movflags", "+faststart",
+            *self.thread_args,
+        ]
+
+    def webm_args(self) -> list:
+        return [
+            "-c:v", "libvpx-vp9",
+            "-crf", str(self.vp9_crf),
+            "-b:v", "0",
+            "-deadline", "good",
+            "-cpu-used", "4",
+            "-row-mt", "1",
+            "-an",
+            *self.thread_args,
+        ]
+
+    async def _ffmpeg(self, source: str, target: str, args: list, kind: str, label: str) -> bool:
+        cmd = [self.ffmpeg, "-y", "-loglevel", "error", "-i", source, *args, target]
+        result = await self.run_command(
+            cmd, cwd=os.path.dirname(source) or ".", timeout=self.timeout, kind=kind, label=label
+        )
+        return result.returncode == 0 and os.path.exists(target) and os.path.getsize(target) > 0
+
+    async def optimize(self, video_path: str, label: str = "", webm: Optional[bool] = None) -> dict:
+        """
+        Optimize a video in place and optionally write a .webm next to it.
+
+        The MP4 keeps its path, so anything that already refers to it stays
+        valid. A re-encode that comes out larger than the input is discarded
+        in favour of a plain faststart remux.
+
+        Returns:
+            Dict with mp4 path, webm path (or None) and byte sizes
+        """
+        report = {"mp4": video_path, "webm": None, "original_bytes": 0, "mp4_bytes": 0, "webm_bytes": 0}
+        if not self.available or not video_path or not os.path.exists(video_path):
+            return report
+        original_bytes = os.path.getsize(video_path)
+        report["original_bytes"] = report["mp4_bytes"] = original_bytes
+        stem, _ = os.path.splitext(video_path)
+
+        with tracer.span("video.optimize", original_bytes=original_bytes, reencode=self.reencode) as span:
+            temp_mp4 = f"{stem}.opt.mp4"
+            ok = False
+            if self.reencode:
+                ok = await self._ffmpeg(video_path, temp_mp4, self.mp4_args(True), "optimize_x264", label)
+                if ok and os.path.getsize(temp_mp4) >= original_bytes:
+                    tracer.log("Re-encode did not shrink the video, remuxing instead")
+                    ok = False
+            if not ok:
+                ok = await self._ffmpeg(video_path, temp_mp4, self.mp4_args(False), "optimize_faststart", label)
+            if ok:
+                os.replace(temp_mp4, video_path)
+                report["mp4_bytes"] = os.path.getsize(video_path)
+                self._record("mp4", original_bytes, report["mp4_bytes"])
+            elif os.path.exists(temp_mp4):
+                os.remove(temp_mp4)
+
+            if self.webm if webm is None else webm:
+                webm_path = f"{stem}.webm"
+                if await self._ffmpeg(video_path, webm_path, self.webm_args(), "optimize_webm", label):
+                    report["webm"] = webm_path
+                    report["webm_bytes"] = os.path.getsize(webm_path)
+                    self._record("webm", original_bytes, report["webm_bytes"])
+
+            span.set_attributes(mp4_bytes=report["mp4_bytes"], webm_bytes=report["webm_bytes"])
+        return report
+
+    @staticmethod
+    def _record(variant: str, original_bytes: int, new_bytes: int) -> None:
+        if original_bytes:
+            VIDEO_SIZE_RATIO.observe(new_bytes / original_bytes, variant=variant)
+        if new_bytes < original_bytes:
+            VIDEO_BYTES_SAVED.inc(original_bytes - new_bytes, variant=variant)
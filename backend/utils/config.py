@@ -15,6 +15,90 @@ class Settings:
     # Anthropic Claude API Configuration
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
     ANTHROPIC_MODEL: str = os.getenv("ANTHROPIC_MODEL", "claude-opus-4-1-20250805")
+    ANTHROPIC_BASE_URL: str = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")
+    
+    # Model and token budget per call type (an empty model means ANTHROPIC_MODEL)
+    LLM_GENERATE_MODEL: str = os.getenv("LLM_GENERATE_MODEL", "")
+    LLM_GENERATE_MAX_TOKENS: int = int(os.getenv("LLM_GENERATE_MAX_TOKENS", "4000"))
+    LLM_FALLBACK_MODEL: str = os.getenv("LLM_FALLBACK_MODEL", "claude-3-5-haiku-20241022")
+    LLM_FALLBACK_MAX_TOKENS: int = int(os.getenv("LLM_FALLBACK_MAX_TOKENS", "2000"))
+    LLM_DEBUG_MODEL: str = os.getenv("LLM_DEBUG_MODEL", "claude-sonnet-4-20250514")
+    LLM_DEBUG_MAX_TOKENS: int = int(os.getenv("LLM_DEBUG_MAX_TOKENS", "3000"))
+    LLM_EDIT_MODEL: str = os.getenv("LLM_EDIT_MODEL", "claude-sonnet-4-20250514")
+    LLM_EDIT_MAX_TOKENS: int = int(os.getenv("LLM_EDIT_MAX_TOKENS", "1500"))
+    LLM_HEALTH_MODEL: str = os.getenv("LLM_HEALTH_MODEL", "claude-3-5-haiku-20241022")
+    LLM_HEALTH_MAX_TOKENS: int = int(os.getenv("LLM_HEALTH_MAX_TOKENS", "5"))
+    
+    # Check the upstream API in the background at startup (also opens the
+    # keep-alive connection) instead of on the first user request
+    AI_CONNECTION_WARMUP: bool = os.getenv("AI_CONNECTION_WARMUP", "True").lower() == "true"
+    
+    # Asynchronous chat jobs (/chat and /chat-json with Prefer: respond-async):
+    # results are kept JOB_TTL_SECONDS after finishing; at most JOBS_MAX_ACTIVE pending
+    JOB_TTL_SECONDS: float = float(os.getenv("JOB_TTL_SECONDS", "3600"))
+    JOBS_MAX_ACTIVE: int = int(os.getenv("JOBS_MAX_ACTIVE", "100"))
+    
+    # Batch lesson generation (/chat/batch): at most BATCH_LLM_CONCURRENCY LLM calls
+    # per batch (call type "batch"), or one Message Batches API request when
+    # BATCH_USE_MESSAGE_BATCHES_API; renders wait until no interactive render is
+    # queued or running. Finished batches are kept JOB_TTL_SECONDS.
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+    BATCH_MAX_ACTIVE: int = int(os.getenv("BATCH_MAX_ACTIVE", "5"))
+    BATCH_LLM_CONCURRENCY: int = int(os.getenv("BATCH_LLM_CONCURRENCY", "2"))
+    BATCH_RENDER_CONCURRENCY: int = int(os.getenv("BATCH_RENDER_CONCURRENCY", "1"))
+    BATCH_RENDER_ATTEMPTS: int = int(os.getenv("BATCH_RENDER_ATTEMPTS", "2"))
+    BATCH_USE_MESSAGE_BATCHES_API: bool = os.getenv("BATCH_USE_MESSAGE_BATCHES_API", "False").lower() == "true"
+    BATCH_POLL_INTERVAL: float = float(os.getenv("BATCH_POLL_INTERVAL", "30"))
+    
+    # Event loop lag monitor: samples scheduling delay every INTERVAL and logs the
+    # blocking stack when the loop is stuck longer than THRESHOLD. The unauthenticated
+    # POST /debug/loop-monitor (runtime toggle) and the stacks in GET /debug/loop-monitor
+    # are only available with LOOP_MONITOR_DEBUG_ENDPOINTS
+    LOOP_MONITOR_ENABLED: bool = os.getenv("LOOP_MONITOR_ENABLED", "True").lower() == "true"
+    LOOP_MONITOR_INTERVAL_MS: float = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "50"))
+    LOOP_MONITOR_THRESHOLD_MS: float = float(os.getenv("LOOP_MONITOR_THRESHOLD_MS", "250"))
+    LOOP_MONITOR_ALL_THREADS: bool = os.getenv("LOOP_MONITOR_ALL_THREADS", "False").lower() == "true"
+    LOOP_MONITOR_DEBUG_ENDPOINTS: bool = os.getenv("LOOP_MONITOR_DEBUG_ENDPOINTS", "False").lower() == "true"
+    
+    # Latency router: send primary generation to a faster model while the
+    # primary model's recent p95 latency is above the threshold
+    LLM_ROUTER_ENABLED: bool = os.getenv("LLM_ROUTER_ENABLED", "False").lower() == "true"
+    LLM_ROUTER_FAST_MODEL: str = os.getenv("LLM_ROUTER_FAST_MODEL", "claude-sonnet-4-20250514")
+    LLM_ROUTER_P95_THRESHOLD: float = float(os.getenv("LLM_ROUTER_P95_THRESHOLD", "60"))
+    LLM_ROUTER_MIN_SAMPLES: int = int(os.getenv("LLM_ROUTER_MIN_SAMPLES", "10"))
+    LLM_ROUTER_WINDOW_SECONDS: float = float(os.getenv("LLM_ROUTER_WINDOW_SECONDS", "600"))
+    
+    # Hedged LLM requests: start the simpler fallback prompt in parallel once the
+    # primary call is slower than this percentile of recent primary latencies
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "True").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    LLM_HEDGE_WINDOW: int = int(os.getenv("LLM_HEDGE_WINDOW", "200"))
+    LLM_HEDGE_DEFAULT_DELAY: float = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "60"))  # until enough samples
+    LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "5"))
+    LLM_HEDGE_MAX_DELAY: float = float(os.getenv("LLM_HEDGE_MAX_DELAY", "240"))
+    LLM_FALLBACK_TIMEOUT: float = float(os.getenv("LLM_FALLBACK_TIMEOUT", "60"))
+    
+    # Upstream API policy: concurrency caps, retries and circuit breaker
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+    LLM_CALL_TYPE_CONCURRENCY: str = os.getenv("LLM_CALL_TYPE_CONCURRENCY", "generate=6,simple_fallback=4,debug=2,batch=2")
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_BACKOFF_BASE: float = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+    LLM_BACKOFF_MAX: float = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+    LLM_CIRCUIT_RECOVERY_TIMEOUT: float = float(os.getenv("LLM_CIRCUIT_RECOVERY_TIMEOUT", "30"))
+    
+    # Cache of successful LLM responses, served while the upstream circuit is open;
+    # LRU-evicted above RESPONSE_CACHE_MAX_MB
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "True").lower() == "true"
+    RESPONSE_CACHE_DIR: str = os.getenv("RESPONSE_CACHE_DIR", "./cache/responses")
+    RESPONSE_CACHE_MAX_MB: int = int(os.getenv("RESPONSE_CACHE_MAX_MB", "64"))
+    # Answers written by the offline precompute tool (precompute.py) are served
+    # before calling the API at all
+    RESPONSE_CACHE_SERVE_PRECOMPUTED: bool = os.getenv("RESPONSE_CACHE_SERVE_PRECOMPUTED", "True").lower() == "true"
+    
+    # Parametrized animation templates used instead of LLM-generated code for common questions
+    TEMPLATES_ENABLED: bool = os.getenv("TEMPLATES_ENABLED", "True").lower() == "true"
     
     # Server Configuration
     HOST: str = os.getenv("HOST", "0.0.0.0")
@@ -34,6 +118,96 @@ class Settings:
     MANIM_QUALITY: str = os.getenv("MANIM_QUALITY", "medium_quality")
     MANIM_FRAME_RATE: int = int(os.getenv("MANIM_FRAME_RATE", "30"))
     
+    # Load-adaptive render tiers (JSON list, best tier first; empty uses the built-in tiers)
+    RENDER_TIERS_ENABLED: bool = os.getenv("RENDER_TIERS_ENABLED", "True").lower() == "true"
+    RENDER_TIERS: str = os.getenv("RENDER_TIERS", "")
+    
+    # Render sandbox: per-process address space and CPU-time rlimits, a scrubbed
+    # environment and, with a delegated cgroup v2 root, per-render cgroups
+    # (memory.max, cpu.max, pids.max). Render tiers can override the limits.
+    RENDER_SANDBOX_ENABLED: bool = os.getenv("RENDER_SANDBOX_ENABLED", "True").lower() == "true"
+    RENDER_MEMORY_MB: int = int(os.getenv("RENDER_MEMORY_MB", "4096"))
+    RENDER_CPU_SECONDS: int = int(os.getenv("RENDER_CPU_SECONDS", "240"))
+    RENDER_CPU_CORES: float = float(os.getenv("RENDER_CPU_CORES", "1.0"))
+    RENDER_PIDS_MAX: int = int(os.getenv("RENDER_PIDS_MAX", "256"))
+    RENDER_CGROUP_ROOT: str = os.getenv("RENDER_CGROUP_ROOT", "")
+    RENDER_ENV_PASSTHROUGH: List[str] = os.getenv("RENDER_ENV_PASSTHROUGH", "").split(",")
+    
+    # Render scheduling: niceness, IO priority (none, best-effort or idle) and CPU
+    # affinity that keeps renders off the lowest RENDER_RESERVED_CORES cores, which
+    # stay free for the API event loop; FFMPEG_THREADS=0 lets ffmpeg decide
+    RENDER_SCHEDULING_ENABLED: bool = os.getenv("RENDER_SCHEDULING_ENABLED", "True").lower() == "true"
+    RENDER_NICE: int = int(os.getenv("RENDER_NICE", "10"))
+    RENDER_IOPRIO_CLASS: str = os.getenv("RENDER_IOPRIO_CLASS", "best-effort")
+    RENDER_IOPRIO_LEVEL: int = int(os.getenv("RENDER_IOPRIO_LEVEL", "7"))
+    RENDER_RESERVED_CORES: int = int(os.getenv("RENDER_RESERVED_CORES", "1"))
+    FFMPEG_THREADS: int = int(os.getenv("FFMPEG_THREADS", "2"))
+    
+    # Shared cache of compiled Tex/Text SVGs used by every render, warmed at startup
+    TEX_CACHE_ENABLED: bool = os.getenv("TEX_CACHE_ENABLED", "True").lower() == "true"
+    TEX_CACHE_DIR: str = os.getenv("TEX_CACHE_DIR", "./cache/tex")
+    TEX_CACHE_MAX_MB: int = int(os.getenv("TEX_CACHE_MAX_MB", "256"))
+    TEX_CACHE_WARMUP: bool = os.getenv("TEX_CACHE_WARMUP", "True").lower() == "true"
+    
+    # Generic fallback scenes: rendered once per topic hint and tier, then served from disk
+    FALLBACK_SCENE_CACHE_ENABLED: bool = os.getenv("FALLBACK_SCENE_CACHE_ENABLED", "True").lower() == "true"
+    FALLBACK_SCENE_DIR: str = os.getenv("FALLBACK_SCENE_DIR", "./cache/fallback_scenes")
+    FALLBACK_SCENE_PREWARM: bool = os.getenv("FALLBACK_SCENE_PREWARM", "True").lower() == "true"
+    
+    # Finished videos keyed by scene code and tier, reused when the same scene is
+    # rendered again (e.g. a precomputed answer); LRU-evicted above RENDER_CACHE_MAX_MB
+    RENDER_CACHE_ENABLED: bool = os.getenv("RENDER_CACHE_ENABLED", "True").lower() == "true"
+    RENDER_CACHE_DIR: str = os.getenv("RENDER_CACHE_DIR", "./cache/renders")
+    RENDER_CACHE_MAX_MB: int = int(os.getenv("RENDER_CACHE_MAX_MB", "1024"))
+    
+    # Finished videos are also kept in MEDIA_DIR named by their sha256 and served
+    # from /media with immutable caching; MEDIA_STORE_INDEX maps request ids to them
+    MEDIA_STORE_ENABLED: bool = os.getenv("MEDIA_STORE_ENABLED", "True").lower() == "true"
+    MEDIA_STORE_INDEX: str = os.getenv("MEDIA_STORE_INDEX", "./cache/media_index.json")
+    MEDIA_STORE_TTL_HOURS: float = float(os.getenv("MEDIA_STORE_TTL_HOURS", "168"))
+    
+    # Scene edits (/chat/edit): the code behind each rendered request is kept in
+    # SCENE_STORE_DIR; edits of one scene re-render in a shared directory under
+    # SCENE_EDIT_DIR so unchanged animations are reused. Both expire after the TTL.
+    SCENE_STORE_DIR: str = os.getenv("SCENE_STORE_DIR", "./cache/scenes")
+    SCENE_EDIT_DIR: str = os.getenv("SCENE_EDIT_DIR", "./cache/edits")
+    SCENE_EDIT_TTL_HOURS: float = float(os.getenv("SCENE_EDIT_TTL_HOURS", "24"))
+    SCENE_EDIT_MAX_ATTEMPTS: int = int(os.getenv("SCENE_EDIT_MAX_ATTEMPTS", "2"))
+    
+    # Post-render video optimization (needs ffmpeg on PATH)
+    VIDEO_OPTIMIZE_ENABLED: bool = os.getenv("VIDEO_OPTIMIZE_ENABLED", "True").lower() == "true"
+    VIDEO_REENCODE: bool = os.getenv("VIDEO_REENCODE", "False").lower() == "true"
+    VIDEO_X264_CRF: int = int(os.getenv("VIDEO_X264_CRF", "28"))
+    VIDEO_X264_PRESET: str = os.getenv("VIDEO_X264_PRESET", "medium")
+    VIDEO_WEBM_ENABLED: bool = os.getenv("VIDEO_WEBM_ENABLED", "False").lower() == "true"
+    VIDEO_VP9_CRF: int = int(os.getenv("VIDEO_VP9_CRF", "40"))
+    
+    # Poster frames and low-fps animated previews (needs ffmpeg on PATH)
+    PREVIEW_ENABLED: bool = os.getenv("PREVIEW_ENABLED", "True").lower() == "true"
+    PREVIEW_FPS: int = int(os.getenv("PREVIEW_FPS", "5"))
+    PREVIEW_WIDTH: int = int(os.getenv("PREVIEW_WIDTH", "320"))
+    PREVIEW_MAX_SECONDS: float = float(os.getenv("PREVIEW_MAX_SECONDS", "8"))
+    PREVIEW_POLL_INTERVAL: float = float(os.getenv("PREVIEW_POLL_INTERVAL", "1.0"))
+    
+    # Abandoned requests: a /chat/stream client that disconnects, or a request id
+    # nobody polls for ABANDON_TIMEOUT_SECONDS, has its LLM call and render cancelled
+    ABANDON_CANCEL_ENABLED: bool = os.getenv("ABANDON_CANCEL_ENABLED", "True").lower() == "true"
+    ABANDON_TIMEOUT_SECONDS: float = float(os.getenv("ABANDON_TIMEOUT_SECONDS", "30"))
+    ABANDON_CHECK_INTERVAL: float = float(os.getenv("ABANDON_CHECK_INTERVAL", "5"))
+    
+    # Live HLS of renders in progress: each finished partial movie (one per play())
+    # is published as a segment under MEDIA_DIR/live (needs ffmpeg on PATH)
+    LIVE_STREAM_ENABLED: bool = os.getenv("LIVE_STREAM_ENABLED", "True").lower() == "true"
+    LIVE_STREAM_POLL_INTERVAL: float = float(os.getenv("LIVE_STREAM_POLL_INTERVAL", "0.5"))
+    LIVE_STREAM_TARGET_DURATION: float = float(os.getenv("LIVE_STREAM_TARGET_DURATION", "4"))
+    
+    # Tracing Configuration
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "jsonl").lower()  # jsonl, otlp or none
+    TRACING_FILE: str = os.getenv("TRACING_FILE", "./traces/traces.jsonl")
+    OTLP_ENDPOINT: str = os.getenv("OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+    TRACING_SERVICE_NAME: str = os.getenv("TRACING_SERVICE_NAME", "tmas-chatbot")
+    TRACING_CONSOLE: bool = os.getenv("TRACING_CONSOLE", "True").lower() == "true"
+    
     # Security
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
     
@@ -3,9 +3,9 @@ File utility functions for handling uploads, media, and file operations
 """
 import os
 import base64
+import shutil
 import uuid
 from typing import Optional, Tuple
-from PIL import Image
 import io
 from pathlib import Path
 
@@ -15,6 +15,22 @@ def ensure_directory_exists(directory_path: str) -> None:
     Path(directory_path).mkdir(parents=True, exist_ok=True)
 
 
+def link_or_copy(source_path: str, target_path: str) -> str:
+    """
+    Independent name for a file's content: a hard link where possible, else a copy.
+
+    Videos are only ever replaced by rename or deleted by name, so neither
+    name is affected by what happens to the other.
+    """
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    try:
+        os.link(source_path, target_path)
+    except OSError:
+        shutil.copyfile(source_path, target_path)
+    return target_path
+
+
 def generate_unique_filename(extension: str = ".mp4") -> str:
     """Generate a unique filename with UUID"""
     return f"{uuid.uuid4().hex}{extension}"
@@ -45,6 +61,8 @@ def save_base64_image(base64_string: str, upload_dir: str) -> Tuple[str, str]:
             base64_string = base64_string.split(',')[1]
         
         # Decode base64 and save image
+        from PIL import Image
+        
         image_data = base64.b64decode(base64_string)
         image = Image.open(io.BytesIO(image_data))
         
@@ -64,6 +82,8 @@ def get_file_size_mb(file_path: str) -> float:
 
 def is_valid_image_file(file_path: str) -> bool:
     """Check if file is a valid image"""
+    from PIL import Image
+    
     try:
         with Image.open(file_path) as img:
             img.verify()
@@ -0,0 +1,155 @@
+"""
+Event-loop lag sampler and watchdog that captures the stack of whatever blocks the loop
+"""
+import asyncio
+import collections
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from utils.config import settings
+from utils.metrics import LOOP_LAG_SECONDS, LOOP_MONITOR_ENABLED, LOOP_STALLS
+from utils.tracing import tracer
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop runs scheduled callbacks.
+
+    A sampler task sleeps for `interval` and records how much later than
+    that it woke up. A watchdog thread watches the sampler's heartbeat:
+    once the loop has not run it for longer than `threshold`, the loop is
+    blocked right now, so the loop thread's stack shows the blocking call.
+    That stack, with the task that was running and its request trace, is
+    logged as an event_loop.stall span. Can be started and stopped at runtime.
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.25, all_threads: bool = False, max_reports: int = 20):
+        self.interval = interval
+        self.threshold = threshold
+        self.all_threads = all_threads
+        self.reports = collections.deque(maxlen=max_reports)
+        self.stalls = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._sampler: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._heartbeat = time.monotonic()
+        self._beat = 0
+        self._reported_beat = -1
+
+    @property
+    def enabled(self) -> bool:
+        return self._sampler is not None and not self._sampler.done()
+
+    def start(self) -> None:
+        """Start sampling on the running loop (no-op if already running)"""
+        if self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop = threading.Event()
+        self._sampler = asyncio.create_task(self._sample())
+        self._watchdog = threading.Thread(target=self._watch, args=(self._stop,), name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        LOOP_MONITOR_ENABLED.set(1)
+        tracer.log("Event loop monitor started", interval_ms=round(self.interval * 1000), threshold_ms=round(self.threshold * 1000))
+
+    async def stop(self) -> None:
+        if self._sampler is None:
+            return
+        self._stop.set()
+        self._sampler.cancel()
+        await asyncio.gather(self._sampler, return_exceptions=True)
+        self._sampler = None
+        LOOP_MONITOR_ENABLED.set(0)
+        tracer.log("Event loop monitor stopped")
+
+    def configure(self, interval: Optional[float] = None, threshold: Optional[float] = None) -> None:
+        if interval is not None:
+            self.interval = max(0.005, interval)
+        if threshold is not None:
+            self.threshold = max(self.interval, threshold)
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._heartbeat = time.monotonic()
+            self._beat += 1
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            LOOP_LAG_SECONDS.observe(lag)
+            if lag > self.threshold:
+                self.stalls += 1
+                LOOP_STALLS.inc()
+
+    def _watch(self, stop: threading.Event) -> None:
+        while not stop.wait(max(0.01, self.threshold / 4)):
+            behind = time.monotonic() - self._heartbeat - self.interval
+            beat = self._beat
+            if behind > self.threshold and beat != self._reported_beat:
+                # One report per stall: the heartbeat moves on once the loop runs again
+                self._reported_beat = beat
+                try:
+                    self._report(behind)
+                except Exception as e:
+                    print(f"[LoopMonitor] Failed to capture stall: {e}")
+
+    def _report(self, blocked_for: float) -> None:
+        """Capture what the loop thread (and optionally every other thread) is doing right now"""
+        frames = sys._current_frames()
+        loop_frame = frames.get(self._loop_thread_id)
+        stack = "".join(traceback.format_stack(loop_frame)) if loop_frame is not None else ""
+        task = asyncio.current_task(self._loop) if self._loop is not None else None
+        task_name = task.get_name() if task is not None else None
+        coroutine = getattr(task.get_coro(), "__qualname__", None) if task is not None else None
+        context = task.get_context() if task is not None and hasattr(task, "get_context") else None
+        request_span = tracer.span_in_context(context)
+        report = {
+            "time": time.time(),
+            "blocked_ms": round(blocked_for * 1000),
+            "task": task_name,
+            "coroutine": coroutine,
+            "stack": stack,
+        }
+        if self.all_threads:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            report["threads"] = {
+                names.get(ident, str(ident)): "".join(traceback.format_stack(frame))
+                for ident, frame in frames.items()
+                if ident not in (self._loop_thread_id, threading.get_ident())
+            }
+        self.reports.append(report)
+
+        # Joins the trace of the request whose task was running, if any
+        span = tracer.start_span("event_loop.stall", parent=request_span, blocked_ms=report["blocked_ms"])
+        span.set_attributes(task=task_name, coroutine=coroutine, stack=stack[-4000:])
+        span.status = "error"
+        tracer.end_span(span)
+        location = stack.strip().splitlines()[-2].strip() if stack.strip() else "unknown"
+        tracer.log("Event loop blocked", blocked_ms=report["blocked_ms"], task=task_name, coroutine=coroutine, at=location)
+
+    def status(self, include_stacks: bool = False) -> dict:
+        reports = list(self.reports)
+        if not include_stacks:
+            reports = [{k: v for k, v in report.items() if k not in ("stack", "threads")} for report in reports]
+        return {
+            "enabled": self.enabled,
+            "interval_ms": round(self.interval * 1000),
+            "threshold_ms": round(self.threshold * 1000),
+            "all_threads": self.all_threads,
+            "stalls": self.stalls,
+            "recent": reports,
+        }
+
+
+loop_monitor = LoopLagMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_MS / 1000,
+    threshold=settings.LOOP_MONITOR_THRESHOLD_MS / 1000,
+    all_threads=settings.LOOP_MONITOR_ALL_THREADS,
+)
@@ -0,0 +1,414 @@
+"""
+Lightweight Prometheus-style metrics registry and text exposition
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.config import settings
+
+
+# Default latency buckets in seconds, sized for LLM calls and Manim renders
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 180, 300)
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way the text exposition format expects"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Render a label set as {name="value",...}"""
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class _Metric:
+    """Base class holding the name, help text and label names of a metric"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels_dict(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for sample_name, labels, value in self.samples():
+            lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        if not items and not self.labelnames:
+            return [(self.name, {}, 0)]
+        return [(self.name, self._labels_dict(key), value) for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, optionally computed at scrape time"""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._values.get(self._key(labels), 0)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Compute the (unlabelled) gauge value lazily on every scrape"""
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        """Increment the gauge for the duration of the block"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def samples(self):
+        if self._function is not None:
+            try:
+                return [(self.name, {}, float(self._function()))]
+            except Exception as e:
+                print(f"[Metrics] Failed to compute gauge {self.name}: {e}")
+                return []
+        with self._lock:
+            items = list(self._values.items())
+        if not items and not self.labelnames:
+            return [(self.name, {}, 0)]
+        return [(self.name, self._labels_dict(key), value) for key, value in items]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets"""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for index, upper in enumerate(self.buckets):
+                if value <= upper:
+                    counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            counts = {key: list(value) for key, value in self._counts.items()}
+            sums = dict(self._sums)
+        result = []
+        for key, bucket_counts in counts.items():
+            labels = self._labels_dict(key)
+            for upper, count in zip(self.buckets, bucket_counts):
+                result.append((f"{self.name}_bucket", {**labels, "le": _format_value(upper)}, count))
+            result.append((f"{self.name}_count", labels, bucket_counts[-1]))
+            result.append((f"{self.name}_sum", labels, sums[key]))
+        return result
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together at /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+def directory_size_bytes(directory: str) -> int:
+    """Total size of all regular files below a directory"""
+    total = 0
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return total
+
+
+# Global registry and the metrics recorded across the pipeline
+metrics = MetricsRegistry()
+
+OCR_SECONDS = metrics.histogram(
+    "tmas_ocr_seconds",
+    "Time spent saving and OCR-ing uploaded images",
+)
+LLM_REQUEST_SECONDS = metrics.histogram(
+    "tmas_llm_request_seconds",
+    "Latency of LLM calls by call type and outcome",
+    ("call_type", "outcome"),
+)
+RENDER_SECONDS = metrics.histogram(
+    "tmas_render_seconds",
+    "Wall time of a single Manim render attempt",
+    ("kind", "outcome"),
+)
+TIME_TO_VIDEO_SECONDS = metrics.histogram(
+    "tmas_time_to_video_seconds",
+    "End-to-end time from request arrival until the video is available",
+    ("endpoint",),
+)
+VIDEO_SIZE_RATIO = metrics.histogram(
+    "tmas_video_size_ratio",
+    "Optimized video size relative to the video manim wrote, by variant",
+    ("variant",),
+    buckets=(0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.1, 1.5),
+)
+VIDEO_BYTES_SAVED = metrics.counter(
+    "tmas_video_bytes_saved_total",
+    "Bytes saved by post-render optimization, by variant",
+    ("variant",),
+)
+FFMPEG_SECONDS = metrics.histogram(
+    "tmas_ffmpeg_seconds",
+    "Wall time of ffmpeg post-processing runs (optimization, previews, live segments) by kind and outcome",
+    ("kind", "outcome"),
+)
+RENDER_ATTEMPTS = metrics.counter(
+    "tmas_render_attempts_total",
+    "Manim render attempts by kind and outcome",
+    ("kind", "outcome"),
+)
+FALLBACKS = metrics.counter(
+    "tmas_fallbacks_total",
+    "Fallback paths taken, by stage and reason",
+    ("stage", "reason"),
+)
+TIMEOUTS = metrics.counter(
+    "tmas_timeouts_total",
+    "Timeouts hit, by stage",
+    ("stage",),
+)
+LLM_HEDGES = metrics.counter(
+    "tmas_llm_hedges_total",
+    "Hedged LLM requests by what triggered the fallback and which call won",
+    ("trigger", "winner"),
+)
+LLM_MODEL_SELECTIONS = metrics.counter(
+    "tmas_llm_model_selections_total",
+    "Model used per LLM call, and whether the latency router picked it",
+    ("call_type", "model", "reason"),
+)
+LLM_RETRIES = metrics.counter(
+    "tmas_llm_retries_total",
+    "Upstream API retries by call type and reason (status code, timeout, transport)",
+    ("call_type", "reason"),
+)
+LLM_SLOT_WAIT_SECONDS = metrics.histogram(
+    "tmas_llm_slot_wait_seconds",
+    "Time spent waiting for an upstream concurrency slot",
+    ("call_type",),
+)
+LLM_IN_FLIGHT = metrics.gauge(
+    "tmas_llm_in_flight",
+    "Upstream API requests currently in flight",
+    ("call_type",),
+)
+LLM_CIRCUIT_STATE = metrics.gauge(
+    "tmas_llm_circuit_state",
+    "Upstream circuit breaker state (0 closed, 1 half-open, 2 open)",
+)
+CACHE_REQUESTS = metrics.counter(
+    "tmas_cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss)",
+    ("cache", "result"),
+)
+TEMPLATE_MATCHES = metrics.counter(
+    "tmas_template_matches_total",
+    "Questions animated from a parametrized template, by template and stage (primary or fallback)",
+    ("template", "stage"),
+)
+RENDER_LIMIT_EXCEEDED = metrics.counter(
+    "tmas_render_limit_exceeded_total",
+    "Render processes stopped by a sandbox limit, by kind and limit (memory, cpu or wall)",
+    ("kind", "limit"),
+)
+RENDER_TIER_SELECTIONS = metrics.counter(
+    "tmas_render_tier_selections_total",
+    "Render tier chosen for each animation job under the load at the time",
+    ("tier",),
+)
+RENDERS_IN_FLIGHT = metrics.gauge(
+    "tmas_renders_in_flight",
+    "Manim render subprocesses currently running",
+)
+RENDER_QUEUE_DEPTH = metrics.gauge(
+    "tmas_render_queue_depth",
+    "Background animation jobs accepted and not yet finished (rendering or debugging)",
+)
+BATCH_RENDER_QUEUE_DEPTH = metrics.gauge(
+    "tmas_batch_render_queue_depth",
+    "Batch items waiting for or running their render (lower priority than interactive renders)",
+)
+BATCH_ITEMS = metrics.counter(
+    "tmas_batch_items_total",
+    "Finished /chat/batch items by outcome (succeeded with video, no_video or failed)",
+    ("outcome",),
+)
+SCENE_EDITS = metrics.counter(
+    "tmas_scene_edits_total",
+    "/chat/edit requests by outcome (applied, invalid edit, missing scene)",
+    ("outcome",),
+)
+MEDIA_STORE_WRITES = metrics.counter(
+    "tmas_media_store_writes_total",
+    "Videos added to the content-addressed media store (stored as a new file or deduplicated)",
+    ("result",),
+)
+LIVE_SEGMENTS = metrics.counter(
+    "tmas_live_segments_total",
+    "Partial movie segments remuxed into live HLS playlists by outcome",
+    ("outcome",),
+)
+ABANDONED_REQUESTS = metrics.counter(
+    "tmas_abandoned_requests_total",
+    "Requests whose LLM call or render was cancelled because the client left (disconnect or no poll within the timeout)",
+    ("reason",),
+)
+MEDIA_DISK_BYTES = metrics.gauge(
+    "tmas_media_disk_bytes",
+    "Bytes used by the media directory",
+)
+MEDIA_DISK_BYTES.set_function(lambda: directory_size_bytes(settings.MEDIA_DIR))
+TEX_CACHE_BYTES = metrics.gauge(
+    "tmas_tex_cache_bytes",
+    "Bytes of compiled Tex and Text SVGs in the shared render cache",
+)
+RENDER_CACHE_BYTES = metrics.gauge(
+    "tmas_render_cache_bytes",
+    "Bytes of finished videos in the render cache",
+)
+LOOP_LAG_SECONDS = metrics.histogram(
+    "tmas_event_loop_lag_seconds",
+    "How late the event loop ran the lag sampler's wake-up (scheduling delay)",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+LOOP_STALLS = metrics.counter(
+    "tmas_event_loop_stalls_total",
+    "Event loop stalls longer than the loop monitor's threshold",
+)
+LOOP_MONITOR_ENABLED = metrics.gauge(
+    "tmas_event_loop_monitor_enabled",
+    "1 while the event loop lag monitor is running",
+)
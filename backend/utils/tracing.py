@@ -0,0 +1,334 @@
+"""
+Per-request tracing with nested spans exported to JSON lines or an OTLP collector
+"""
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from utils.config import settings
+
+
+def trace_id_for_request(request_id: str) -> str:
+    """Derive a stable 32-hex-digit trace id from a request id"""
+    try:
+        return uuid.UUID(request_id).hex
+    except (ValueError, AttributeError, TypeError):
+        return hashlib.sha256(str(request_id).encode("utf-8")).hexdigest()[:32]
+
+
+class Span:
+    """A timed unit of work inside a trace"""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.events: List[Dict[str, Any]] = []
+        self.status = "ok"
+        self.start_time = time.time()
+        self.end_time: Optional[float] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, **attributes) -> None:
+        self.events.append({"name": name, "time": time.time(), "attributes": attributes})
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "error"
+        self.attributes["error.class"] = type(exc).__name__
+        self.attributes["error.message"] = str(exc)[:500]
+        self.add_event(
+            "exception",
+            **{"exception.type": type(exc).__name__, "exception.stacktrace": traceback.format_exc()[-2000:]}
+        )
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.end_time is None:
+            return None
+        return self.end_time - self.start_time
+
+    def end(self) -> None:
+        if self.end_time is None:
+            self.end_time = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+class JsonlSpanExporter:
+    """
+    Append finished spans to a local JSON-lines file.
+
+    Spans are serialized and written by a background thread through one
+    open file handle, so ending a span never does file I/O on the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._run, name="jsonl-exporter", daemon=True)
+        self._thread.start()
+        # CLIs (precompute.py, benchmarks) exit without the app's lifespan shutdown
+        atexit.register(self.shutdown)
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            print("[Tracing] JSONL export queue is full, dropping span")
+
+    def shutdown(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                span = self._queue.get()
+                if span is None:
+                    return
+                try:
+                    f.write(json.dumps(span.to_dict(), default=str) + "\n")
+                except Exception as e:
+                    print(f"[Tracing] JSONL export failed: {e}")
+                # Flush once the queue is drained, so readers see spans promptly without a flush per span
+                if self._queue.empty():
+                    f.flush()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+class OtlpHttpSpanExporter:
+    """Batch finished spans and POST them to an OTLP/HTTP (JSON) collector"""
+
+    def __init__(self, endpoint: str, service_name: str, batch_size: int = 64, flush_interval: float = 2.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            print("[Tracing] OTLP export queue is full, dropping span")
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def _to_otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 1,
+                "startTimeUnixNano": str(int(span.start_time * 1e9)),
+                "endTimeUnixNano": str(int((span.end_time or span.start_time) * 1e9)),
+                "attributes": _otlp_attributes(span.attributes),
+                "events": [
+                    {
+                        "name": event["name"],
+                        "timeUnixNano": str(int(event["time"] * 1e9)),
+                        "attributes": _otlp_attributes(event["attributes"]),
+                    }
+                    for event in span.events
+                ],
+                "status": {"code": 2 if span.status == "error" else 1},
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            otlp_spans.append(otlp_span)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{"scope": {"name": "tmas.tracing"}, "spans": otlp_spans}],
+            }]
+        }
+
+    def _post(self, client: httpx.Client, spans: List[Span]) -> None:
+        try:
+            response = client.post(self.endpoint, json=self._to_otlp(spans))
+            if response.status_code >= 300:
+                print(f"[Tracing] OTLP export failed: {response.status_code} - {response.text[:200]}")
+        except Exception as e:
+            print(f"[Tracing] OTLP export failed: {e}")
+
+    def _run(self) -> None:
+        with httpx.Client(timeout=5.0) as client:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    span = False
+                if span is None:
+                    if batch:
+                        self._post(client, batch)
+                    return
+                if span:
+                    batch.append(span)
+                if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                    self._post(client, batch)
+                    batch = []
+                if time.monotonic() >= deadline:
+                    deadline = time.monotonic() + self.flush_interval
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("tmas_current_span", default=None)
+
+
+class Tracer:
+    """Creates spans, tracks the current span per task and hands finished spans to an exporter"""
+
+    def __init__(self, exporter=None, console: bool = True):
+        self.exporter = exporter
+        self.console = console
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    @staticmethod
+    def span_in_context(context) -> Optional[Span]:
+        """Current span inside another task's contextvars.Context"""
+        return context.get(_current_span) if context is not None else None
+
+    def start_span(
+        self,
+        name: str,
+        request_id: Optional[str] = None,
+        parent: Optional[Span] = None,
+        **attributes,
+    ) -> Span:
+        """
+        Start a span without making it current.
+
+        A request_id starts (or joins) the trace for that request; otherwise the
+        span becomes a child of `parent` or of the current span.
+        """
+        parent = parent if parent is not None else _current_span.get()
+        if request_id is not None:
+            trace_id = trace_id_for_request(request_id)
+            attributes.setdefault("request_id", request_id)
+            if parent is not None and parent.trace_id != trace_id:
+                parent = None
+        elif parent is not None:
+            trace_id = parent.trace_id
+        else:
+            trace_id = uuid.uuid4().hex
+        return Span(name, trace_id, parent.span_id if parent else None, attributes)
+
+    def end_span(self, span: Span) -> None:
+        span.end()
+        if self.exporter is not None:
+            try:
+                self.exporter.export(span)
+            except Exception as e:
+                print(f"[Tracing] Failed to export span {span.name}: {e}")
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        request_id: Optional[str] = None,
+        parent: Optional[Span] = None,
+        **attributes,
+    ):
+        """Run the block inside a new span that is current for the running task"""
+        span = self.start_span(name, request_id=request_id, parent=parent, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def log(self, message: str, **attributes) -> None:
+        """Record an event on the current span and echo it to stdout when enabled"""
+        span = _current_span.get()
+        if span is not None:
+            span.add_event(message, **attributes)
+        if self.console:
+            prefix = f"[{span.trace_id[:8]}:{span.name}]" if span is not None else "[untraced]"
+            suffix = " ".join(f"{key}={value}" for key, value in attributes.items())
+            print(f"{prefix} {message}{' ' + suffix if suffix else ''}")
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+def build_tracer() -> Tracer:
+    """Create the tracer configured by the TRACING_* settings"""
+    exporter = None
+    if settings.TRACING_EXPORTER == "jsonl":
+        exporter = JsonlSpanExporter(settings.TRACING_FILE)
+    elif settings.TRACING_EXPORTER == "otlp":
+        exporter = OtlpHttpSpanExporter(settings.OTLP_ENDPOINT, settings.TRACING_SERVICE_NAME)
+    elif settings.TRACING_EXPORTER not in ("", "none"):
+        print(f"[Tracing] Unknown TRACING_EXPORTER '{settings.TRACING_EXPORTER}', spans will not be exported")
+    return Tracer(exporter=exporter, console=settings.TRACING_CONSOLE)
+
+
+# Create global tracer instance
+tracer = build_tracer()
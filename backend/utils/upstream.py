@@ -0,0 +1,228 @@
+"""
+Upstream API call policy: concurrency limits, retries and a circuit breaker
+"""
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from utils.metrics import (
+    LLM_CIRCUIT_STATE,
+    LLM_IN_FLIGHT,
+    LLM_RETRIES,
+    LLM_SLOT_WAIT_SECONDS,
+)
+from utils.tracing import tracer
+
+
+# 408 timeout, 409 conflict, 429 rate limited, 5xx server errors, 529 overloaded
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class UpstreamError(Exception):
+    """Non-200 response from the upstream API"""
+
+    def __init__(self, status_code: int, body: str = "", retry_after: Optional[float] = None):
+        super().__init__(f"API request failed: {status_code} - {body}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code in RETRYABLE_STATUS_CODES
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the circuit breaker is open"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Upstream API circuit is open, retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """
+    Full-jitter exponential backoff. A Retry-After from the server is a floor,
+    with up to 10% jitter added so clients told the same value spread out.
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, retry_after * random.uniform(1.0, 1.1))
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive upstream failures and fails
+    fast for `recovery_timeout` seconds. Then a single probe call is let
+    through (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        LLM_CIRCUIT_STATE.set(0)
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            tracer.log("Upstream circuit state changed", previous=self.state, state=state)
+        self.state = state
+        LLM_CIRCUIT_STATE.set(self._STATE_VALUES[state])
+
+    def retry_in(self) -> float:
+        return max(self.opened_at + self.recovery_timeout - time.monotonic(), 0.0)
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected without reaching the upstream"""
+        if self.state == self.OPEN:
+            return self.retry_in() > 0
+        return self.state == self.HALF_OPEN and self._probe_in_flight
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == self.OPEN:
+            if self.retry_in() > 0:
+                raise CircuitOpenError(self.retry_in())
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.recovery_timeout)
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_in_flight = False
+        self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def release(self) -> None:
+        """Call ended without telling us anything about upstream health"""
+        self._probe_in_flight = False
+
+
+class UpstreamPolicy:
+    """Wraps single upstream attempts with concurrency limits, retries and the breaker"""
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        call_type_concurrency: Optional[Dict[str, int]] = None,
+        max_retries: int = 2,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._per_call_type = {
+            call_type: asyncio.Semaphore(limit)
+            for call_type, limit in (call_type_concurrency or {}).items()
+        }
+
+    @asynccontextmanager
+    async def slot(self, call_type: str):
+        """Hold a per-call-type slot (if limited) and a global slot"""
+        start_time = time.perf_counter()
+        semaphore = self._per_call_type.get(call_type)
+        if semaphore is not None:
+            await semaphore.acquire()
+        try:
+            async with self._global:
+                LLM_SLOT_WAIT_SECONDS.observe(time.perf_counter() - start_time, call_type=call_type)
+                with LLM_IN_FLIGHT.track_inprogress(call_type=call_type):
+                    yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+    async def call(self, call_type: str, send: Callable[[], Awaitable]):
+        """
+        Run `send` (one upstream attempt) under the policy.
+
+        Retries timeouts, transport errors and retryable status codes only,
+        honouring Retry-After. Timeouts and retryable failures count towards
+        the circuit breaker; other 4xx responses do not.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.breaker.before_call()
+            try:
+                async with self.slot(call_type):
+                    result = await send()
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except UpstreamError as e:
+                if not e.retryable:
+                    # The API answered; the request itself is at fault
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                reason, retry_after, error = f"status_{e.status_code}", e.retry_after, e
+            except httpx.TimeoutException as e:
+                self.breaker.record_failure()
+                reason, retry_after, error = "timeout", None, Exception("API request timed out after all retries")
+            except httpx.TransportError as e:
+                self.breaker.record_failure()
+                reason, retry_after, error = "transport", None, e
+            except Exception:
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                return result
+
+            if attempt >= self.max_retries:
+                raise error
+            delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+            if self.breaker.is_open() and self.breaker.retry_in() > delay:
+                # This failure opened the circuit; the retry would be rejected anyway
+                raise error
+            LLM_RETRIES.inc(call_type=call_type, reason=reason)
+            tracer.log("API request failed, retrying", attempt=attempt + 1, reason=reason, delay_s=round(delay, 2))
+            await asyncio.sleep(delay)
+
+
+def parse_concurrency_limits(value: str) -> Dict[str, int]:
+    """Parse 'generate=6,debug=2' into per-call-type limits"""
+    limits = {}
+    for part in value.split(","):
+        if "=" in part:
+            call_type, limit = part.split("=", 1)
+            limits[call_type.strip()] = int(limit)
+    return limits